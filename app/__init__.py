@@ -1,8 +1,10 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import os
+import threading
 import click
 from flask_login import LoginManager
+from sqlalchemy import inspect as sa_inspect
 
 db = SQLAlchemy()
 login_manager = LoginManager()
@@ -10,8 +12,8 @@ login_manager.login_view = 'auth.login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
+    from app.user_cache import user_cache
+    return user_cache.load(int(user_id))
 
 def create_app(config_class="app.config.Config"):
     app = Flask(__name__)
@@ -21,6 +23,24 @@ def create_app(config_class="app.config.Config"):
     db.init_app(app)
     login_manager.init_app(app)
 
+    from . import user_cache
+    user_cache.init_app(app)
+
+    from . import fragment_cache
+    fragment_cache.init_app(app)
+
+    from .jobs import job_queue
+    job_queue.init_app(app)
+
+    from .main import ai_providers
+    ai_providers.init_app(app)
+
+    from .main import llm_cache
+    llm_cache.init_app(app)
+
+    from . import query_counter
+    query_counter.init_app(app)
+
     # Register blueprints
     from .auth import bp as auth_bp
     app.register_blueprint(auth_bp)
@@ -28,8 +48,17 @@ def create_app(config_class="app.config.Config"):
     from .main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from .main import calendar_feed
+    calendar_feed.init_app(app)
+
+    from .main import enrollment
+    enrollment.init_app(app)
+
     _ensure_sqlite_database(app)
 
+    from .main import course_catalog
+    course_catalog.init_app(app)
+
     # Register CLI commands
     register_cli_commands(app)
 
@@ -39,16 +68,142 @@ def create_app(config_class="app.config.Config"):
 def register_cli_commands(app):
     @app.cli.command('seed-demo')
     @click.option('--reset', is_flag=True, help='Clear existing demo data before seeding')
-    def seed_demo_command(reset):
+    @click.option('--scale', type=int, default=None, help='Generate a synthetic campus with this many students')
+    @click.option('--seed', type=int, default=0, help='Random seed for --scale data')
+    def seed_demo_command(reset, scale, seed):
         """Seed the database with demo data for testing and demonstrations."""
         from seed_demo import seed_all
-        seed_all(reset=reset)
+        db.create_all()
+        seed_all(reset=reset, scale=scale, seed=seed)
+
+    @app.cli.command('apply-indexes')
+    def apply_indexes_command():
+        """Add missing columns and secondary indexes to an existing database."""
+        for name in ensure_columns(app):
+            click.echo(f"added column {name}")
+        created = ensure_indexes(app)
+        for name in created:
+            click.echo(f"created index {name}")
+        click.echo(f"{len(created)} indexes created.")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail if a hot route query falls back to a full table scan."""
+        from app.query_plans import check_route_plans
+        failures = check_route_plans(app)
+        for route, statement, detail in failures:
+            click.echo(f"{route}: {detail}\n    {statement}")
+        click.echo(f"{len(failures)} full table scans found.")
+        if failures:
+            raise SystemExit(1)
+
+    @app.cli.command('query-counts')
+    @click.option('--max-queries', type=int, default=None, help='Fail when a route runs more statements than this')
+    def query_counts_command(max_queries):
+        """Statement count, DB time and most repeated statement of each hot route."""
+        from app.query_counter import query_budget
+        from app.query_plans import route_requests
+        threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 10)
+        failed = False
+        for label, path, client in route_requests(app):
+            with query_budget() as stats:
+                client.get(path)
+            repeats = max(stats.shapes.values(), default=0)
+            flag = ""
+            if repeats > threshold or (max_queries is not None and stats.count > max_queries):
+                flag = "  <-- over budget"
+                failed = True
+            click.echo(f"{label}: {stats.count} queries, {stats.duration * 1000:.1f} ms, max repeat {repeats}{flag}")
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command('repair-conversations')
+    def repair_conversations_command():
+        """Recompute denormalized conversation and unread counters."""
+        from app.main.inbox import repair_counters
+        ensure_columns(app)
+        conversations, participants = repair_counters()
+        click.echo(f"Repaired {conversations} conversations and {participants} participants.")
+
+    @app.cli.command('startup-profile')
+    @click.option('--top', default=20, show_default=True, help='Number of slowest imports to list')
+    @click.option('--check', is_flag=True, help='Exit 1 when a startup budget is exceeded')
+    def startup_profile_command(top, check):
+        """Report per-module import time of a cold start and check the startup budgets."""
+        from app.startup_profile import check_budget, profile_startup
+        profile = profile_startup(os.path.dirname(app.root_path))
+        click.echo(f"{'self ms':>9} {'total ms':>9}  module")
+        for module in profile["slowest"][:top]:
+            click.echo(f"{module.self_us / 1000:9.1f} {module.cumulative_us / 1000:9.1f}  {module.name}")
+        click.echo(
+            f"create_app cold start: {profile['startup_ms']:.0f} ms, "
+            f"{profile['module_count']} modules loaded"
+        )
+        problems = check_budget(profile, app.config)
+        for problem in problems:
+            click.echo(f"over budget: {problem}")
+        if check and problems:
+            raise SystemExit(1)
+
+    @app.cli.command('snapshot-db')
+    @click.argument('variant', type=click.Choice(['empty', 'demo', 'large']))
+    @click.option('--rebuild', is_flag=True, help='Rebuild even if a current snapshot exists')
+    def snapshot_db_command(variant, rebuild):
+        """Build the seeded golden database for a dataset variant and print its path."""
+        from app.db_snapshots import golden_database
+        click.echo(golden_database(variant, rebuild=rebuild))
+
+    @app.cli.command('llm-cache')
+    @click.option('--clear', is_flag=True, help='Empty both cache tiers')
+    def llm_cache_command(clear):
+        """Show (or clear) the LLM response cache and its hit/miss counters."""
+        from app.main.llm_cache import response_cache
+        from app.models import LLMCacheEntry
+        if clear:
+            response_cache.clear()
+        click.echo(f"stored responses: {LLMCacheEntry.query.count()}")
+        for name, value in response_cache.stats().items():
+            click.echo(f"{name}: {value}")
+
+    @app.cli.command('migrate-enrollments')
+    def migrate_enrollments_command():
+        """Convert legacy Classes JSON rows into Enrollment records."""
+        from app.main.enrollment import migrate_classes
+        db.create_all()
+        created, skipped = migrate_classes()
+        click.echo(f"Created {created} enrollments ({skipped} references to missing courses skipped).")
+
+    @app.cli.command('rebuild-gradebook')
+    @click.option('--check-only', is_flag=True, help='Report drifted aggregates without rewriting them')
+    def rebuild_gradebook_command(check_only):
+        """Recompute the materialized gradebook from graded submissions."""
+        from app.main.gradebook import rebuild_gradebook
+        db.create_all()
+        drift = rebuild_gradebook(check_only=check_only)
+        for student_id, course_id, category in drift:
+            click.echo(f"drift: student={student_id} course={course_id} category={category}")
+        if check_only:
+            click.echo(f"{len(drift)} drifted gradebook entries found.")
+            if drift:
+                raise SystemExit(1)
+        else:
+            click.echo(f"Gradebook rebuilt ({len(drift)} entries corrected).")
 
 
 def _ensure_sqlite_database(app):
-    """Create SQLite DB (if missing) the first time the app boots."""
+    """Create SQLite DB (if missing) or bring its schema up to date when the first request comes in.
+
+    An existing database gets any columns the models gained since it was
+    created (``ensure_columns``), so an upgrade does not break every query on
+    those tables; fresh conversation counters are recomputed from messages.
+    Missing indexes still need ``flask apply-indexes``.
+
+    The check runs once per process from a ``before_request`` hook instead of
+    inside ``create_app``, so a serverless cold start that is only importing
+    the app does not touch the filesystem or create tables.
+    """
     uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
-    if not uri.startswith("sqlite"):
+    if not uri.startswith("sqlite") or uri in ("sqlite://", "sqlite:///:memory:"):
         return
 
     # Extract filesystem path from sqlite:/// URI
@@ -56,9 +211,76 @@ def _ensure_sqlite_database(app):
     if not os.path.isabs(db_path):
         db_path = os.path.join(app.root_path, db_path)
 
-    if not os.path.exists(db_path):
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        with app.app_context():
-            db.create_all()
+    checked = threading.Event()
+    lock = threading.Lock()
+
+    @app.before_request
+    def _create_missing_sqlite_database():
+        if checked.is_set():
+            return
+        with lock:
+            if not checked.is_set():
+                if not os.path.exists(db_path):
+                    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                    db.create_all()
+                else:
+                    added = ensure_columns(app)
+                    for name in added:
+                        app.logger.info("added column %s", name)
+                    if any(name.startswith("conversation") for name in added):
+                        from app.main.inbox import repair_counters
+                        repair_counters()
+                checked.set()
+
+
+def ensure_columns(app):
+    """Add model columns missing from tables that already exist.
+
+    SQLite can only ``ADD COLUMN``, so new columns must be nullable or
+    declare a ``server_default``.
+    """
+    from app import models  # noqa: F401  (register every table)
+
+    added = []
+    with app.app_context():
+        db.create_all()
+        inspector = sa_inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" '
+                    f"{column.type.compile(db.engine.dialect)}"
+                )
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    ddl += f" DEFAULT {getattr(default, 'text', default)}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql(ddl)
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def ensure_indexes(app):
+    """Create any model-declared index missing from an existing database.
 
+    ``db.create_all()`` skips tables that already exist, so databases
+    created before an index was added to ``app.models`` never get it.
+    """
+    from app import models  # noqa: F401  (register every table)
 
+    created = []
+    with app.app_context():
+        db.create_all()
+        inspector = sa_inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(db.engine)
+                    created.append(index.name)
+    return created
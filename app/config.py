@@ -1,5 +1,7 @@
 import os
 
+from flask import current_app, has_app_context
+
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
@@ -20,3 +22,89 @@ class Config:
         ("exam", "Exam"),
         ("project", "Project"),
     ]
+
+    # conversations shown per page in the messages inbox
+    INBOX_PAGE_SIZE = 50
+
+    # messages loaded per window when viewing a conversation
+    MESSAGE_PAGE_SIZE = 50
+
+    # live message delivery: "sse" streams, "poll" long-polls. Vercel's
+    # serverless functions cut streaming responses short, so poll there.
+    MESSAGE_LIVE_TRANSPORT = "poll" if os.getenv("VERCEL") else "sse"
+    MESSAGE_POLL_TIMEOUT = 8
+    MESSAGE_STREAM_KEEPALIVE = 15
+
+    # how far back the subscribable calendar feed reaches (snapped to the month)
+    CALENDAR_FEED_HISTORY_DAYS = 120
+
+    # background job queue (app/jobs.py); serverless instances freeze
+    # between requests, so run jobs inline there
+    JOB_WORKERS = 4
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETRY_BACKOFF = 2.0
+    # a running job older than this is treated as abandoned and requeued on startup
+    JOB_LEASE_SECONDS = 5 * 60
+    JOBS_RUN_INLINE = bool(os.getenv("VERCEL"))
+
+    # LLM response cache: entries live LLM_CACHE_TTL seconds, the in-memory
+    # tier keeps the most recent LLM_CACHE_MEMORY_SIZE, the database tier
+    # LLM_CACHE_DB_SIZE
+    LLM_CACHE_TTL = 6 * 60 * 60
+    LLM_CACHE_MEMORY_SIZE = 256
+    LLM_CACHE_DB_SIZE = 5000
+
+    # upper bound on the assignment list sent with each study-plan prompt
+    STUDY_PLAN_PROMPT_TOKENS = 800
+    # stream study plans to the browser instead of queueing them. A stream
+    # holds a web worker for the whole generation and Vercel cuts streaming
+    # responses short, so it is opt-in
+    STUDY_PLAN_STREAMING = os.getenv("STUDY_PLAN_STREAMING") == "1" and not os.getenv("VERCEL")
+
+    # chat-completion provider: "openai", or "fake" for tests and load runs.
+    # Each call times out after LLM_TIMEOUT seconds and transient failures are
+    # retried LLM_MAX_RETRIES times with jittered backoff; LLM_BREAKER_THRESHOLD
+    # consecutive failures open the breaker for LLM_BREAKER_RESET seconds.
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+    LLM_TIMEOUT = 20.0
+    LLM_MAX_RETRIES = 2
+    LLM_RETRY_BACKOFF = 0.5
+    LLM_BREAKER_THRESHOLD = 5
+    LLM_BREAKER_RESET = 30.0
+    LLM_POOL_SIZE = 10
+
+    # rendered template fragments ({% cache %}), keyed by content version
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_SIZE = 2048
+    FRAGMENT_CACHE_TTL = 10 * 60
+    # answer unchanged page GETs with 304 from their content versions (ETag)
+    CONDITIONAL_GET_ENABLED = True
+    # how often the in-process course catalog re-checks the courses version
+    COURSE_CATALOG_CHECK_SECONDS = 30
+    # signed-in user identities cached by load_user (seconds until re-read)
+    USER_CACHE_ENABLED = True
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60
+    # keyset-paginated lists: default rows per page, and the most ?per_page may ask for
+    ASSIGNMENT_PAGE_SIZE = 50
+    ANNOUNCEMENT_PAGE_SIZE = 20
+    DASHBOARD_PAGE_SIZE = 25
+    MAX_PAGE_SIZE = 100
+
+    # per-request statement counts and Server-Timing headers (opt in); a
+    # statement shape repeated more than QUERY_REPEAT_THRESHOLD times in one
+    # request is logged, or raises when QUERY_REPEAT_RAISE is set
+    QUERY_COUNTER_ENABLED = bool(os.getenv("QUERY_COUNTER"))
+    QUERY_REPEAT_THRESHOLD = 10
+    QUERY_REPEAT_RAISE = False
+
+    # cold-start budgets checked by `flask startup-profile --check`; modules in
+    # STARTUP_LAZY_MODULES must only be imported on first use
+    STARTUP_BUDGET_MS = 1500
+    STARTUP_MODULE_BUDGET = 650
+    STARTUP_LAZY_MODULES = ("openai", "httpx", "pydantic", "dotenv")
+
+
+def setting(name, default):
+    """The current app's ``name`` setting, or ``default`` outside an app context."""
+    return current_app.config.get(name, default) if has_app_context() else default
@@ -0,0 +1,162 @@
+"""Seeded "golden" SQLite databases and cheap per-use copies of them.
+
+Building realistic data means ``create_all`` plus ``seed_all`` (password
+hashing, per-row commits) or a large ``seed_synthetic`` run. Instead,
+``golden_database`` builds each dataset variant once into a cache
+directory and every caller gets its own copy through the SQLite online
+backup API: ``clone_to_file`` for a file-backed database, or
+``memory_config`` for an in-memory one.
+
+Golden files are keyed by a hash of the schema DDL, the seeding code and
+the current date (demo data is dated relative to "now"), so they are
+rebuilt when any of those change and reused otherwise.
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = db_snapshots.clone_to_file("demo", tmp_path / "t.db")
+"""
+import contextlib
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import date
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app import db
+
+SEED_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "seed_demo.py")
+
+# students in the "large" variant; see seed_demo.seed_synthetic
+LARGE_STUDENTS = 2000
+
+_build_lock = threading.Lock()
+
+
+def _seed_empty():
+    pass
+
+
+def _seed_demo():
+    from seed_demo import seed_all
+    seed_all()
+
+
+def _seed_large():
+    from seed_demo import seed_synthetic
+    seed_synthetic(
+        students=LARGE_STUDENTS,
+        courses=LARGE_STUDENTS // 100,
+        assignments_per_course=12,
+        submission_density=0.5,
+        messages_per_student=4,
+    )
+
+
+VARIANTS = {
+    "empty": _seed_empty,
+    "demo": _seed_demo,
+    "large": _seed_large,
+}
+
+
+def schema_version():
+    """Short hash of the model DDL, the seeding code and today's date."""
+    from app import models  # noqa: F401  (register every table)
+
+    digest = hashlib.sha256()
+    dialect = sqlite.dialect()
+    for table in db.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    with open(SEED_SOURCE, "rb") as fh:
+        digest.update(fh.read())
+    digest.update(date.today().isoformat().encode())
+    return digest.hexdigest()[:12]
+
+
+def cache_dir():
+    path = os.getenv("SPARTANSYNC_SNAPSHOT_DIR") or os.path.join(
+        tempfile.gettempdir(), "spartansync-snapshots"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def golden_path(variant):
+    return os.path.join(cache_dir(), f"{variant}-{schema_version()}.db")
+
+
+def golden_database(variant, rebuild=False):
+    """Path of the seeded golden database for ``variant``, building it if needed.
+
+    The database is built under a temporary name and renamed into place, so
+    concurrent test processes never see a half-seeded file.
+    """
+    from app import create_app
+    from app.config import Config
+
+    if variant not in VARIANTS:
+        raise ValueError(f"unknown snapshot variant {variant!r}; choose from {sorted(VARIANTS)}")
+    path = golden_path(variant)
+    with _build_lock:
+        if os.path.exists(path) and not rebuild:
+            return path
+
+        fd, building = tempfile.mkstemp(suffix=".db", dir=cache_dir())
+        os.close(fd)
+
+        class SnapshotConfig(Config):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + building
+            JOBS_RUN_INLINE = True
+
+        app = create_app(SnapshotConfig)
+        with app.app_context():
+            db.create_all()
+            with contextlib.redirect_stdout(io.StringIO()):
+                VARIANTS[variant]()
+            db.session.remove()
+            db.engine.dispose()
+        os.replace(building, path)
+        return path
+
+
+def _copy(source_path, target):
+    source = sqlite3.connect(source_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+
+
+def clone_to_file(variant, target_path):
+    """Copy the golden ``variant`` to ``target_path``; returns its SQLAlchemy URI."""
+    target_path = os.path.abspath(str(target_path))
+    target = sqlite3.connect(target_path)
+    try:
+        _copy(golden_database(variant), target)
+    finally:
+        target.close()
+    return "sqlite:///" + target_path
+
+
+def memory_config(variant):
+    """Config overrides that give an app a private in-memory copy of ``variant``.
+
+    Every engine connection is the same in-memory database (``StaticPool``),
+    which holds the backup of the golden file.
+    """
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    _copy(golden_database(variant), connection)
+    return {
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "SQLALCHEMY_ENGINE_OPTIONS": {
+            "creator": lambda: connection,
+            "poolclass": StaticPool,
+        },
+    }
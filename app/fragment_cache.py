@@ -0,0 +1,93 @@
+"""Cache for rendered template fragments.
+
+Wrap markup in ``{% cache "name", part, ... %}...{% endcache %}``; the
+rendered HTML is stored in an in-process ``LRUCache`` under the name and
+the key parts. Routes pass a content version (see ``app.versions``) and the
+viewer's role as parts, so a write that bumps the version simply makes
+the next render use a fresh key and old entries age out of the LRU.
+Anything else the markup depends on (a student's badge, a grade) must be
+a key part too.
+
+Each app gets its own cache (``init_app``), so two apps in one process
+never share markup even when their version counters coincide, e.g. two
+databases cloned from the same snapshot. ``fragment_cache`` is the
+current app's. ``stats()`` reports hit rates and the render time hits saved.
+"""
+import threading
+import time
+
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from werkzeug.local import LocalProxy
+
+from app.cache import LRUCache
+
+
+class FragmentCache:
+    def __init__(self, maxsize=2048, ttl=600):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.saved_ms = 0.0
+        self.render_ms = 0.0
+
+    def render(self, key_parts, render):
+        """Cached markup for ``key_parts``, or the result of ``render()`` (then stored)."""
+        if not current_app.config.get("FRAGMENT_CACHE_ENABLED", True):
+            return render()
+        key = "\x1f".join(str(part) for part in key_parts)
+        cached = self._cache.get(key)
+        if cached is not None:
+            html, elapsed_ms = cached
+            with self._lock:
+                self.saved_ms += elapsed_ms
+            return Markup(html)
+
+        started = time.perf_counter()
+        html = render()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.render_ms += elapsed_ms
+        self._cache.set(key, (str(html), elapsed_ms))
+        return html
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        stats = self._cache.stats()
+        with self._lock:
+            stats["render_ms"] = round(self.render_ms, 1)
+            stats["saved_render_ms"] = round(self.saved_ms, 1)
+        return stats
+
+
+def init_app(app):
+    """Give ``app`` its own fragment cache and the ``{% cache %}`` tag."""
+    app.extensions["fragment_cache"] = FragmentCache(
+        maxsize=app.config.get("FRAGMENT_CACHE_SIZE", 2048),
+        ttl=app.config.get("FRAGMENT_CACHE_TTL", 600),
+    )
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+
+fragment_cache = LocalProxy(lambda: current_app.extensions["fragment_cache"])
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja ``{% cache name, *parts %}`` block backed by ``fragment_cache``."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, key_parts, caller):
+        return fragment_cache.render(key_parts, caller)
@@ -0,0 +1,183 @@
+"""Thread-pool job queue persisted in the ``job`` table.
+
+Handlers are registered by kind with ``@job_queue.task("kind")`` and are
+called with the job's JSON payload as keyword arguments; their return
+value is stored as the job result. ``enqueue`` commits the job row and
+returns its ID straight away, so a request never waits on the work.
+
+At most ``JOB_WORKERS`` jobs run at once per process. A handler that
+raises is retried up to ``JOB_MAX_ATTEMPTS`` times with exponential
+backoff starting at ``JOB_RETRY_BACKOFF`` seconds. Jobs still queued or
+interrupted mid-run when the process stopped are picked up again the
+first time the queue is used after a restart; a job counts as interrupted
+once it has been running for longer than ``JOB_LEASE_SECONDS``, so jobs
+another live worker is still running are left alone. With
+``JOBS_RUN_INLINE`` set (tests, serverless) jobs run synchronously inside
+``enqueue``.
+
+One queue serves every app in the process: each job runs in the app
+context of the app that enqueued it, so it always uses that app's
+database and settings.
+"""
+import logging
+import threading
+import time
+import uuid
+import weakref
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    def __init__(self):
+        self._handlers = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._recovered = weakref.WeakSet()
+
+    def init_app(self, app):
+        app.extensions["job_queue"] = self
+
+    def task(self, kind):
+        def decorator(func):
+            self._handlers[kind] = func
+            return func
+        return decorator
+
+    def _pool(self, app):
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config.get("JOB_WORKERS", 4),
+                    thread_name_prefix="job",
+                )
+            return self._executor
+
+    def enqueue(self, kind, payload, user_id=None, max_attempts=None):
+        """Persist a job and schedule it; returns the job ID."""
+        from app.models import Job
+
+        if kind not in self._handlers:
+            raise KeyError(f"no job handler registered for {kind!r}")
+        app = current_app._get_current_object()
+        self.recover()
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            payload=payload,
+            status="queued",
+            user_id=user_id,
+            max_attempts=max_attempts or app.config.get("JOB_MAX_ATTEMPTS", 3),
+        )
+        db.session.add(job)
+        db.session.commit()
+        self._dispatch(app, job.id)
+        return job.id
+
+    def get(self, job_id):
+        from app.models import Job
+
+        self.recover()
+        return db.session.get(Job, job_id)
+
+    def recover(self):
+        """Pick up jobs a previous process left behind (once per process and app).
+
+        Queued jobs are dispatched again. Running jobs are requeued only once
+        their lease (``JOB_LEASE_SECONDS`` since they were claimed) has
+        expired; a younger one may still be running in another worker.
+        """
+        from app.models import Job
+
+        app = current_app._get_current_object()
+        with self._lock:
+            if app in self._recovered:
+                return
+            self._recovered.add(app)
+        lease = timedelta(seconds=app.config.get("JOB_LEASE_SECONDS", 300))
+        Job.query.filter(
+            Job.status == "running",
+            or_(Job.started_at.is_(None), Job.started_at < datetime.utcnow() - lease),
+        ).update({Job.status: "queued"}, synchronize_session=False)
+        db.session.commit()
+        pending = [job_id for (job_id,) in db.session.query(Job.id).filter(Job.status == "queued")]
+        for job_id in pending:
+            self._dispatch(app, job_id)
+
+    def _dispatch(self, app, job_id, delay=0):
+        if app.config.get("JOBS_RUN_INLINE", False):
+            delay = self._run(app, job_id)
+            while delay is not None:
+                time.sleep(delay)
+                delay = self._run(app, job_id)
+            return
+        if delay:
+            timer = threading.Timer(
+                delay, self._pool(app).submit, args=(self._run_and_reschedule, app, job_id)
+            )
+            timer.daemon = True
+            timer.start()
+        else:
+            self._pool(app).submit(self._run_and_reschedule, app, job_id)
+
+    def _run_and_reschedule(self, app, job_id):
+        delay = self._run(app, job_id)
+        if delay is not None:
+            self._dispatch(app, job_id, delay)
+
+    def _run(self, app, job_id):
+        """Run one attempt in ``app``; returns the backoff delay when the job should be retried."""
+        from app.models import Job
+
+        with app.app_context():
+            # claim the job so two workers never run the same attempt
+            claimed = Job.query.filter_by(id=job_id, status="queued").update(
+                {
+                    Job.status: "running",
+                    Job.attempts: Job.attempts + 1,
+                    Job.started_at: datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+            db.session.commit()
+            if not claimed:
+                return None
+
+            job = db.session.get(Job, job_id)
+            handler = self._handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise KeyError(f"no job handler registered for {job.kind!r}")
+                result = handler(**job.payload)
+            except Exception as exc:
+                logger.warning("job %s (%s) attempt %s failed: %s", job.id, job.kind, job.attempts, exc)
+                db.session.rollback()
+                job = db.session.get(Job, job_id)
+                job.error = str(exc)
+                if job.attempts < job.max_attempts:
+                    job.status = "queued"
+                    db.session.commit()
+                    return app.config.get("JOB_RETRY_BACKOFF", 2.0) * 2 ** (job.attempts - 1)
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                return None
+
+            job.status = "succeeded"
+            job.result = result if result is None or isinstance(result, str) else str(result)
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            return None
+
+
+job_queue = JobQueue()
@@ -0,0 +1,323 @@
+"""Chat-completion providers behind one call path with timeouts, retries and a breaker.
+
+``get_provider()`` returns the provider named by ``LLM_PROVIDER``:
+``"openai"`` talks to the OpenAI API over one pooled HTTP client shared by
+every thread, ``"fake"`` answers deterministically without the network for
+tests and load runs. Each app has its own providers (``init_app``), so
+breaker state and settings never leak between apps. ``complete`` and
+``stream`` wrap each call in a per-call timeout, retry transient failures a
+bounded number of times with jittered exponential backoff, and go through a
+circuit breaker that fails fast with ``ProviderUnavailable`` once
+consecutive failures hit ``LLM_BREAKER_THRESHOLD``. Callers that retry on
+their own, like the job queue, pass ``retries=0`` so upstream sees one retry
+layer. Every call's latency and outcome is recorded in the provider's
+``metrics``.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+from app.config import setting
+
+
+class ProviderUnavailable(Exception):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Open after ``threshold`` consecutive failures; allow one trial call after ``reset_after`` seconds."""
+
+    def __init__(self, threshold=5, reset_after=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release(self):
+        """End a call that neither succeeded nor failed (the caller went away)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = self._clock()
+
+
+class CallMetrics:
+    """Call counters and a window of recent latencies for one provider."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.counters = {
+            "calls": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "retries": 0, "rejected": 0,
+        }
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def observe(self, seconds, ok):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.counters["succeeded" if ok else "failed"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self.counters)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000, 1)
+
+        stats["latency_ms"] = {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)}
+        return stats
+
+
+class Provider:
+    """Base class; subclasses implement ``_complete`` and ``_stream`` for one attempt."""
+
+    name = None
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            threshold=setting("LLM_BREAKER_THRESHOLD", 5),
+            reset_after=setting("LLM_BREAKER_RESET", 30.0),
+        )
+        self.metrics = CallMetrics()
+
+    def is_retryable(self, exc):
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+    def _complete(self, model, messages, timeout):
+        raise NotImplementedError
+
+    def _stream(self, model, messages, timeout):
+        raise NotImplementedError
+
+    def _backoff(self, attempt):
+        base = setting("LLM_RETRY_BACKOFF", 0.5)
+        # full jitter keeps a burst of failed callers from retrying in step
+        return random.uniform(0, base * (2 ** attempt))
+
+    def _check_breaker(self):
+        self.metrics.count("calls")
+        if not self.breaker.allow():
+            self.metrics.count("rejected")
+            raise ProviderUnavailable(f"{self.name} is failing; retry in a little while")
+
+    def _attempts(self, retries):
+        if retries is None:
+            retries = setting("LLM_MAX_RETRIES", 2)
+        return retries + 1
+
+    def _finish(self, started, ok):
+        self.metrics.observe(time.monotonic() - started, ok)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def complete(self, model, messages, timeout=None, retries=None):
+        """Return the full completion text.
+
+        ``retries`` overrides ``LLM_MAX_RETRIES`` for this call.
+        """
+        self._check_breaker()
+        timeout = timeout or setting("LLM_TIMEOUT", 20.0)
+        started = time.monotonic()
+        attempts = self._attempts(retries)
+        for attempt in range(attempts):
+            try:
+                text = self._complete(model, messages, timeout)
+            except Exception as exc:
+                if attempt + 1 < attempts and self.is_retryable(exc):
+                    self.metrics.count("retries")
+                    time.sleep(self._backoff(attempt))
+                    continue
+                self._finish(started, ok=False)
+                raise
+            self._finish(started, ok=True)
+            return text
+
+    def stream(self, model, messages, timeout=None):
+        """Yield completion text deltas.
+
+        Retries only happen before the first delta; once text has reached
+        the caller a failure is raised as is. A caller that stops reading
+        early is counted as cancelled, not as a success or failure.
+        """
+        self._check_breaker()
+        timeout = timeout or setting("LLM_TIMEOUT", 20.0)
+        started = time.monotonic()
+        attempts = self._attempts(None)
+        for attempt in range(attempts):
+            emitted = False
+            try:
+                for delta in self._stream(model, messages, timeout):
+                    emitted = True
+                    yield delta
+            except GeneratorExit:
+                self.metrics.count("cancelled")
+                self.breaker.release()
+                raise
+            except Exception as exc:
+                if not emitted and attempt + 1 < attempts and self.is_retryable(exc):
+                    self.metrics.count("retries")
+                    time.sleep(self._backoff(attempt))
+                    continue
+                self._finish(started, ok=False)
+                raise
+            self._finish(started, ok=True)
+            return
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self):
+        super().__init__()
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        """OpenAI client over one pooled ``httpx.Client``, built on first use."""
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from openai import OpenAI
+
+                pool = setting("LLM_POOL_SIZE", 10)
+                self._client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    # retries are ours, so the breaker sees every failure once
+                    max_retries=0,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=pool, max_keepalive_connections=pool
+                        ),
+                        timeout=setting("LLM_TIMEOUT", 20.0),
+                    ),
+                )
+            return self._client
+
+    def is_retryable(self, exc):
+        import openai
+
+        return super().is_retryable(exc) or isinstance(
+            exc,
+            (
+                openai.APITimeoutError,
+                openai.APIConnectionError,
+                openai.RateLimitError,
+                openai.InternalServerError,
+            ),
+        )
+
+    def _complete(self, model, messages, timeout):
+        response = self.client().chat.completions.create(
+            model=model, messages=messages, timeout=timeout
+        )
+        return response.choices[0].message.content
+
+    def _stream(self, model, messages, timeout):
+        stream = self.client().chat.completions.create(
+            model=model, messages=messages, stream=True, timeout=timeout
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeProvider(Provider):
+    """Deterministic offline answers: the same messages always give the same text."""
+
+    name = "fake"
+
+    def _text(self, messages):
+        user_content = messages[-1]["content"] if messages else ""
+        return (
+            "📚 **SpartanSync study plan**\n\n"
+            f"{user_content.strip()}\n\n"
+            "✅ Tackle the earliest due date first and check items off as you go."
+        )
+
+    def _complete(self, model, messages, timeout):
+        return self._text(messages)
+
+    def _stream(self, model, messages, timeout):
+        for word in self._text(messages).split(" "):
+            yield word + " "
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "fake": FakeProvider,
+}
+
+_lock = threading.Lock()
+
+
+def init_app(app):
+    """Give ``app`` its own provider instances, created on first use."""
+    app.extensions["llm_providers"] = {}
+
+
+def get_provider(name=None):
+    """The current app's provider instance for ``name`` (default ``LLM_PROVIDER``)."""
+    name = name or current_app.config.get("LLM_PROVIDER", "openai")
+    instances = current_app.extensions["llm_providers"]
+    with _lock:
+        provider = instances.get(name)
+        if provider is None:
+            provider = instances[name] = PROVIDERS[name]()
+        return provider
+
+
+def provider_stats():
+    with _lock:
+        providers = dict(current_app.extensions["llm_providers"])
+    return {
+        name: dict(provider.metrics.snapshot(), breaker=provider.breaker.state)
+        for name, provider in providers.items()
+    }
@@ -0,0 +1,54 @@
+"""In-process publish/subscribe broker for live message delivery.
+
+Each open ``/messages/<id>/stream`` or ``/poll`` request subscribes a
+bounded queue to its conversation's channel; routes publish a message
+payload after committing it. Delivery is per process: a subscriber is
+only woken by messages committed on the same worker. Streams re-read the
+database on every keepalive and polls on every request, so messages from
+other workers still arrive, just up to one interval later.
+"""
+import queue
+import threading
+
+
+class MessageBroker:
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channel):
+        subscription = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self._lock:
+            subscribers = self._channels.get(channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[channel]
+
+    def publish(self, channel, payload):
+        """Hand ``payload`` to every subscriber of ``channel``; returns how many got it."""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        delivered = 0
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(payload)
+                delivered += 1
+            except queue.Full:
+                # a stalled client catches up from the database when it reconnects
+                pass
+        return delivered
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._channels.get(channel, ()))
+
+
+broker = MessageBroker()
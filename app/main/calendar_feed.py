@@ -0,0 +1,163 @@
+"""iCalendar rendering and the per-user subscription feed.
+
+Feed URLs carry a signed token instead of a session so calendar apps can
+poll them. The token signs the user id together with the user's
+``feed_salt``; ``rotate_feed_token`` replaces the salt, which revokes every
+URL handed out before. Each response is validated by a strong ETag derived from the
+``app.versions`` counters of the assignments it covers, so an unchanged
+poll is answered with ``304 Not Modified`` after two small lookups and no
+assignment query. Rendered bodies are cached in-process by ETag, which
+also lets students with the same courses share one rendering; each app
+has its own body cache (``init_app``).
+"""
+import secrets
+from datetime import date, datetime, timedelta
+
+from flask import Response, current_app, stream_with_context
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.local import LocalProxy
+
+from app import db, versions
+from app.cache import LRUCache
+from app.main import enrollment
+from app.main.conditional import not_modified, set_validators
+from app.models import Assignment, User
+
+FEED_SALT = "calendar-feed"
+# stamp for assignments created before updated_at was tracked
+_UNTRACKED_STAMP = datetime(2000, 1, 1)
+
+
+def init_app(app):
+    app.extensions["calendar_feed_cache"] = LRUCache(maxsize=512)
+
+
+_feed_cache = LocalProxy(lambda: current_app.extensions["calendar_feed_cache"])
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=FEED_SALT)
+
+
+def feed_token(user):
+    """Signed feed token for ``user``, giving them a feed salt first if needed (commits)."""
+    if not user.feed_salt:
+        user.feed_salt = secrets.token_hex(8)
+        db.session.commit()
+    return _serializer().dumps([user.id, user.feed_salt])
+
+
+def rotate_feed_token(user):
+    """Revoke ``user``'s feed URLs; the caller commits."""
+    user.feed_salt = secrets.token_hex(8)
+
+
+def user_for_token(token):
+    """The user a feed token belongs to, or ``None`` if it is forged, malformed or revoked."""
+    try:
+        payload = _serializer().loads(token)
+    except BadSignature:
+        return None
+    if not isinstance(payload, list) or len(payload) != 2:
+        return None
+    user_id, salt = payload
+    user = db.session.get(User, user_id)
+    if user is None or not user.feed_salt or not secrets.compare_digest(user.feed_salt, str(salt)):
+        return None
+    return user
+
+
+def _ics_text(value):
+    return (value or "").replace("\n", "\\n").replace(";", ",")
+
+
+def ics_lines(assignments):
+    """Yield the CRLF-terminated lines of a VCALENDAR for ``assignments``.
+
+    DTSTAMP and LAST-MODIFIED come from the assignment itself, so the same
+    data always renders to the same bytes.
+    """
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield "PRODID:-//SpartanSync//Assignments//EN\r\n"
+    for a in assignments:
+        stamp = (a.updated_at or _UNTRACKED_STAMP).strftime("%Y%m%dT%H%M%SZ")
+        summary = (a.title or "Assignment").replace("\n", " ").replace(";", ",")
+        yield (
+            "BEGIN:VEVENT\r\n"
+            f"UID:assignment-{a.id}@spartansync.local\r\n"
+            f"DTSTAMP:{stamp}\r\n"
+            f"LAST-MODIFIED:{stamp}\r\n"
+            f"DTSTART:{a.due_date.strftime('%Y%m%dT%H%M%SZ')}\r\n"
+            f"SUMMARY:{summary}\r\n"
+            f"DESCRIPTION:{_ics_text(a.description)}\r\n"
+            "END:VEVENT\r\n"
+        )
+    yield "END:VCALENDAR\r\n"
+
+
+def assignments_between(user, start, end=None):
+    """Assignments visible to ``user`` due in ``[start, end)``, filtered in SQL."""
+    query = Assignment.query.filter(Assignment.due_date >= start)
+    if end is not None:
+        query = query.filter(Assignment.due_date < end)
+    if user.role == "student":
+        query = query.filter(
+            Assignment.course_id.is_(None)
+            | Assignment.course_id.in_(enrollment.enrolled_course_subquery(user.id))
+        )
+    return query.order_by(Assignment.due_date.asc(), Assignment.id.asc())
+
+
+def feed_window_start(today=None):
+    """Start of the feed: the first of the month ``CALENDAR_FEED_HISTORY_DAYS`` ago.
+
+    Snapping to the month keeps the body (and its ETag) unchanged between
+    polls for weeks at a time.
+    """
+    days = current_app.config.get("CALENDAR_FEED_HISTORY_DAYS", 120)
+    start = (today or date.today()) - timedelta(days=days)
+    return datetime(start.year, start.month, 1)
+
+
+def feed_validators(user, window_start):
+    """``(etag, last_modified)`` for ``user``'s feed starting at ``window_start``."""
+    if user.role == "student":
+        course_ids = sorted(enrollment.enrolled_course_ids(user.id))
+        keys = [versions.course_key(versions.ASSIGNMENTS, None)]
+        keys += [versions.course_key(versions.ASSIGNMENTS, c) for c in course_ids]
+        extra = ("student", ",".join(map(str, course_ids)))
+    else:
+        keys = [versions.ASSIGNMENTS]
+        extra = ("all",)
+    current = versions.current(keys)
+    etag = versions.fingerprint(current, window_start.isoformat(), *extra)
+    return etag, versions.last_modified(current)
+
+
+def serve_feed(user):
+    """Conditional, streamed ICS response for ``user``'s subscription feed."""
+    window_start = feed_window_start()
+    etag, last_modified = feed_validators(user, window_start)
+
+    if not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        body = _feed_cache.get(etag)
+        if body is None:
+            body = stream_with_context(_render_and_cache(etag, assignments_between(user, window_start)))
+        response = Response(body, mimetype="text/calendar")
+
+    return set_validators(response, etag, last_modified)
+
+
+def _render_and_cache(etag, query):
+    chunks = []
+    for chunk in ics_lines(query.yield_per(500)):
+        chunks.append(chunk)
+        yield chunk
+    _feed_cache.set(etag, "".join(chunks))
+
+
+def cache_stats():
+    return _feed_cache.stats()
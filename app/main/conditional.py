@@ -0,0 +1,76 @@
+"""Conditional GET (ETag / Last-Modified) for read-heavy pages.
+
+``conditional_get`` wraps a view with a validator function that names the
+``app.versions`` keys the page depends on. Each GET looks those versions
+up with one small query and folds them, the viewer's id and role and any
+extra parts into an ETag. When the browser's ``If-None-Match`` (or
+``If-Modified-Since``) still matches, the view is skipped entirely and a
+bodyless 304 goes back, before any ORM loading or template rendering.
+"""
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, make_response, request
+from flask_login import current_user
+
+from app import versions
+
+
+def not_modified(etag, last_modified):
+    """Whether the request's validators still match ``etag`` / ``last_modified``."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    if since and last_modified:
+        return since >= last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    """Attach the validators and make browsers revalidate instead of reusing blindly."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_get(validators):
+    """Answer GETs of the view with 304 while its content versions are unchanged.
+
+    ``validators(**view_args)`` returns ``(keys, extra, modified)``: the version
+    keys the page reads, extra ETag parts (anything else the HTML depends
+    on) and an optional datetime that also counts as a modification, such
+    as the moment a due date last passed.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or not current_app.config.get("CONDITIONAL_GET_ENABLED", True):
+                return view(*args, **kwargs)
+
+            keys, extra, modified = validators(**kwargs)
+            current = versions.current(keys)
+            etag = versions.fingerprint(
+                current,
+                current_user.id,
+                current_user.role,
+                modified,
+                request.query_string.decode(),  # page cursors
+                *extra,
+            )
+            stamps = [s for s in (versions.last_modified(current), modified) if s]
+            last_modified = max(stamps) if stamps else None
+
+            if not_modified(etag, last_modified):
+                return set_validators(current_app.response_class(status=304), etag, last_modified)
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, etag, last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
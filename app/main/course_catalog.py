@@ -0,0 +1,111 @@
+"""In-process catalog of every course as immutable records.
+
+The course list is read on nearly every page (course cards, dropdowns,
+class management) but changes a few times a term. ``course_catalog``
+keeps the whole catalog as ``CourseRecord`` tuples, sorted by name and
+indexed by id. It is loaded with one query on the first request of the
+process and reloaded when the ``courses`` version in ``app.versions``
+moves. That version is checked at most every ``COURSE_CATALOG_CHECK_SECONDS``,
+so reads in between run no SQL at all; ``course_create`` invalidates the
+local copy right away, and a lookup of an unknown id always re-checks so a
+course created by another worker is found immediately. Each app keeps its
+own catalog (``init_app``); ``course_catalog`` is the current app's.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.local import LocalProxy
+
+from app import db, versions
+from app.models import Course
+
+logger = logging.getLogger(__name__)
+
+CourseRecord = namedtuple("CourseRecord", "id course_name course_code description")
+
+
+class CourseCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = None
+        self._by_id = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.loads = 0
+        self.checks = 0
+
+    def _load(self, version):
+        rows = db.session.query(
+            Course.id, Course.course_name, Course.course_code, Course.description
+        ).order_by(Course.course_name).all()
+        records = tuple(CourseRecord(*row) for row in rows)
+        self._records = records
+        self._by_id = {record.id: record for record in records}
+        self._version = version
+        self.loads += 1
+
+    def _refresh(self, force_check=False):
+        """Load or re-validate the catalog; returns ``(records, by_id)``."""
+        with self._lock:
+            interval = current_app.config.get("COURSE_CATALOG_CHECK_SECONDS", 30)
+            now = time.monotonic()
+            if self._records is not None and not force_check and now - self._checked_at < interval:
+                return self._records, self._by_id
+            # (number, updated_at) so a recreated database never matches a stale copy
+            version = versions.current([versions.COURSES])[versions.COURSES]
+            self.checks += 1
+            if self._records is None or version != self._version:
+                self._load(version)
+            self._checked_at = now
+            return self._records, self._by_id
+
+    def all(self):
+        """Every course, sorted by name."""
+        return self._refresh()[0]
+
+    def get(self, course_id):
+        """The course with ``course_id``, or ``None``."""
+        record = self._refresh()[1].get(course_id)
+        if record is None:
+            record = self._refresh(force_check=True)[1].get(course_id)
+        return record
+
+    def invalidate(self):
+        with self._lock:
+            self._records = None
+            self._by_id = {}
+
+    def warm(self):
+        try:
+            self._refresh(force_check=True)
+        except SQLAlchemyError:
+            # no schema yet (e.g. before seed-demo); the first read loads it
+            db.session.rollback()
+            logger.debug("course catalog not warmed", exc_info=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "courses": len(self._by_id),
+                "loads": self.loads,
+                "version_checks": self.checks,
+            }
+
+
+def init_app(app):
+    """Give ``app`` its own empty catalog and warm it on the first request."""
+    catalog = app.extensions["course_catalog"] = CourseCatalog()
+    warmed = threading.Event()
+
+    @app.before_request
+    def _warm_course_catalog():
+        if not warmed.is_set():
+            warmed.set()
+            catalog.warm()
+
+
+course_catalog = LocalProxy(lambda: current_app.extensions["course_catalog"])
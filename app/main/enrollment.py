@@ -0,0 +1,101 @@
+"""Course enrollment backed by the indexed ``Enrollment`` table.
+
+Enrollment used to live in the ``Classes.classes`` JSON blob, whose entries
+could be ints, digit strings or dicts. ``migrate_classes`` converts those
+rows once; everything else reads and writes ``Enrollment`` directly.
+
+``Enrollment.role`` copies ``User.role``; ``init_app`` keeps the copy in step
+when a user's role changes through the ORM.
+"""
+from sqlalchemy import event, inspect, update
+
+from app import db
+from app.models import Classes, Course, Enrollment, User
+
+
+def enrolled_course_ids(user_id):
+    rows = db.session.query(Enrollment.course_id).filter(Enrollment.user_id == user_id).all()
+    return [course_id for (course_id,) in rows]
+
+
+def enrolled_course_subquery(user_id):
+    """Course IDs of ``user_id`` as a subquery, for use in ``in_()`` joins."""
+    return db.session.query(Enrollment.course_id).filter(Enrollment.user_id == user_id)
+
+
+def update_enrollment(user, course_ids):
+    """Make ``user`` enrolled in exactly ``course_ids`` by writing only the difference.
+
+    Returns ``(added, removed)`` sets of course IDs. The caller commits.
+    """
+    wanted = set(course_ids)
+    current = set(enrolled_course_ids(user.id))
+    added = wanted - current
+    removed = current - wanted
+
+    if removed:
+        Enrollment.query.filter(
+            Enrollment.user_id == user.id,
+            Enrollment.course_id.in_(removed),
+        ).delete(synchronize_session=False)
+    db.session.add_all(
+        Enrollment(user_id=user.id, course_id=course_id, role=user.role)
+        for course_id in sorted(added)
+    )
+    return added, removed
+
+
+def _sync_role(mapper, connection, target):
+    # same flush as the user row, so the enrollments commit or roll back with it
+    if inspect(target).attrs.role.history.has_changes():
+        connection.execute(
+            update(Enrollment.__table__)
+            .where(Enrollment.__table__.c.user_id == target.id)
+            .values(role=target.role)
+        )
+
+
+def init_app(app):
+    if not event.contains(User, "after_update", _sync_role):
+        event.listen(User, "after_update", _sync_role)
+
+
+def legacy_course_ids(entries):
+    """Course IDs referenced by a ``Classes.classes`` blob, in order."""
+    selected = []
+    for entry in entries or []:
+        if isinstance(entry, int):
+            selected.append(entry)
+        elif isinstance(entry, str) and entry.isdigit():
+            selected.append(int(entry))
+        elif isinstance(entry, dict):
+            course_id = entry.get("course_id") or entry.get("id")
+            if isinstance(course_id, int) or (isinstance(course_id, str) and course_id.isdigit()):
+                selected.append(int(course_id))
+    return selected
+
+
+def migrate_classes():
+    """Copy every ``Classes`` row into ``Enrollment`` (safe to run more than once).
+
+    Returns ``(created, skipped)`` where ``skipped`` counts references to
+    courses that no longer exist.
+    """
+    known_courses = {course_id for (course_id,) in db.session.query(Course.id).all()}
+    existing = set(db.session.query(Enrollment.user_id, Enrollment.course_id).all())
+    roles = dict(db.session.query(User.id, User.role).all())
+
+    created = skipped = 0
+    for record in Classes.query.all():
+        for course_id in legacy_course_ids(record.classes):
+            if course_id not in known_courses or record.user not in roles:
+                skipped += 1
+                continue
+            if (record.user, course_id) in existing:
+                continue
+            db.session.add(Enrollment(user_id=record.user, course_id=course_id, role=roles[record.user]))
+            existing.add((record.user, course_id))
+            created += 1
+
+    db.session.commit()
+    return created, skipped
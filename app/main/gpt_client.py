@@ -1,9 +1,12 @@
-from openai import OpenAI
 import os
 from dotenv import load_dotenv
+
+from app.main.ai_providers import ProviderUnavailable, get_provider
+from app.main.llm_cache import cache_key, response_cache
+
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODEL = "gpt-4.1-mini"
 
 SYSTEM_PROMPT = (
     "You are a friendly study assistant. "
@@ -11,18 +14,80 @@ SYSTEM_PROMPT = (
     "You need to provide a simple plan for completing them all on time, this means you should also include a short few advice section at the end on how to stay organized and manage time effectively. Also ensure to reference the apps name 'SpartanSync'"
     "Use emojis and keep it concise. Also make sure to create new lines when needed rather than one long paragraph."
 )
-def ask_chatgpt(comments: str, assignments: str) -> str:
-    if not os.getenv("OPENAI_API_KEY"):
-        return "Warning: Contact your administrator. OpenAI features are disabled until key is setup."
-    else:
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": f"{comments}\n\nAssignments:\n{assignments}"}
-                ]
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Warning: ChatGPT request failed: {e}"
+
+MISSING_KEY_WARNING = "Warning: Contact your administrator. OpenAI features are disabled until key is setup."
+UNAVAILABLE_WARNING = "Warning: ChatGPT is temporarily unavailable. Please try again in a minute."
+
+
+def _messages(user_content):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_content}
+    ]
+
+
+def _missing_key(provider):
+    return provider.name == "openai" and not os.getenv("OPENAI_API_KEY")
+
+
+def complete_study_plan(comments: str, assignments: str, provider=None, retries=None) -> str:
+    """The study plan text; provider failures propagate (``ProviderUnavailable`` and others).
+
+    Background jobs call this directly, with ``retries=0``, so a failed call
+    is retried by the job queue and finally marked failed instead of being
+    stored as the plan.
+    """
+    provider = get_provider(provider)
+    if _missing_key(provider):
+        return MISSING_KEY_WARNING
+    user_content = f"{comments}\n\nAssignments:\n{assignments}"
+
+    def complete():
+        return provider.complete(MODEL, _messages(user_content), retries=retries)
+
+    # identical prompts share one cached answer (and one in-flight call)
+    return response_cache.get_or_compute(
+        cache_key(MODEL, SYSTEM_PROMPT, user_content), MODEL, complete
+    )
+
+
+def ask_chatgpt(comments: str, assignments: str, provider=None) -> str:
+    """Like ``complete_study_plan`` but failures come back as a warning to show the user."""
+    try:
+        return complete_study_plan(comments, assignments, provider)
+    except ProviderUnavailable:
+        return UNAVAILABLE_WARNING
+    except Exception as e:
+        return f"Warning: ChatGPT request failed: {e}"
+
+
+def stream_chatgpt(comments: str, assignments: str, provider=None):
+    """Yield the study plan piece by piece as it is generated.
+
+    A cached answer is yielded whole; a freshly streamed one is stored in
+    the response cache once it completes, so ``ask_chatgpt`` reuses it.
+    """
+    provider = get_provider(provider)
+    if _missing_key(provider):
+        yield MISSING_KEY_WARNING
+        return
+
+    user_content = f"{comments}\n\nAssignments:\n{assignments}"
+    key = cache_key(MODEL, SYSTEM_PROMPT, user_content)
+    cached = response_cache.lookup(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        for token in provider.stream(MODEL, _messages(user_content)):
+            parts.append(token)
+            yield token
+    except ProviderUnavailable:
+        yield UNAVAILABLE_WARNING
+        return
+    except Exception as e:
+        yield f"\n\nWarning: ChatGPT request failed: {e}"
+        return
+    response_cache.store(key, MODEL, "".join(parts))
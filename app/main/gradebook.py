@@ -0,0 +1,280 @@
+"""Materialized gradebook kept in step with grading writes.
+
+Each ``GradebookEntry`` row holds the earned/possible points of one student
+in one course for one assignment category. Routes that change a graded
+submission or an assignment apply the delta here before they commit, so the
+aggregate lands in the same transaction as the write that caused it.
+"""
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import Assignment, Submission, GradebookEntry
+
+DEFAULT_GRADE_WEIGHTS = {
+    "homework": 30,
+    "exam": 50,
+    "project": 20,
+}
+
+
+def grade_weights():
+    return current_app.config.get("GRADE_WEIGHTS", DEFAULT_GRADE_WEIGHTS)
+
+
+def counted_score(submission):
+    """Score that currently contributes to the gradebook, or None."""
+    if submission.status == "Graded" and submission.score is not None:
+        return submission.score
+    return None
+
+
+def _apply_deltas(course_id, category, deltas):
+    """Add ``{student_id: (earned, possible)}`` to one course/category."""
+    if course_id is None or not deltas:
+        return
+
+    existing = {
+        entry.student_id: entry
+        for entry in GradebookEntry.query.filter(
+            GradebookEntry.course_id == course_id,
+            GradebookEntry.category == category,
+            GradebookEntry.student_id.in_(list(deltas)),
+        ).all()
+    }
+    for student_id, (earned, possible) in deltas.items():
+        entry = existing.get(student_id)
+        if entry is None:
+            entry = GradebookEntry(
+                student_id=student_id,
+                course_id=course_id,
+                category=category,
+                earned=0,
+                possible=0,
+            )
+            db.session.add(entry)
+        entry.earned += earned
+        entry.possible += possible
+        if entry.earned == 0 and entry.possible == 0 and entry.id is not None:
+            db.session.delete(entry)
+
+
+def record_submission_change(submission, previous_score=None):
+    """Move a submission's contribution from ``previous_score`` to its current grade.
+
+    ``previous_score`` is the score that was counted before the change
+    (None when the submission was not graded yet).
+    """
+    assignment = submission.assignment
+    current_score = counted_score(submission)
+    earned = possible = 0
+    if previous_score is not None:
+        earned -= previous_score
+        possible -= assignment.points
+    if current_score is not None:
+        earned += current_score
+        possible += assignment.points
+    if earned or possible:
+        _apply_deltas(
+            assignment.course_id,
+            assignment.category,
+            {submission.student_id: (earned, possible)},
+        )
+
+
+def _graded_totals_for(assignment_id):
+    rows = db.session.query(Submission.student_id, Submission.score).filter(
+        Submission.assignment_id == assignment_id,
+        Submission.status == "Graded",
+        Submission.score.isnot(None),
+    ).all()
+    return {student_id: score for student_id, score in rows}
+
+
+def record_assignment_change(assignment, old_points=None, old_category=None, old_course_id=None):
+    """Re-home every graded submission after an assignment's points, category or course change."""
+    old_points = assignment.points if old_points is None else old_points
+    old_category = old_category or assignment.category
+    old_course_id = assignment.course_id if old_course_id is None else old_course_id
+    if (old_points, old_category, old_course_id) == (
+        assignment.points, assignment.category, assignment.course_id
+    ):
+        return
+
+    scores = _graded_totals_for(assignment.id)
+    _apply_deltas(
+        old_course_id,
+        old_category,
+        {sid: (-score, -old_points) for sid, score in scores.items()},
+    )
+    _apply_deltas(
+        assignment.course_id,
+        assignment.category,
+        {sid: (score, assignment.points) for sid, score in scores.items()},
+    )
+
+
+def remove_assignment(assignment):
+    """Drop an assignment's graded submissions from the gradebook (call before deleting them)."""
+    scores = _graded_totals_for(assignment.id)
+    _apply_deltas(
+        assignment.course_id,
+        assignment.category,
+        {sid: (-score, -assignment.points) for sid, score in scores.items()},
+    )
+
+
+def summarize_categories(totals, weights=None):
+    """Turn ``{category: (earned, possible)}`` into the weighted-grade payload."""
+    weights = weights or grade_weights()
+
+    category_data = {cat: {"earned": 0, "possible": 0} for cat in weights.keys()}
+    for cat, (earned, possible) in totals.items():
+        cat = cat if cat in weights else "homework"
+        category_data[cat]["earned"] += earned
+        category_data[cat]["possible"] += possible
+
+    total_weighted = 0
+    total_weight_used = 0
+    category_grades = {}
+    for cat, data in category_data.items():
+        if data["possible"] > 0:
+            percentage = (data["earned"] / data["possible"]) * 100
+            category_grades[cat] = {
+                "earned": data["earned"],
+                "possible": data["possible"],
+                "percentage": round(percentage, 1),
+            }
+            total_weighted += percentage * weights[cat]
+            total_weight_used += weights[cat]
+
+    final_grade = total_weighted / total_weight_used if total_weight_used > 0 else None
+    return {
+        "grade": round(final_grade, 1) if final_grade is not None else None,
+        "category_grades": category_grades,
+        "has_grades": total_weight_used > 0,
+    }
+
+
+def _grade_payloads(course_ids, rows):
+    """Build ``{course_id: payload}`` from ``(course_id, category, earned, possible)`` rows."""
+    totals = {course_id: {} for course_id in course_ids}
+    for course_id, category, earned, possible in rows:
+        totals[course_id][category] = (int(earned), int(possible))
+
+    weights = grade_weights()
+    return {
+        course_id: summarize_categories(cats, weights) if cats else
+        {"grade": None, "category_grades": {}, "has_grades": False}
+        for course_id, cats in totals.items()
+    }
+
+
+def weighted_grades(student_id, course_ids):
+    """Weighted grade payload for each course in ``course_ids``, read from the gradebook in one query."""
+    course_ids = set(course_ids)
+    if not course_ids:
+        return {}
+
+    rows = db.session.query(
+        GradebookEntry.course_id,
+        GradebookEntry.category,
+        GradebookEntry.earned,
+        GradebookEntry.possible,
+    ).filter(
+        GradebookEntry.student_id == student_id,
+        GradebookEntry.course_id.in_(course_ids),
+    ).all()
+    return _grade_payloads(course_ids, rows)
+
+
+def _graded_totals_query(student_id=None, course_ids=None):
+    """Earned/possible sums of graded submissions grouped by student, course and category."""
+    query = db.session.query(
+        Submission.student_id,
+        Assignment.course_id,
+        Assignment.category,
+        func.sum(Submission.score),
+        func.sum(Assignment.points),
+    ).join(Assignment, Submission.assignment_id == Assignment.id).filter(
+        Submission.status == "Graded",
+        Submission.score.isnot(None),
+        Assignment.course_id.isnot(None),
+    )
+    if student_id is not None:
+        query = query.filter(Submission.student_id == student_id)
+    if course_ids is not None:
+        query = query.filter(Assignment.course_id.in_(course_ids))
+    return query.group_by(
+        Submission.student_id, Assignment.course_id, Assignment.category
+    )
+
+
+def compute_weighted_grades(student_id, course_ids):
+    """Weighted grade payload for each course, computed live from submissions in one query.
+
+    Returns the same payloads as the materialized ``weighted_grades`` but
+    reads the source tables, so it never depends on the gradebook being
+    up to date.
+    """
+    course_ids = set(course_ids)
+    if not course_ids:
+        return {}
+
+    rows = _graded_totals_query(student_id, course_ids).all()
+    return _grade_payloads(
+        course_ids,
+        ((course_id, category, earned, possible) for _, course_id, category, earned, possible in rows),
+    )
+
+
+def _computed_totals():
+    return {
+        (student_id, course_id, category): (int(earned), int(possible))
+        for student_id, course_id, category, earned, possible in _graded_totals_query().all()
+    }
+
+
+def rebuild_gradebook(check_only=False):
+    """Recompute every aggregate from submissions and report drifted keys.
+
+    Returns the list of ``(student_id, course_id, category)`` keys whose
+    stored totals differed from the recomputed ones. Unless ``check_only``
+    is set, the table is replaced with the recomputed totals.
+    """
+    computed = _computed_totals()
+    stored = {
+        (student_id, course_id, category): (earned, possible)
+        for student_id, course_id, category, earned, possible in db.session.query(
+            GradebookEntry.student_id,
+            GradebookEntry.course_id,
+            GradebookEntry.category,
+            GradebookEntry.earned,
+            GradebookEntry.possible,
+        ).all()
+    }
+    drift = sorted(
+        key for key in set(computed) | set(stored)
+        if computed.get(key, (0, 0)) != stored.get(key, (0, 0))
+    )
+
+    if not check_only:
+        GradebookEntry.query.delete(synchronize_session=False)
+        if computed:
+            # one executemany instead of an ORM object per row
+            db.session.execute(
+                GradebookEntry.__table__.insert(),
+                [
+                    {
+                        "student_id": student_id,
+                        "course_id": course_id,
+                        "category": category,
+                        "earned": earned,
+                        "possible": possible,
+                    }
+                    for (student_id, course_id, category), (earned, possible) in computed.items()
+                ],
+            )
+        db.session.commit()
+
+    return drift
@@ -0,0 +1,246 @@
+"""Inbox summary and denormalized conversation counters.
+
+``Conversation`` carries ``last_message_id``, ``last_message_at`` and
+``message_count`` and each ``ConversationParticipant`` carries its
+``unread_count``. ``record_message`` and ``mark_read`` keep them current in
+the same transaction as the write; ``repair_counters`` recomputes them.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import aliased, contains_eager, joinedload
+
+from app import db
+from app.models import Conversation, ConversationParticipant, Message, User
+
+
+def inbox_page(user_id, page=1, per_page=50):
+    """One page of ``user_id``'s conversations, newest activity first.
+
+    Returns ``(items, has_next)`` where each item is a dict with the
+    ``conversation``, its ``last_message`` (sender loaded) and the
+    ``unread`` count, matching what ``messages/inbox.html`` expects.
+    Everything comes from one statement over the denormalized counters,
+    so no message rows beyond each conversation's last one are read.
+    """
+    page = max(page, 1)
+    part = aliased(ConversationParticipant)
+    last_message = aliased(Message)
+    sender = aliased(User)
+
+    rows = (
+        db.session.query(Conversation, last_message, sender, part.unread_count)
+        .join(part, (part.conversation_id == Conversation.id) & (part.user_id == user_id))
+        .outerjoin(last_message, last_message.id == Conversation.last_message_id)
+        .outerjoin(sender, sender.id == last_message.sender_id)
+        .options(contains_eager(last_message.sender.of_type(sender)))
+        .order_by(
+            func.coalesce(Conversation.last_message_at, Conversation.created_at).desc(),
+            Conversation.id.desc(),
+        )
+        .limit(per_page + 1)
+        .offset((page - 1) * per_page)
+        .all()
+    )
+
+    items = [
+        {"conversation": conv, "last_message": last, "unread": count}
+        for conv, last, _sender, count in rows[:per_page]
+    ]
+    return items, len(rows) > per_page
+
+
+def message_history(conversation_id, before_id=None, limit=50):
+    """The ``limit`` newest messages of a conversation older than ``before_id``.
+
+    Keyset pagination on ``(created_at, id)``: the cursor is the ID of the
+    oldest message already shown, so each window costs one indexed range
+    read however long the thread is. Returns ``(messages, has_older)``
+    with messages oldest first and their senders loaded.
+    """
+    query = Message.query.options(joinedload(Message.sender)).filter(
+        Message.conversation_id == conversation_id
+    )
+    if before_id is not None:
+        cursor = db.session.query(Message.created_at, Message.id).filter(
+            Message.id == before_id,
+            Message.conversation_id == conversation_id,
+        ).first()
+        if cursor is None:
+            return [], False
+        query = query.filter(
+            or_(
+                Message.created_at < cursor.created_at,
+                and_(Message.created_at == cursor.created_at, Message.id < cursor.id),
+            )
+        )
+
+    rows = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    has_older = len(rows) > limit
+    return list(reversed(rows[:limit])), has_older
+
+
+def messages_after(conversation_id, after_id, limit=100):
+    """Messages with an ID above ``after_id``, oldest first (for live catch-up)."""
+    return (
+        Message.query.options(joinedload(Message.sender))
+        .filter(Message.conversation_id == conversation_id, Message.id > after_id)
+        .order_by(Message.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def message_payload(message):
+    return {
+        "id": message.id,
+        "conversation_id": message.conversation_id,
+        "sender_id": message.sender_id,
+        "sender": message.sender.username if message.sender else None,
+        "body": message.body,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+    }
+
+
+def record_message(message):
+    """Bump the conversation counters for a newly added ``message``.
+
+    Uses in-place SQL increments so concurrent senders cannot lose
+    updates. The sender's own participant row is marked read up to the
+    message; every other participant's unread count goes up by one.
+    The caller commits.
+    """
+    if message.created_at is None:
+        message.created_at = datetime.utcnow()
+    db.session.flush()
+
+    Conversation.query.filter(Conversation.id == message.conversation_id).update(
+        {
+            Conversation.message_count: Conversation.message_count + 1,
+            Conversation.last_message_id: message.id,
+            Conversation.last_message_at: message.created_at,
+        },
+        synchronize_session=False,
+    )
+    ConversationParticipant.query.filter(
+        ConversationParticipant.conversation_id == message.conversation_id,
+        ConversationParticipant.user_id != message.sender_id,
+    ).update(
+        {ConversationParticipant.unread_count: ConversationParticipant.unread_count + 1},
+        synchronize_session=False,
+    )
+    ConversationParticipant.query.filter(
+        ConversationParticipant.conversation_id == message.conversation_id,
+        ConversationParticipant.user_id == message.sender_id,
+    ).update(
+        {
+            ConversationParticipant.last_read_at: message.created_at,
+            ConversationParticipant.unread_count: 0,
+        },
+        synchronize_session=False,
+    )
+
+
+def mark_read(part, when=None):
+    """Advance ``part.last_read_at`` and recount what is still unread after it."""
+    part.last_read_at = when or datetime.utcnow()
+    part.unread_count = _unread_query(
+        part.conversation_id, part.user_id, part.last_read_at
+    ).scalar()
+
+
+def mark_read_through(conversation_id, user_id, message_id):
+    """Mark ``user_id``'s side of a conversation read up to a message shown live.
+
+    Never moves ``last_read_at`` backwards. The caller commits.
+    """
+    part = ConversationParticipant.query.filter_by(
+        conversation_id=conversation_id, user_id=user_id
+    ).first()
+    created_at = db.session.query(Message.created_at).filter(Message.id == message_id).scalar()
+    if part is None or created_at is None:
+        return
+    if part.last_read_at is None or created_at > part.last_read_at:
+        mark_read(part, when=created_at)
+
+
+def _unread_query(conversation_id, user_id, last_read_at):
+    query = db.session.query(func.count(Message.id)).filter(
+        Message.conversation_id == conversation_id,
+        Message.sender_id != user_id,
+    )
+    if last_read_at is not None:
+        query = query.filter(Message.created_at > last_read_at)
+    return query
+
+
+def repair_counters():
+    """Recompute every conversation and participant counter from messages.
+
+    Returns ``(conversations, participants)`` counts of rows that were
+    out of date.
+    """
+    last_message_id = (
+        db.session.query(Message.id)
+        .filter(Message.conversation_id == Conversation.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    message_count = (
+        db.session.query(func.count(Message.id))
+        .filter(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    last_message = aliased(Message)
+    rows = (
+        db.session.query(
+            Conversation.id,
+            Conversation.last_message_id,
+            Conversation.last_message_at,
+            Conversation.message_count,
+            last_message.id,
+            last_message.created_at,
+            message_count,
+        )
+        .outerjoin(last_message, last_message.id == last_message_id)
+        .all()
+    )
+    # only rows that drifted are written, as one executemany per table
+    stale_conversations = [
+        {"id": conv_id, "last_message_id": last_id, "last_message_at": last_at, "message_count": count}
+        for conv_id, stored_id, stored_at, stored_count, last_id, last_at, count in rows
+        if (stored_id, stored_at, stored_count) != (last_id, last_at, count)
+    ]
+    if stale_conversations:
+        db.session.execute(update(Conversation), stale_conversations)
+
+    unread = (
+        db.session.query(func.count(Message.id))
+        .filter(
+            Message.conversation_id == ConversationParticipant.conversation_id,
+            Message.sender_id != ConversationParticipant.user_id,
+            or_(
+                ConversationParticipant.last_read_at.is_(None),
+                Message.created_at > ConversationParticipant.last_read_at,
+            ),
+        )
+        .correlate(ConversationParticipant)
+        .scalar_subquery()
+    )
+    stale_participants = [
+        {"id": part_id, "unread_count": count}
+        for part_id, stored, count in db.session.query(
+            ConversationParticipant.id, ConversationParticipant.unread_count, unread
+        ).all()
+        if stored != count
+    ]
+    if stale_participants:
+        db.session.execute(update(ConversationParticipant), stale_participants)
+
+    conversations = len(stale_conversations)
+    participants = len(stale_participants)
+    db.session.commit()
+    return conversations, participants
@@ -0,0 +1,189 @@
+"""Content-addressed cache for LLM responses.
+
+Keys are a SHA-256 of the model, system prompt and user content, so the
+same prompt asked by a whole class hits one entry. Lookups go through an
+in-memory LRU first and then the ``llm_cache_entry`` table, which
+survives restarts and is shared by every worker. Concurrent misses on
+the same key are coalesced: one caller computes, the rest wait for its
+result. Failed computations are not cached.
+
+The table tier uses its own connection, so it never commits (or rolls
+back) the caller's session. Lookups only read: the last-used times they
+update for the table's LRU cap are written with the next store, which is
+also when expired rows are deleted. Each app has its own cache
+(``init_app``); ``response_cache`` is the current app's.
+"""
+import hashlib
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, insert, select, update
+from werkzeug.local import LocalProxy
+
+from app import db
+from app.cache import LRUCache
+
+
+def cache_key(model, system_prompt, user_content):
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, user_content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _table():
+    from app.models import LLMCacheEntry
+
+    return LLMCacheEntry.__table__
+
+
+class ResponseCache:
+    def __init__(self, memory_size=256, ttl=6 * 60 * 60, db_size=5000):
+        self.ttl = ttl
+        self.db_size = db_size
+        self._memory = LRUCache(maxsize=memory_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._touched = {}  # key -> last read from the table, written on the next store
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "coalesced": 0, "stores": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _db_get(self, key):
+        table = _table()
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.response, table.c.expires_at).where(table.c.key == key)
+            ).first()
+        now = datetime.utcnow()
+        if row is None or row.expires_at <= now:
+            return None
+        with self._lock:
+            self._touched[key] = now
+        return row.response
+
+    def _db_set(self, key, model, response):
+        table = _table()
+        now = datetime.utcnow()
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        with db.engine.begin() as conn:
+            if touched:
+                conn.execute(
+                    update(table).where(table.c.key == bindparam("touched_key"))
+                    .values(last_used_at=bindparam("touched_at")),
+                    [{"touched_key": k, "touched_at": when} for k, when in touched.items()],
+                )
+            conn.execute(delete(table).where(table.c.key == key))
+            conn.execute(insert(table).values(
+                key=key,
+                model=model,
+                response=response,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl),
+                last_used_at=now,
+            ))
+            self._db_evict(conn, now)
+
+    def _db_evict(self, conn, now):
+        """Drop expired rows, then the least recently used ones beyond the size cap."""
+        table = _table()
+        conn.execute(delete(table).where(table.c.expires_at <= now))
+        cutoff = conn.execute(
+            select(table.c.last_used_at)
+            .order_by(table.c.last_used_at.desc())
+            .offset(self.db_size)
+            .limit(1)
+        ).scalar()
+        if cutoff is not None:
+            conn.execute(delete(table).where(table.c.last_used_at <= cutoff))
+
+    def lookup(self, key):
+        """Cached response for ``key`` from either tier, or None (counted as a miss)."""
+        memory = self._memory
+        cached = memory.get(key)
+        if cached is not None:
+            self._count("memory_hits")
+            return cached
+        cached = self._db_get(key)
+        if cached is not None:
+            self._count("db_hits")
+            memory.set(key, cached)
+            return cached
+        self._count("misses")
+        return None
+
+    def store(self, key, model, response):
+        self._db_set(key, model, response)
+        self._memory.set(key, response)
+        self._count("stores")
+
+    def get_or_compute(self, key, model, compute):
+        """Return the cached response for ``key`` or the result of ``compute()``."""
+        memory = self._memory
+        cached = memory.get(key)
+        if cached is not None:
+            self._count("memory_hits")
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            response = self._db_get(key)
+            if response is not None:
+                self._count("db_hits")
+            else:
+                self._count("misses")
+                response = compute()
+                self._db_set(key, model, response)
+                self._count("stores")
+            memory.set(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        self._memory.clear()
+        with self._lock:
+            self._touched.clear()
+        with db.engine.begin() as conn:
+            conn.execute(delete(_table()))
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        counters["hit_rate"] = (
+            round((counters["memory_hits"] + counters["db_hits"]) / lookups, 3) if lookups else None
+        )
+        counters["memory"] = self._memory.stats()
+        return counters
+
+
+def init_app(app):
+    """Give ``app`` its own response cache, sized from its config."""
+    app.extensions["llm_response_cache"] = ResponseCache(
+        memory_size=app.config.get("LLM_CACHE_MEMORY_SIZE", 256),
+        ttl=app.config.get("LLM_CACHE_TTL", 6 * 60 * 60),
+        db_size=app.config.get("LLM_CACHE_DB_SIZE", 5000),
+    )
+
+
+response_cache = LocalProxy(lambda: current_app.extensions["llm_response_cache"])
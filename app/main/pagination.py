@@ -0,0 +1,124 @@
+"""Keyset pagination for long, date-ordered lists.
+
+Pages are ordered by an indexed ``(date, id)`` key, e.g. ``(due_date, id)``
+or ``(created_at, id)``, and a cursor is the key of the row at a page edge.
+The next page is read with ``(date, id) > cursor`` and ``LIMIT``, which
+SQLite answers with an index range search. Each page therefore costs the
+same no matter how many semesters of rows lie before it, unlike
+``OFFSET``. Cursors are plain strings (``<iso date>_<id>``) carried in
+``?after=`` / ``?before=``. A list can open at ``start`` (say, now) rather
+than at its oldest row, with the rows before it one "previous" link away.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app, request, url_for
+from sqlalchemy import tuple_
+
+Page = namedtuple("Page", "items next_cursor prev_cursor")
+
+
+def encode_cursor(value, row_id):
+    return f"{value.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor):
+    """``(datetime, id)`` from a cursor string, or ``None`` if missing or malformed."""
+    if not cursor:
+        return None
+    value, _, row_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(value), int(row_id)
+    except ValueError:
+        return None
+
+
+def page_size(config_name, default=50):
+    """Rows per page: ``?per_page=`` clamped to ``MAX_PAGE_SIZE``, else ``config_name``."""
+    size = request.args.get("per_page", type=int) or current_app.config.get(config_name, default)
+    return max(1, min(size, current_app.config.get("MAX_PAGE_SIZE", 100)))
+
+
+def _ordered(query, columns, ascending):
+    return query.order_by(*(c.asc() if ascending else c.desc() for c in columns))
+
+
+def _beyond(columns, cursor, ascending):
+    key = tuple_(*columns)
+    return key > tuple_(*cursor) if ascending else key < tuple_(*cursor)
+
+
+def _page_before(query, columns, key, cursor, limit, ascending):
+    # read backwards from the cursor, then restore display order
+    rows = _ordered(query.filter(_beyond(columns, cursor, not ascending)), columns, not ascending)
+    rows = rows.limit(limit + 1).all()
+    items = list(reversed(rows[:limit]))
+    prev_cursor = encode_cursor(*key(items[0])) if len(rows) > limit else None
+    return items, prev_cursor
+
+
+def _start_page(query, columns, key, start, limit, ascending):
+    """First page opening at ``start``; the last rows before it if none follow."""
+    anchor = (start, 0)  # (start, 0) < (start, id) for every real row id
+    rows = _ordered(query.filter(_beyond(columns, anchor, ascending)), columns, ascending)
+    rows = rows.limit(limit + 1).all()
+    if not rows:
+        items, prev_cursor = _page_before(query, columns, key, anchor, limit, ascending)
+        return Page(items, None, prev_cursor)
+    items = rows[:limit]
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    earlier = query.filter(_beyond(columns, key(items[0]), not ascending)).limit(1).first()
+    prev_cursor = encode_cursor(*key(items[0])) if earlier is not None else None
+    return Page(items, next_cursor, prev_cursor)
+
+
+def keyset_page(query, sort_column, id_column, key, after=None, before=None, limit=50,
+                descending=False, start=None):
+    """One page of ``query`` ordered by ``(sort_column, id_column)``.
+
+    ``key(item)`` returns an item's ``(sort value, id)``. ``after`` and
+    ``before`` are cursor strings from an earlier ``Page``: with ``after``
+    the page starts just past that row, with ``before`` it ends just
+    short of it. With neither it is the first page, or, given a ``start``
+    sort value on an ascending list, the page from the first row at or
+    past ``start``.
+    """
+    columns = (sort_column, id_column)
+    ascending = not descending
+    before = decode_cursor(before)
+    after = None if before else decode_cursor(after)
+
+    if before is not None:
+        items, prev_cursor = _page_before(query, columns, key, before, limit, ascending)
+        next_cursor = encode_cursor(*key(items[-1])) if items else None
+        return Page(items, next_cursor, prev_cursor)
+
+    if after is None and start is not None and ascending:
+        return _start_page(query, columns, key, start, limit, ascending)
+
+    if after is not None:
+        query = query.filter(_beyond(columns, after, ascending))
+    rows = _ordered(query, columns, ascending).limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    prev_cursor = encode_cursor(*key(items[0])) if after is not None and items else None
+    return Page(items, next_cursor, prev_cursor)
+
+
+def page_links(page, prefix=""):
+    """``{"prev": url, "next": url}`` for ``page`` on the current endpoint.
+
+    Other query arguments (another list's cursor, ``per_page``) are kept;
+    ``prefix`` tells apart the cursors of several lists on one page.
+    """
+
+    def link(name, cursor):
+        if cursor is None:
+            return None
+        args = request.args.to_dict()
+        args.pop(prefix + "after", None)
+        args.pop(prefix + "before", None)
+        args[prefix + name] = cursor
+        return url_for(request.endpoint, **request.view_args, **args)
+
+    return {"prev": link("before", page.prev_cursor), "next": link("after", page.next_cursor)}
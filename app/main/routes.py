@@ -1,10 +1,25 @@
 from datetime import datetime, date, timedelta
 import calendar
-from flask import render_template, redirect, flash, request, url_for, Response
+import json
+import queue
+from flask import (
+    render_template,
+    redirect,
+    flash,
+    request,
+    url_for,
+    Response,
+    current_app,
+    abort,
+    jsonify,
+    stream_with_context,
+)
 from flask_login import login_required, current_user
+from sqlalchemy.orm import contains_eager, joinedload
 
 from . import bp
-from app import db
+from app import db, versions
+from app.jobs import job_queue
 from app.models import (
     Classes,
     Course,
@@ -26,41 +41,53 @@ from app.forms import (
 )
 from app.forms import MessageForm, NewConversationForm
 from app.models import User
+from app.main import calendar_feed, enrollment, gradebook, inbox
+from app.main import study_plan as study_plan_jobs
+from app.main.conditional import conditional_get
+from app.main.course_catalog import course_catalog
+from app.main.pagination import keyset_page, page_links, page_size
+from app.fragment_cache import fragment_cache
+from app.main.broker import broker
+from app.user_cache import user_cache
 
 
 def _course_choices(include_general=True):
-    courses = Course.query.order_by(Course.course_name).all()
     choices = []
     if include_general:
         choices.append((0, "General / All Courses"))
-    choices.extend((course.id, course.course_name) for course in courses)
+    choices.extend((course.id, course.course_name) for course in course_catalog.all())
     return choices
 
 
 def _selected_course_ids(user_id):
-    classes_record = Classes.query.filter_by(user=user_id).first()
-    if not classes_record or not classes_record.classes:
-        return []
-    selected = []
-    for entry in classes_record.classes:
-        if isinstance(entry, int):
-            selected.append(entry)
-        elif isinstance(entry, str) and entry.isdigit():
-            selected.append(int(entry))
-        elif isinstance(entry, dict) and "course_id" in entry:
-            selected.append(entry["course_id"])
-    return selected
+    return enrollment.enrolled_course_ids(user_id)
 
 
 def _build_class_cards(user_id, include_grades=False):
 
+    entries = [(None, course_id) for course_id in enrollment.enrolled_course_ids(user_id)]
+
+    # custom link cards predate the Enrollment table and stay in the legacy blob
     classes_record = Classes.query.filter_by(user=user_id).first()
-    if not classes_record or not classes_record.classes:
+    if classes_record and classes_record.classes:
+        entries.extend(
+            (entry, None)
+            for entry in classes_record.classes
+            if isinstance(entry, dict) and entry.get("title")
+        )
+    if not entries:
         return []
 
+    # compute every card's grade in one batched query
+    grades = {}
+    if include_grades:
+        grades = gradebook.compute_weighted_grades(
+            user_id, [course_id for _, course_id in entries if course_id]
+        )
+
     cards = []
-    for entry in classes_record.classes:
-        if isinstance(entry, dict) and entry.get("title"):
+    for entry, course_id in entries:
+        if course_id is None:
             link = entry.get("link")
             cards.append(
                 {
@@ -72,31 +99,18 @@ def _build_class_cards(user_id, include_grades=False):
                 }
             )
         else:
-            course_id = None
-            if isinstance(entry, int):
-                course_id = entry
-            elif isinstance(entry, str) and entry.isdigit():
-                course_id = int(entry)
-            elif isinstance(entry, dict) and entry.get("id"):
-                course_id = entry["id"]
-
-            if course_id:
-                course = Course.query.get(course_id)
-                if course:
-                    grade_info = None
-                    if include_grades:
-                        grade_info = _calculate_weighted_grade(user_id, course_id)
-
-                    cards.append(
-                        {
-                            "title": course.course_name,
-                            "course_code": course.course_code,
-                            "description": course.description or "",
-                            "link": url_for("main.course_detail", course_id=course.id),
-                            "course_id": course.id,
-                            "grade_info": grade_info,
-                        }
-                    )
+            course = course_catalog.get(course_id)
+            if course:
+                cards.append(
+                    {
+                        "title": course.course_name,
+                        "course_code": course.course_code,
+                        "description": course.description or "",
+                        "link": url_for("main.course_detail", course_id=course.id),
+                        "course_id": course.id,
+                        "grade_info": grades.get(course_id),
+                    }
+                )
     return cards
 
 
@@ -113,84 +127,53 @@ def _assignment_badge(assignment, submission=None):
     return {"label": "Pending", "class": "bg-yellow-100 text-yellow-700"}
 
 
-def _has_role(user, *roles):
-    return user.is_authenticated and user.role in roles
+def _last_due_passed(course_id=None):
+    """Latest due date already in the past; badges turn "Overdue" at these moments."""
+    query = db.session.query(Assignment.due_date).filter(Assignment.due_date < datetime.utcnow())
+    if course_id is not None:
+        query = query.filter(Assignment.course_id == course_id)
+    return query.order_by(Assignment.due_date.desc()).limit(1).scalar()
 
 
-def _require_roles(*roles):
-    if not _has_role(current_user, *roles):
-        flash("You do not have permission to perform this action.", "error")
-        return False
-    return True
+def _submission_version_keys():
+    """Version keys of the current student's submissions (badges); none for staff."""
+    if current_user.role != "student":
+        return []
+    return [versions.SUBMISSIONS, versions.student_key(versions.SUBMISSIONS, current_user.id)]
 
 
-def _calculate_weighted_grade(student_id, course_id):
+def _assignment_list_validators():
+    keys = [versions.ASSIGNMENTS, versions.COURSES, *_submission_version_keys()]
+    return keys, (), _last_due_passed()
 
-    from flask import current_app
 
-    weights = current_app.config.get('GRADE_WEIGHTS', {
-        "homework": 30,
-        "exam": 50,
-        "project": 20,
-    })
+def _course_detail_validators(course_id):
+    keys = [
+        versions.course_key(versions.ASSIGNMENTS, course_id),
+        versions.course_key(versions.ANNOUNCEMENTS, course_id),
+        versions.course_key(versions.COURSES, course_id),
+        *_submission_version_keys(),
+    ]
+    return keys, (), _last_due_passed(course_id)
 
-    assignments = Assignment.query.filter_by(course_id=course_id).all()
-    if not assignments:
-        return {'grade': None, 'category_grades': {}, 'has_grades': False}
 
-    # get the submissions for these assignments
-    assignment_ids = [a.id for a in assignments]
-    submissions = Submission.query.filter(
-        Submission.assignment_id.in_(assignment_ids),
-        Submission.student_id == student_id,
-        Submission.status == "Graded"
-    ).all()
+def _announcement_validators(announcement_id=None):
+    return [versions.ANNOUNCEMENTS, versions.COURSES], (announcement_id,), None
 
-    if not submissions:
-        return {'grade': None, 'category_grades': {}, 'has_grades': False}
 
-    # map of assignment_id -> submission
-    sub_map = {s.assignment_id: s for s in submissions}
+def _has_role(user, *roles):
+    return user.is_authenticated and user.role in roles
 
-    # calculate per category scores
-    category_data = {}
-    for cat in weights.keys():
-        category_data[cat] = {'earned': 0, 'possible': 0}
 
-    for assignment in assignments:
-        cat = assignment.category if assignment.category in weights else 'homework'
-        sub = sub_map.get(assignment.id)
-        if sub and sub.score is not None:
-            category_data[cat]['earned'] += sub.score
-            category_data[cat]['possible'] += assignment.points
-
-    # calculate the weighted average
-    total_weighted = 0
-    total_weight_used = 0
-    category_grades = {}
-
-    for cat, data in category_data.items():
-        if data['possible'] > 0:
-            percentage = (data['earned'] / data['possible']) * 100
-            category_grades[cat] = {
-                'earned': data['earned'],
-                'possible': data['possible'],
-                'percentage': round(percentage, 1),
-            }
-            total_weighted += percentage * weights[cat]
-            total_weight_used += weights[cat]
+def _require_roles(*roles):
+    if not _has_role(current_user, *roles):
+        flash("You do not have permission to perform this action.", "error")
+        return False
+    return True
 
-    # normalize all the categories if not all the categories have grades in
-    if total_weight_used > 0:
-        final_grade = total_weighted / total_weight_used
-    else:
-        final_grade = None
 
-    return {
-        'grade': round(final_grade, 1) if final_grade is not None else None,
-        'category_grades': category_grades,
-        'has_grades': total_weight_used > 0,
-    }
+def _calculate_weighted_grade(student_id, course_id):
+    return gradebook.compute_weighted_grades(student_id, [course_id])[course_id]
 
 
 @bp.route("/")
@@ -198,18 +181,21 @@ def _calculate_weighted_grade(student_id, course_id):
 @login_required
 def home():
     # get ALL courses
-    all_courses = Course.query.order_by(Course.course_name.asc()).all()
+    all_courses = course_catalog.all()
 
     # get enrolled course IDs
     enrolled_ids = set(_selected_course_ids(current_user.id))
 
+    # read every enrolled course's grade from the gradebook in one lookup
+    grades = {}
+    if current_user.role == "student":
+        grades = gradebook.weighted_grades(current_user.id, enrolled_ids)
+
     # build course cards with enrollment status
     courses_payload = []
     for course in all_courses:
         is_enrolled = course.id in enrolled_ids
-        grade_info = None
-        if is_enrolled and current_user.role == "student":
-            grade_info = _calculate_weighted_grade(current_user.id, course.id)
+        grade_info = grades.get(course.id) if is_enrolled else None
 
         courses_payload.append({
             "title": course.course_name,
@@ -223,16 +209,20 @@ def home():
 
     # filter assignments by enrolled courses for students
     if current_user.role == "student" and enrolled_ids:
-        assignments = Assignment.query.filter(
+        assignments = Assignment.query.options(joinedload(Assignment.course)).filter(
             (Assignment.course_id.in_(enrolled_ids)) | (Assignment.course_id.is_(None))
         ).order_by(Assignment.due_date.asc()).limit(8).all()
 
-        announcements = Announcement.query.filter(
+        announcements = Announcement.query.options(joinedload(Announcement.course)).filter(
             (Announcement.course_id.in_(enrolled_ids)) | (Announcement.course_id.is_(None))
         ).order_by(Announcement.created_at.desc()).limit(5).all()
     else:
-        assignments = Assignment.query.order_by(Assignment.due_date.asc()).limit(8).all()
-        announcements = Announcement.query.order_by(Announcement.created_at.desc()).limit(5).all()
+        assignments = Assignment.query.options(joinedload(Assignment.course)).order_by(
+            Assignment.due_date.asc()
+        ).limit(8).all()
+        announcements = Announcement.query.options(joinedload(Announcement.course)).order_by(
+            Announcement.created_at.desc()
+        ).limit(5).all()
 
     submissions = {}
     if current_user.role == "student":
@@ -249,6 +239,74 @@ def home():
         courses=courses_payload,
         assignments=assignments,
         announcements=announcements,
+        fragment_version=versions.content_version(
+            versions.ASSIGNMENTS, versions.ANNOUNCEMENTS, versions.COURSES
+        ),
+    )
+
+
+def _assignment_page(query, limit):
+    """Keyset page of an assignment query in due-date order, from ``?after=`` / ``?before=``.
+
+    Without a cursor the page opens at the next assignment due; past ones
+    are behind the "Earlier" link.
+    """
+    return keyset_page(
+        query,
+        Assignment.due_date,
+        Assignment.id,
+        key=lambda a: (a.due_date, a.id),
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        limit=limit,
+        start=datetime.utcnow(),
+    )
+
+
+def _submission_map(student_id, assignments):
+    """``{assignment_id: submission}`` of one student, for the listed assignments only."""
+    assignment_ids = [assignment.id for assignment in assignments]
+    if not assignment_ids:
+        return {}
+    return {
+        s.assignment_id: s
+        for s in Submission.query.filter(
+            Submission.student_id == student_id,
+            Submission.assignment_id.in_(assignment_ids),
+        )
+    }
+
+
+def _staff_dashboard(assignments, pending_submissions):
+    """Instructor/TA dashboard: one keyset page of each list."""
+    limit = page_size("DASHBOARD_PAGE_SIZE", 25)
+    assignment_page = _assignment_page(assignments, limit)
+    # oldest submission first; both key columns are on submission, so each
+    # assignment's rows past the cursor come straight off ix_submission_pending_queue
+    pending_page = keyset_page(
+        pending_submissions,
+        Submission.submitted_at,
+        Submission.id,
+        key=lambda s: (s.submitted_at, s.id),
+        after=request.args.get("pending_after"),
+        before=request.args.get("pending_before"),
+        limit=limit,
+    )
+    return render_template(
+        "dashboard.html",
+        mode="instructor",
+        assignments=assignment_page.items,
+        pending_submissions=pending_page.items,
+        pager=page_links(assignment_page),
+        pending_pager=page_links(pending_page, prefix="pending_"),
+    )
+
+
+def _pending_submission_loads():
+    """Eager loads for the dashboard's pending list (assignment, its course, student)."""
+    return (
+        contains_eager(Submission.assignment).joinedload(Assignment.course),
+        joinedload(Submission.student),
     )
 
 
@@ -256,46 +314,44 @@ def home():
 @login_required
 def dashboard():
     if current_user.role == "instructor":
-        assignments = Assignment.query.filter_by(
+        assignments = Assignment.query.options(joinedload(Assignment.course)).filter_by(
             created_by=current_user.id
-        ).order_by(Assignment.due_date).all()
+        )
 
-        pending_submissions = Submission.query.join(Assignment).filter(
+        pending_submissions = Submission.query.join(Assignment).options(
+            *_pending_submission_loads()
+        ).filter(
             Assignment.created_by == current_user.id,
             Submission.status != "Graded",
-        ).all()
-
-        return render_template(
-            "dashboard.html",
-            mode="instructor",
-            assignments=assignments,
-            pending_submissions=pending_submissions,
+            Submission.submitted_at.isnot(None),
         )
 
+        return _staff_dashboard(assignments, pending_submissions)
+
     elif current_user.role == "ta":
-        ta_course_ids = _selected_course_ids(current_user.id)
+        ta_course_ids = enrollment.enrolled_course_subquery(current_user.id)
 
-        assignments = Assignment.query.filter(
+        assignments = Assignment.query.options(joinedload(Assignment.course)).filter(
             Assignment.course_id.in_(ta_course_ids)
-        ).order_by(Assignment.due_date).all()
+        )
 
-        pending_submissions = Submission.query.join(Assignment).filter(
+        pending_submissions = Submission.query.join(Assignment).options(
+            *_pending_submission_loads()
+        ).filter(
             Assignment.course_id.in_(ta_course_ids),
             Submission.status != "Graded",
-        ).all()
-
-        return render_template(
-            "dashboard.html",
-            mode="instructor",
-            assignments=assignments,
-            pending_submissions=pending_submissions,
+            Submission.submitted_at.isnot(None),
         )
 
+        return _staff_dashboard(assignments, pending_submissions)
+
     else:
-        assignments = Assignment.query.order_by(Assignment.due_date.asc()).all()
-        submissions = Submission.query.filter_by(student_id=current_user.id).all()
-        submission_map = {s.assignment_id: s for s in submissions}
-        for assignment in assignments:
+        page = _assignment_page(
+            Assignment.query.options(joinedload(Assignment.course)),
+            page_size("DASHBOARD_PAGE_SIZE", 25),
+        )
+        submission_map = _submission_map(current_user.id, page.items)
+        for assignment in page.items:
             assignment.progress_badge = _assignment_badge(
                 assignment, submission_map.get(assignment.id)
             )
@@ -303,31 +359,46 @@ def dashboard():
         return render_template(
             "dashboard.html",
             mode="student",
-            assignments=assignments,
+            assignments=page.items,
+            pager=page_links(page),
         )
 
 
 @bp.route("/assignments")
 @login_required
+@conditional_get(_assignment_list_validators)
 def assignment_list():
-    assignments = Assignment.query.order_by(Assignment.due_date.asc()).all()
+    page = _assignment_page(
+        Assignment.query.options(joinedload(Assignment.course)),
+        page_size("ASSIGNMENT_PAGE_SIZE", 50),
+    )
     submission_map = {}
     if current_user.role == "student":
-        submission_map = {
-            s.assignment_id: s
-            for s in Submission.query.filter_by(student_id=current_user.id).all()
-        }
-    for assignment in assignments:
+        submission_map = _submission_map(current_user.id, page.items)
+    for assignment in page.items:
         assignment.progress_badge = _assignment_badge(
             assignment, submission_map.get(assignment.id)
         )
-    return render_template("assignments_list.html", assignments=assignments)
+    return render_template(
+        "assignments_list.html",
+        assignments=page.items,
+        pager=page_links(page),
+        fragment_version=versions.content_version(versions.ASSIGNMENTS, versions.COURSES),
+    )
 
 
 @bp.route("/calendar")
 @login_required
 def calendar_view():
     """Server-rendered month calendar view of assignments."""
+    # first, since issuing a user's first feed token commits and would
+    # expire the assignments loaded below
+    feed_url = url_for(
+        "main.calendar_feed_ics",
+        token=calendar_feed.feed_token(db.session.get(User, current_user.id)),
+        _external=True,
+    )
+
     # allow year/month override via query params
     year = request.args.get("year", type=int) or date.today().year
     month = request.args.get("month", type=int) or date.today().month
@@ -335,15 +406,21 @@ def calendar_view():
     # calculate month range
     first_weekday, num_days = calendar.monthrange(year, month)
     start = datetime(year, month, 1)
-    end = datetime(year, month, num_days, 23, 59, 59)
-
-    # fetch assignments; filter by year/month to avoid timezone edge-cases
-    all_assignments = Assignment.query.order_by(Assignment.due_date.asc()).all()
+    end = start + timedelta(days=num_days)
+
+    # fetch only this month's assignments through the due_date index, with
+    # courses loaded in the same query; the half-open range keeps the whole
+    # last day (including fractional seconds) inside the month
+    query = Assignment.query.options(joinedload(Assignment.course)).filter(
+        Assignment.due_date >= start,
+        Assignment.due_date < end,
+    )
     if current_user.role == "student":
-        enrolled = set(_selected_course_ids(current_user.id))
-        assignments = [a for a in all_assignments if (a.course_id is None or a.course_id in enrolled) and a.due_date.year == year and a.due_date.month == month]
-    else:
-        assignments = [a for a in all_assignments if a.due_date.year == year and a.due_date.month == month]
+        query = query.filter(
+            Assignment.course_id.is_(None)
+            | Assignment.course_id.in_(enrollment.enrolled_course_subquery(current_user.id))
+        )
+    assignments = query.order_by(Assignment.due_date.asc(), Assignment.id.asc()).all()
 
     # group assignments by day (use date to avoid timezone/truncation issues)
     events = {}
@@ -399,6 +476,7 @@ def calendar_view():
         next_month=next_month,
         course_colors=course_colors,
         course_map=course_map,
+        feed_url=feed_url,
     )
 
 
@@ -410,55 +488,46 @@ def calendar_export():
     month = request.args.get("month", type=int)
 
     # choose assignments: if year/month provided, limit to that month; otherwise upcoming 90 days
-    all_assignments = Assignment.query.order_by(Assignment.due_date.asc()).all()
     if year and month:
         first_weekday, num_days = calendar.monthrange(year, month)
         start = datetime(year, month, 1)
-        end = datetime(year, month, num_days, 23, 59, 59)
+        end = start + timedelta(days=num_days)
     else:
         start = datetime.utcnow()
         end = start + timedelta(days=90)
 
-    if current_user.role == "student":
-        enrolled = set(_selected_course_ids(current_user.id))
-        assignments = [a for a in all_assignments if (a.course_id is None or a.course_id in enrolled) and start <= a.due_date <= end]
-    else:
-        assignments = [a for a in all_assignments if start <= a.due_date <= end]
+    assignments = calendar_feed.assignments_between(current_user, start, end)
+    filename = f"assignments_{year or 'upcoming'}_{month or ''}.ics"
+    return Response(
+        stream_with_context(calendar_feed.ics_lines(assignments.yield_per(500))),
+        mimetype="text/calendar",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
-    # build simple ICS
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//SpartanSync//Assignments//EN",
-    ]
 
-    for a in assignments:
-        uid = f"assignment-{a.id}@spartansync.local"
-        dtstamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        dtstart = a.due_date.strftime("%Y%m%dT%H%M%SZ")
-        summary = (a.title or "Assignment").replace('\n', ' ').replace(';', ',')
-        description = (a.description or '').replace('\n', '\\n').replace(';', ',')
-        lines.extend([
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{dtstamp}",
-            f"DTSTART:{dtstart}",
-            f"SUMMARY:{summary}",
-            f"DESCRIPTION:{description}",
-            "END:VEVENT",
-        ])
-
-    lines.append("END:VCALENDAR")
-    ics_content = "\r\n".join(lines)
+@bp.route("/calendar/feed/<token>.ics")
+def calendar_feed_ics(token):
+    """Subscribable per-user ICS feed; the signed token stands in for a login."""
+    user = calendar_feed.user_for_token(token)
+    if user is None:
+        abort(404)
+    return calendar_feed.serve_feed(user)
 
-    filename = f"assignments_{year or 'upcoming'}_{month or ''}.ics"
-    return Response(ics_content, mimetype="text/calendar", headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+@bp.route("/calendar/feed/reset", methods=["POST"])
+@login_required
+def calendar_feed_reset():
+    """Issue a new feed URL; the old one stops working."""
+    calendar_feed.rotate_feed_token(db.session.get(User, current_user.id))
+    db.session.commit()
+    flash("Calendar feed link reset. Update your calendar subscription.", "success")
+    return redirect(url_for("main.calendar_view"))
 
 
 @bp.route("/courses")
 @login_required
 def courses():
-    all_courses = Course.query.order_by(Course.course_name.asc()).all()
+    all_courses = course_catalog.all()
     selected_ids = set(_selected_course_ids(current_user.id))
     return render_template(
         "courses.html",
@@ -469,8 +538,11 @@ def courses():
 
 @bp.route("/courses/<int:course_id>")
 @login_required
+@conditional_get(_course_detail_validators)
 def course_detail(course_id):
-    course = Course.query.get_or_404(course_id)
+    course = course_catalog.get(course_id)
+    if course is None:
+        abort(404)
     assignments = Assignment.query.filter_by(course_id=course.id).order_by(Assignment.due_date.asc()).all()
     announcements = Announcement.query.filter_by(course_id=course.id).order_by(Announcement.created_at.desc()).all()
 
@@ -490,6 +562,10 @@ def course_detail(course_id):
         course=course,
         assignments=assignments,
         announcements=announcements,
+        fragment_version=versions.content_version(
+            versions.course_key(versions.ASSIGNMENTS, course.id),
+            versions.course_key(versions.ANNOUNCEMENTS, course.id),
+        ),
     )
 
 
@@ -514,7 +590,10 @@ def course_create():
                 description=form.description.data,
             )
             db.session.add(course)
+            db.session.flush()
+            versions.bump_course(versions.COURSES, course.id)
             db.session.commit()
+            course_catalog.invalidate()
             flash("Course created successfully.", "success")
             return redirect(url_for("main.courses"))
 
@@ -527,7 +606,7 @@ def manage_classes():
     form = ClassSelectionForm()
 
     # get all courses
-    courses = Course.query.order_by(Course.course_name).all()
+    courses = course_catalog.all()
     if not courses:
         flash("No courses available yet. Please ask an instructor to add one.", "error")
         return redirect(url_for("main.courses"))
@@ -539,12 +618,10 @@ def manage_classes():
         # get selected course IDs from checkboxes
         selected_course_ids = request.form.getlist("courses", type=int)
 
-        record = Classes.query.filter_by(user=current_user.id).first()
-        if not record:
-            record = Classes(user=current_user.id, classes=selected_course_ids)
-            db.session.add(record)
-        else:
-            record.classes = selected_course_ids
+        known_ids = {course.id for course in courses}
+        enrollment.update_enrollment(
+            current_user, [cid for cid in selected_course_ids if cid in known_ids]
+        )
         db.session.commit()
         flash("Enrollment updated successfully.", "success")
         return redirect(url_for("main.home"))
@@ -584,6 +661,7 @@ def assignment_create():
             max_points=form.points.data,
         )
         db.session.add(criterion)
+        versions.bump_course(versions.ASSIGNMENTS, assignment.course_id)
         db.session.commit()
 
         flash("Assignment created successfully.", "success")
@@ -615,9 +693,11 @@ def assignment_detail(assignment_id):
             flash("Submissions are closed for this assignment.", "error")
         else:
             if submission:
+                previous_score = gradebook.counted_score(submission)
                 submission.content = submission_form.content.data
                 submission.submitted_at = datetime.utcnow()
                 submission.status = "Submitted"
+                gradebook.record_submission_change(submission, previous_score)
             else:
                 submission = Submission(
                     assignment_id=assignment.id,
@@ -626,6 +706,7 @@ def assignment_detail(assignment_id):
                     status="Submitted",
                 )
                 db.session.add(submission)
+            versions.bump(versions.student_key(versions.SUBMISSIONS, current_user.id))
             db.session.commit()
             flash("Submission saved.", "success")
         return redirect(url_for("main.assignment_detail", assignment_id=assignment.id))
@@ -647,7 +728,9 @@ def assignment_detail(assignment_id):
 
     submissions = []
     if current_user.role in ["instructor", "ta"]:
-        submissions = Submission.query.filter_by(assignment_id=assignment.id).all()
+        submissions = Submission.query.options(joinedload(Submission.student)).filter_by(
+            assignment_id=assignment.id
+        ).all()
         for sub in submissions:
             if sub.rubric_scores:
                 sub.rubric_scores = {int(k): v for k, v in sub.rubric_scores.items()}
@@ -684,10 +767,13 @@ def grade_submission(assignment_id):
         rubric_scores[str(criterion.id)] = score_val
         total += score_val
 
+    previous_score = gradebook.counted_score(submission)
     submission.score = total
     submission.rubric_scores = rubric_scores
     submission.status = "Graded"
     submission.submitted_at = submission.submitted_at or datetime.utcnow()
+    gradebook.record_submission_change(submission, previous_score)
+    versions.bump(versions.student_key(versions.SUBMISSIONS, submission.student_id))
     db.session.commit()
     flash("Submission graded successfully.", "success")
     return redirect(url_for("main.assignment_detail", assignment_id=assignment_id))
@@ -699,8 +785,10 @@ def assignment_delete(assignment_id):
         return redirect(url_for("main.assignment_detail", assignment_id=assignment_id))
 
     assignment = Assignment.query.get_or_404(assignment_id)
+    gradebook.remove_assignment(assignment)
     Submission.query.filter_by(assignment_id=assignment.id).delete()
     RubricCriterion.query.filter_by(assignment_id=assignment.id).delete()
+    versions.bump_course(versions.ASSIGNMENTS, assignment.course_id)
     db.session.delete(assignment)
     db.session.commit()
     flash("Assignment deleted.", "success")
@@ -709,13 +797,30 @@ def assignment_delete(assignment_id):
 
 @bp.route("/announcements", methods=["GET"])
 @login_required
+@conditional_get(_announcement_validators)
 def announcements():
-    notes = Announcement.query.order_by(Announcement.created_at.desc()).all()
-    return render_template("announcements.html", announcements=notes)
+    page = keyset_page(
+        Announcement.query.options(joinedload(Announcement.course)),
+        Announcement.created_at,
+        Announcement.id,
+        key=lambda note: (note.created_at, note.id),
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        limit=page_size("ANNOUNCEMENT_PAGE_SIZE", 20),
+        descending=True,
+    )
+    return render_template(
+        "announcements.html",
+        announcements=page.items,
+        pager=page_links(page),
+        page_key=request.query_string.decode(),
+        fragment_version=versions.content_version(versions.ANNOUNCEMENTS, versions.COURSES),
+    )
 
 
 @bp.route("/announcements/<int:announcement_id>")
 @login_required
+@conditional_get(_announcement_validators)
 def announcement_detail(announcement_id):
     note = Announcement.query.get_or_404(announcement_id)
     return render_template("announcement_detail.html", announcement=note)
@@ -739,6 +844,7 @@ def announcement_create():
             created_by=current_user.id,
         )
         db.session.add(note)
+        versions.bump_course(versions.ANNOUNCEMENTS, course_id)
         db.session.commit()
         flash("Announcement published.", "success")
         return redirect(url_for("main.announcements"))
@@ -753,61 +859,162 @@ def announcement_delete(announcement_id):
         return redirect(url_for("main.announcements"))
 
     note = Announcement.query.get_or_404(announcement_id)
+    versions.bump_course(versions.ANNOUNCEMENTS, note.course_id)
     db.session.delete(note)
     db.session.commit()
     flash("Announcement deleted.", "success")
     return redirect(url_for("main.announcements"))
 
+@bp.route("/stats/caches")
+@login_required
+def cache_stats():
+    """Hit/miss counters of this worker's in-process caches (instructors only)."""
+    if not _has_role(current_user, "instructor"):
+        abort(403)
+    from app.main.ai_providers import provider_stats
+    from app.main.llm_cache import response_cache
+    return jsonify({
+        "llm_responses": response_cache.stats(),
+        "calendar_feed": calendar_feed.cache_stats(),
+        "fragments": fragment_cache.stats(),
+        "course_catalog": course_catalog.stats(),
+        "users": user_cache.stats(),
+        "llm_providers": provider_stats(),
+    })
+
+
+def _own_job(job_id):
+    job = job_queue.get(job_id)
+    if not job or job.user_id != current_user.id:
+        return None
+    return job
+
+
+def _job_payload(job):
+    return {
+        "id": job.id,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "attempts": job.attempts,
+    }
+
+
+def _study_plan_prompt(student_id):
+    context = study_plan_jobs.build_prompt_context(student_id)
+    current_app.logger.debug(
+        "study plan prompt: %d assignments, ~%d tokens%s",
+        context.included, context.estimated_tokens,
+        " (truncated)" if context.truncated else "",
+    )
+    return context.text
+
+
 @bp.route("/study-plan", methods=["GET", "POST"])
 @login_required
 def study_plan():
     if not _require_roles("student"):
         return redirect(url_for("main.home"))
-    try:
-        from app.main.gpt_client import ask_chatgpt
-    except Exception:
-        # If the OpenAI client isn't available provide  fallback
-        def ask_chatgpt(question, prompt):
-            return "AI service currently unavailable."
 
-    advice = None
     if request.method == "POST":
-        assignments = Assignment.query.order_by(Assignment.due_date.asc()).all()
-        assignmentPrompt = ""
-        for assignment in assignments:
-            submitted = Submission.query.filter_by(
-                assignment_id=assignment.id,
-                student_id=current_user.id
-            ).first()
-            if not submitted:
-                assignmentPrompt += f"- {assignment.title}, due {assignment.due_date.strftime('%Y-%m-%d')}({assignment.points} points)\n"
+        assignmentPrompt = _study_plan_prompt(current_user.id)
         question = request.form.get("topics", "").strip()
-        
-        advice = ask_chatgpt(question, assignmentPrompt)
-        return render_template("study_plan.html", advice=advice, prefill=question)
-       
-    return render_template("study_plan.html", advice=advice, prefill="")
+
+        # generation runs on the job queue; the page polls for the result
+        job_id = job_queue.enqueue(
+            study_plan_jobs.JOB_KIND,
+            {"question": question, "assignments": assignmentPrompt},
+            user_id=current_user.id,
+        )
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify({
+                "job_id": job_id,
+                "status_url": url_for("main.study_plan_job", job_id=job_id),
+            }), 202
+        return redirect(url_for("main.study_plan", job=job_id))
+
+    advice = None
+    prefill = ""
+    job = None
+    job_id = request.args.get("job")
+    if job_id:
+        job = _own_job(job_id)
+        if job:
+            prefill = job.payload.get("question", "")
+            if job.status == "succeeded":
+                advice = job.result
+
+    return render_template(
+        "study_plan.html",
+        advice=advice,
+        prefill=prefill,
+        job=job,
+        streaming=current_app.config.get("STUDY_PLAN_STREAMING", False),
+    )
+
+
+@bp.route("/study-plan/stream", methods=["POST"])
+@login_required
+def study_plan_stream():
+    """Stream the study plan to the browser as Server-Sent Events while it generates.
+
+    Each ``message`` event carries a JSON-encoded text fragment; a final
+    ``done`` event closes the stream. The finished text lands in the LLM
+    response cache, so the queued ``/study-plan`` path reuses it. Only
+    served when ``STUDY_PLAN_STREAMING`` is on; otherwise plans go through
+    the job queue.
+    """
+    if not current_app.config.get("STUDY_PLAN_STREAMING", False):
+        abort(404)
+    if not _has_role(current_user, "student"):
+        abort(403)
+
+    assignmentPrompt = _study_plan_prompt(current_user.id)
+    question = request.form.get("topics", "").strip()
+    try:
+        from app.main.gpt_client import stream_chatgpt
+    except Exception:
+        def stream_chatgpt(question, prompt):
+            yield "AI service currently unavailable."
+
+    def events():
+        for token in stream_chatgpt(question, assignmentPrompt):
+            yield f"data: {json.dumps(token)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/study-plan/jobs/<job_id>")
+@login_required
+def study_plan_job(job_id):
+    """Status (and, once finished, the result) of a study-plan job."""
+    job = _own_job(job_id)
+    if not job:
+        abort(404)
+    return jsonify(_job_payload(job))
 
 
 @bp.route("/messages")
 @login_required
 def messages_inbox():
     """List conversations for current user."""
-    parts = ConversationParticipant.query.filter_by(user_id=current_user.id).all()
-    conversations = [p.conversation for p in parts]
-    # sort by last message time
-    conversations.sort(key=lambda c: c.last_message().created_at if c.last_message() else c.created_at, reverse=True)
-    # build summary
-    summary = []
-    for c in conversations:
-        last = c.last_message()
-        summary.append({
-            "conversation": c,
-            "last_message": last,
-            "unread": c.unread_count_for(current_user.id),
-        })
-
-    return render_template("messages/inbox.html", conversations=summary)
+    page = request.args.get("page", 1, type=int)
+    summary, has_next = inbox.inbox_page(
+        current_user.id,
+        page=page,
+        per_page=current_app.config.get("INBOX_PAGE_SIZE", 50),
+    )
+    return render_template(
+        "messages/inbox.html",
+        conversations=summary,
+        page=max(page, 1),
+        has_next=has_next,
+    )
 
 
 @bp.route("/messages/new", methods=["GET", "POST"])
@@ -832,7 +1039,9 @@ def messages_new():
         # create initial message
         msg = Message(conversation_id=conv.id, sender_id=current_user.id, body=form.body.data)
         db.session.add(msg)
+        inbox.record_message(msg)
         db.session.commit()
+        broker.publish(conv.id, inbox.message_payload(msg))
         return redirect(url_for("main.messages_view", conv_id=conv.id))
 
     # optionally accept ?recipient_id=.. query param
@@ -845,12 +1054,18 @@ def messages_new():
     return render_template("messages/new.html", form=form)
 
 
+def _conversation_participant(conv_id):
+    return ConversationParticipant.query.filter_by(
+        conversation_id=conv_id, user_id=current_user.id
+    ).first()
+
+
 @bp.route("/messages/<int:conv_id>", methods=["GET", "POST"])
 @login_required
 def messages_view(conv_id):
     conv = Conversation.query.get_or_404(conv_id)
     # ensure current user is a participant
-    part = ConversationParticipant.query.filter_by(conversation_id=conv.id, user_id=current_user.id).first()
+    part = _conversation_participant(conv.id)
     if not part:
         flash("You are not a participant in that conversation.", "error")
         return redirect(url_for("main.messages_inbox"))
@@ -859,13 +1074,168 @@ def messages_view(conv_id):
     if form.validate_on_submit():
         msg = Message(conversation_id=conv.id, sender_id=current_user.id, body=form.body.data)
         db.session.add(msg)
+        inbox.record_message(msg)
         db.session.commit()
+        broker.publish(conv.id, inbox.message_payload(msg))
         return redirect(url_for("main.messages_view", conv_id=conv.id))
 
-    # mark read
-    from datetime import datetime
-    part.last_read_at = datetime.utcnow()
+    before = request.args.get("before", type=int)
+    if before is None:
+        # mark read
+        inbox.mark_read(part)
+        db.session.commit()
+
+    messages, has_older = inbox.message_history(
+        conv.id, before_id=before, limit=current_app.config.get("MESSAGE_PAGE_SIZE", 50)
+    )
+    return render_template(
+        "messages/view.html",
+        conversation=conv,
+        messages=messages,
+        has_older=has_older,
+        live=before is None,
+        transport=current_app.config.get("MESSAGE_LIVE_TRANSPORT", "sse"),
+        form=form,
+    )
+
+
+@bp.route("/messages/<int:conv_id>/older")
+@login_required
+def messages_older(conv_id):
+    """HTML fragment with the window of messages before ``?before=<message_id>``."""
+    conv = Conversation.query.get_or_404(conv_id)
+    if not _conversation_participant(conv.id):
+        abort(404)
+
+    messages, has_older = inbox.message_history(
+        conv.id,
+        before_id=request.args.get("before", type=int),
+        limit=current_app.config.get("MESSAGE_PAGE_SIZE", 50),
+    )
+    return render_template(
+        "messages/_message_list.html",
+        conversation=conv,
+        messages=messages,
+        has_older=has_older,
+    )
+
+
+@bp.route("/messages/<int:conv_id>/history.json")
+@login_required
+def messages_history_json(conv_id):
+    """JSON window of messages; pass ``next_before`` back as ``?before=`` for older ones."""
+    if not _conversation_participant(conv_id):
+        abort(404)
+
+    messages, has_older = inbox.message_history(
+        conv_id,
+        before_id=request.args.get("before", type=int),
+        limit=current_app.config.get("MESSAGE_PAGE_SIZE", 50),
+    )
+    return jsonify(
+        {
+            "messages": [inbox.message_payload(m) for m in messages],
+            "has_older": has_older,
+            "next_before": messages[0].id if has_older and messages else None,
+        }
+    )
+
+
+def _sse_event(payload):
+    return f"id: {payload['id']}\nevent: message\ndata: {json.dumps(payload)}\n\n"
+
+
+def _mark_delivered(conv_id, user_id, message_id):
+    """Mark messages the viewer just received live as read, then give the connection back."""
+    inbox.mark_read_through(conv_id, user_id, message_id)
     db.session.commit()
+    db.session.close()
+
+
+@bp.route("/messages/<int:conv_id>/stream")
+@login_required
+def messages_stream(conv_id):
+    """Server-Sent Events stream of messages committed after ``Last-Event-ID``.
+
+    Holds the worker for as long as the client stays connected; browsers
+    reconnect on their own and replay what they missed from the database.
+    The broker only wakes the stream: new messages are read from the
+    database, and it is re-read on every keepalive so messages committed
+    by other worker processes arrive within one keepalive interval.
+    """
+    if not _conversation_participant(conv_id):
+        abort(404)
+
+    user_id = current_user.id
+    subscription = broker.subscribe(conv_id)
+    last_id = request.headers.get("Last-Event-ID", type=int) or request.args.get("after", type=int)
+    keepalive = current_app.config.get("MESSAGE_STREAM_KEEPALIVE", 15)
+
+    def unseen(after):
+        messages = [inbox.message_payload(m) for m in inbox.messages_after(conv_id, after)]
+        db.session.close()
+        return messages
+
+    def events():
+        # without Last-Event-ID the page already shows everything up to now
+        sent = last_id if last_id is not None else (
+            db.session.get(Conversation, conv_id).last_message_id or 0
+        )
+        yield "retry: 3000\n\n"
+        pending = unseen(sent) if last_id is not None else []
+        while True:
+            for payload in pending:
+                sent = payload["id"]
+                yield _sse_event(payload)
+            if pending:
+                _mark_delivered(conv_id, user_id, sent)
+            try:
+                subscription.get(timeout=keepalive)
+                while True:
+                    subscription.get_nowait()
+            except queue.Empty:
+                pass
+            pending = unseen(sent)
+            if not pending:
+                yield ": keepalive\n\n"
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.call_on_close(lambda: broker.unsubscribe(conv_id, subscription))
+    return response
+
 
-    messages = conv.messages
-    return render_template("messages/view.html", conversation=conv, messages=messages, form=form)
+@bp.route("/messages/<int:conv_id>/poll")
+@login_required
+def messages_poll(conv_id):
+    """Long-poll fallback for the stream: waits for messages after ``?after=<message_id>``."""
+    if not _conversation_participant(conv_id):
+        abort(404)
+
+    after = request.args.get("after", 0, type=int)
+    timeout = current_app.config.get("MESSAGE_POLL_TIMEOUT", 8)
+    subscription = broker.subscribe(conv_id)
+    try:
+        messages = [inbox.message_payload(m) for m in inbox.messages_after(conv_id, after)]
+        if not messages:
+            # give the connection back to the pool while we wait
+            db.session.close()
+            try:
+                messages.append(subscription.get(timeout=timeout))
+                while True:
+                    messages.append(subscription.get_nowait())
+            except queue.Empty:
+                pass
+    finally:
+        broker.unsubscribe(conv_id, subscription)
+
+    messages = [m for m in messages if m["id"] > after]
+    if messages:
+        _mark_delivered(conv_id, current_user.id, messages[-1]["id"])
+    return jsonify({
+        "messages": messages,
+        "last_id": messages[-1]["id"] if messages else after,
+    })
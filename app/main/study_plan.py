@@ -0,0 +1,109 @@
+"""Study-plan generation, run on the background job queue."""
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, exists, func
+
+from app import db
+from app.jobs import job_queue
+from app.main import enrollment
+from app.main.gradebook import grade_weights
+from app.models import Assignment, Course, Submission
+
+JOB_KIND = "study_plan"
+
+# no assignment line is shorter than this, which bounds the rows worth fetching
+MIN_LINE_TOKENS = 8
+
+MORE_LINE = "- ...more assignments are pending.\n"
+
+PromptContext = namedtuple("PromptContext", "text included truncated estimated_tokens")
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def _pending_assignments(student_id, limit, now):
+    """Enrolled, upcoming assignments ``student_id`` has not submitted, most pressing first.
+
+    One statement: the enrollment filter is an ``IN`` subquery and the
+    missing submission a ``NOT EXISTS`` anti-join. Rows are ranked by
+    urgency, how much they weigh in the grade (category weight times
+    points) per day left until due, with anything due within a day counted
+    as one day, and capped at ``limit``.
+    """
+    weights = grade_weights()
+    category_weight = case(
+        weights, value=Assignment.category, else_=weights.get("homework", 0)
+    )
+    days_left = func.max(func.julianday(Assignment.due_date) - func.julianday(now), 1.0)
+    urgency = category_weight * Assignment.points / days_left
+    submitted = exists().where(
+        Submission.assignment_id == Assignment.id,
+        Submission.student_id == student_id,
+    )
+    return (
+        db.session.query(
+            Assignment.title,
+            Assignment.due_date,
+            Assignment.points,
+            Assignment.category,
+            Course.course_code,
+        )
+        .outerjoin(Course, Course.id == Assignment.course_id)
+        .filter(
+            Assignment.due_date >= now,
+            Assignment.course_id.is_(None)
+            | Assignment.course_id.in_(enrollment.enrolled_course_subquery(student_id)),
+            ~submitted,
+        )
+        .order_by(urgency.desc(), Assignment.due_date.asc(), Assignment.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def build_prompt_context(student_id, token_budget=None, now=None):
+    """Assignment list for the study-plan prompt, cut to ``token_budget`` tokens.
+
+    Returns a ``PromptContext`` with the prompt ``text``, how many
+    assignments were ``included``, whether any were left out
+    (``truncated``) and the ``estimated_tokens`` of the text. The query
+    never fetches more rows than the budget could hold, so building the
+    prompt costs the same however many assignments exist.
+    """
+    if token_budget is None:
+        token_budget = current_app.config.get("STUDY_PLAN_PROMPT_TOKENS", 800)
+    limit = max(token_budget // MIN_LINE_TOKENS, 1)
+    rows = _pending_assignments(student_id, limit + 1, now or datetime.utcnow())
+
+    lines = []
+    used = 0
+    truncated = len(rows) > limit
+    # keep room for the "more assignments" line in case the list gets cut
+    budget = token_budget - estimate_tokens(MORE_LINE)
+    for title, due_date, points, category, course_code in rows[:limit]:
+        course = f"[{course_code}] " if course_code else ""
+        line = f"- {course}{title}, due {due_date.strftime('%Y-%m-%d')} ({points} points, {category})\n"
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            truncated = True
+            break
+        lines.append(line)
+        used += cost
+
+    text = "".join(lines)
+    if truncated:
+        text += MORE_LINE
+    return PromptContext(text, len(lines), truncated, estimate_tokens(text))
+
+
+@job_queue.task(JOB_KIND)
+def generate_study_plan(question, assignments):
+    # raises on provider errors so the queue retries and finally marks the job
+    # failed; the queue is the only retry layer, so the provider must not retry too
+    from app.main.gpt_client import complete_study_plan
+    return complete_study_plan(question, assignments, retries=0)
@@ -9,6 +9,8 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(128), nullable=False)
     email = db.Column(db.String(100), nullable=False, unique=True)
     role = db.Column(db.String(20), nullable=False, default="student")  # student, instructor, ta
+    # signed into calendar feed URLs; rotating it revokes every earlier URL
+    feed_salt = db.Column(db.String(32), nullable=True)
 
     def set_password(self, password):
         self.password = generate_password_hash(password, method='pbkdf2:sha256')
@@ -24,6 +26,25 @@ class Classes(db.Model):
     user = db.Column(db.ForeignKey('user.id'), nullable=False)
     classes = db.Column(db.JSON, nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_classes_user", "user"),
+    )
+
+class Enrollment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey("course.id"), nullable=False)
+    role = db.Column(db.String(20), nullable=False, default="student")  # student, instructor, ta
+
+    user = db.relationship("User")
+    course = db.relationship("Course")
+
+    __table_args__ = (
+        db.Index("ix_enrollment_user_course", "user_id", "course_id", unique=True),
+        db.Index("ix_enrollment_course_role", "course_id", "role"),
+    )
+
+
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     course_name = db.Column(db.String(100), nullable=False)
@@ -42,10 +63,17 @@ class Assignment(db.Model):
     allow_submissions = db.Column(db.Boolean, nullable=False, default=True)
     course_id = db.Column(db.Integer, db.ForeignKey("course.id"), nullable=True)
     created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     course = db.relationship("Course")
     creator = db.relationship("User", foreign_keys=[created_by])
 
+    __table_args__ = (
+        db.Index("ix_assignment_course_due", "course_id", "due_date"),
+        db.Index("ix_assignment_due", "due_date"),
+        db.Index("ix_assignment_creator_due", "created_by", "due_date"),
+    )
+
 
 class RubricCriterion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -56,6 +84,10 @@ class RubricCriterion(db.Model):
 
     assignment = db.relationship("Assignment", backref="rubric_criteria", lazy=True)
 
+    __table_args__ = (
+        db.Index("ix_rubric_criterion_assignment", "assignment_id"),
+    )
+
 
 class Submission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -70,6 +102,31 @@ class Submission(db.Model):
     assignment = db.relationship("Assignment", backref="submissions", lazy=True)
     student = db.relationship("User", foreign_keys=[student_id])
 
+    __table_args__ = (
+        db.Index("ix_submission_student_assignment", "student_id", "assignment_id"),
+        db.Index("ix_submission_assignment_status", "assignment_id", "status"),
+        # ungraded submissions per assignment in the (submitted_at, id) order
+        # the staff dashboard's grading queue pages by
+        db.Index(
+            "ix_submission_pending_queue", "assignment_id", "submitted_at", "id",
+            sqlite_where=db.text("status != 'Graded'"),
+        ),
+    )
+
+
+class GradebookEntry(db.Model):
+    """Running earned/possible totals for one student, course and category."""
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey("course.id"), nullable=False)
+    category = db.Column(db.String(20), nullable=False)
+    earned = db.Column(db.Integer, nullable=False, default=0)
+    possible = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_gradebook_student_course_category", "student_id", "course_id", "category", unique=True),
+    )
+
 
 class Announcement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -82,6 +139,11 @@ class Announcement(db.Model):
     course = db.relationship("Course")
     author = db.relationship("User", foreign_keys=[created_by])
 
+    __table_args__ = (
+        db.Index("ix_announcement_course_created", "course_id", "created_at"),
+        db.Index("ix_announcement_created", "created_at"),
+    )
+
 
 class Conversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -89,6 +151,11 @@ class Conversation(db.Model):
     is_group = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # denormalized from Message, maintained by app.main.inbox.record_message
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+
     participants = db.relationship(
         "ConversationParticipant",
         backref="conversation",
@@ -105,19 +172,15 @@ class Conversation(db.Model):
     )
 
     def last_message(self):
-        if not self.messages:
+        if not self.last_message_id:
             return None
-        return self.messages[-1]
+        return db.session.get(Message, self.last_message_id)
 
     def unread_count_for(self, user_id):
         part = ConversationParticipant.query.filter_by(conversation_id=self.id, user_id=user_id).first()
         if not part:
             return 0
-        last_read = part.last_read_at
-        if not last_read:
-            # all messages are unread
-            return len(self.messages)
-        return sum(1 for m in self.messages if m.created_at > last_read)
+        return part.unread_count
 
 
 class ConversationParticipant(db.Model):
@@ -125,9 +188,15 @@ class ConversationParticipant(db.Model):
     conversation_id = db.Column(db.Integer, db.ForeignKey("conversation.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     last_read_at = db.Column(db.DateTime, nullable=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
 
     user = db.relationship("User")
 
+    __table_args__ = (
+        db.Index("ix_participant_user_conversation", "user_id", "conversation_id"),
+        db.Index("ix_participant_conversation_user", "conversation_id", "user_id"),
+    )
+
 
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -139,3 +208,49 @@ class Message(db.Model):
     deleted = db.Column(db.Boolean, default=False, nullable=False)
 
     sender = db.relationship("User", foreign_keys=[sender_id])
+
+    __table_args__ = (
+        db.Index("ix_message_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
+
+
+class ContentVersion(db.Model):
+    """Change counter for one cache key (see app.versions)."""
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+
+class Job(db.Model):
+    """Background job persisted so queued work survives restarts (see app.jobs)."""
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=1)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_job_status_created", "status", "created_at"),
+        db.Index("ix_job_user_created", "user_id", "created_at"),
+    )
+
+
+class LLMCacheEntry(db.Model):
+    """Persisted tier of the LLM response cache (see app.main.llm_cache)."""
+    key = db.Column(db.String(64), primary_key=True)
+    model = db.Column(db.String(50), nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_llm_cache_last_used", "last_used_at"),
+    )
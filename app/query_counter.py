@@ -0,0 +1,147 @@
+"""Per-request SQL statement counting and repeated-query (N+1) detection.
+
+Opt in with ``QUERY_COUNTER_ENABLED``. Engine events then record, for each
+request, how many statements ran, how long the database took and how often
+each statement *shape* repeated (the SQL with ``IN (?, ?, ...)`` lists
+collapsed, so the same lazy load for different rows counts as one shape).
+Every response gets a ``Server-Timing: db;dur=...`` header. A shape that
+runs more than ``QUERY_REPEAT_THRESHOLD`` times in one request is logged
+as a warning, or raises ``RepeatedQueryError`` at the offending statement
+when ``QUERY_REPEAT_RAISE`` is set (tests).
+
+``query_budget`` counts the statements run inside a ``with`` block and
+fails when they exceed a limit, for checking a route with the test client.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RepeatedQueryError(AssertionError):
+    """The same statement shape ran more often than the request allows."""
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More statements ran inside a ``query_budget`` block than its limit."""
+
+
+def statement_shape(statement):
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("(?)", statement)).strip()
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement):
+        """Count ``statement``; returns how many times its shape has now run."""
+        shape = statement_shape(statement)
+        self.count += 1
+        self.shapes[shape] += 1
+        return self.shapes[shape]
+
+    def repeated(self, threshold):
+        """``(shape, runs)`` for every shape that ran more than ``threshold`` times."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self):
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+# QueryStats of the open query_budget blocks
+_budgets = []
+
+
+def _collectors():
+    collectors = list(_budgets)
+    if has_request_context() and "query_stats" in g:
+        collectors.append(g.query_stats)
+    return collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_counter_started", []).append(time.perf_counter())
+    for stats in _budgets:
+        stats.record(statement)
+    if not (has_request_context() and "query_stats" in g):
+        return
+    runs = g.query_stats.record(statement)
+    threshold = current_app.config.get("QUERY_REPEAT_THRESHOLD", 10)
+    if runs == threshold + 1 and current_app.config.get("QUERY_REPEAT_RAISE"):
+        raise RepeatedQueryError(
+            f"statement ran {runs} times in one request: {statement_shape(statement)}"
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_counter_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    for stats in _collectors():
+        stats.duration += elapsed
+
+
+def _listen(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_app(app):
+    if not app.config.get("QUERY_COUNTER_ENABLED"):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen(engine)
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.pop("query_stats", None)
+        if stats is None:
+            return response
+        response.headers.add("Server-Timing", stats.server_timing())
+        threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 10)
+        for shape, runs in stats.repeated(threshold):
+            logger.warning("possible N+1 on %s: %d runs of %s", request.path, runs, shape)
+        return response
+
+
+@contextmanager
+def query_budget(max_queries=None):
+    """Count the statements run in the block; fail if there are more than ``max_queries``.
+
+    Yields the ``QueryStats`` so callers can also inspect durations and
+    repeated shapes. Needs an app context (for the engine).
+    """
+    stats = QueryStats()
+    for engine in db.engines.values():
+        _listen(engine)
+    _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        _budgets.remove(stats)
+    if max_queries is not None and stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{stats.count} statements ran (budget {max_queries}); most repeated: "
+            f"{stats.shapes.most_common(1)[0][0] if stats.shapes else '-'}"
+        )
@@ -0,0 +1,139 @@
+"""EXPLAIN QUERY PLAN checks for the SQL emitted by hot routes.
+
+``check_route_plans`` signs in as one user per role, requests every route
+in ``HOT_ROUTES`` through the test client, records each SELECT the route
+runs and asks SQLite for its plan. A bare ``SCAN <table>`` on anything but
+the small lookup tables means an index is missing or no longer used.
+Run it against a seeded development database (``flask seed-demo``).
+"""
+import re
+from contextlib import contextmanager
+
+from flask import g
+from sqlalchemy import event
+
+from app import db
+
+# Tiny catalog tables whose full scans are expected (dropdowns, user pickers).
+SCAN_ALLOWED_TABLES = {"course", "user"}
+
+HOT_ROUTES = [
+    "/home",
+    "/dashboard",
+    "/dashboard?after={assignment_cursor}&pending_after={assignment_cursor}",
+    "/assignments",
+    "/assignments?after={assignment_cursor}",
+    "/calendar",
+    "/courses",
+    "/courses/{course_id}",
+    "/assignments/{assignment_id}",
+    "/announcements",
+    "/announcements?after={announcement_cursor}",
+    "/announcements/{announcement_id}",
+    "/messages",
+    "/messages/{conversation_id}",
+    "/messages/{conversation_id}/history.json",
+]
+
+# SQLite before 3.36 reports "SCAN TABLE x", later versions "SCAN x"
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+@contextmanager
+def captured_statements(engine):
+    """Collect ``(statement, parameters)`` for every SELECT run on ``engine``."""
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def full_scans(statement, parameters=()):
+    """Plan lines of ``statement`` that scan a whole table without an index."""
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) not in SCAN_ALLOWED_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def _route_ids(user):
+    from app.main.pagination import encode_cursor
+    from app.models import Announcement, Assignment, ConversationParticipant, Course
+
+    participant = ConversationParticipant.query.filter_by(user_id=user.id).first()
+    first_assignment = db.session.query(Assignment.due_date, Assignment.id).order_by(
+        Assignment.due_date, Assignment.id
+    ).first()
+    first_announcement = db.session.query(Announcement.created_at, Announcement.id).order_by(
+        Announcement.created_at.desc(), Announcement.id.desc()
+    ).first()
+    return {
+        "assignment_cursor": encode_cursor(*first_assignment) if first_assignment else None,
+        "announcement_cursor": encode_cursor(*first_announcement) if first_announcement else None,
+        "course_id": db.session.query(Course.id).limit(1).scalar(),
+        "assignment_id": db.session.query(Assignment.id).limit(1).scalar(),
+        "announcement_id": db.session.query(Announcement.id).limit(1).scalar(),
+        "conversation_id": participant.conversation_id if participant else None,
+    }
+
+
+def route_requests(app, routes=None):
+    """Yield ``(label, path, client)`` for every hot route as each seeded role.
+
+    The client is already signed in as the role's first user and the app
+    context stays pushed while the caller issues the request.
+    """
+    from app.models import User
+
+    routes = routes or HOT_ROUTES
+    with app.app_context():
+        users = [
+            User.query.filter_by(role=role).first()
+            for role in ("student", "ta", "instructor")
+        ]
+        for user in filter(None, users):
+            ids = _route_ids(user)
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(user.id)
+                session["_fresh"] = True
+
+            for route in routes:
+                try:
+                    path = route.format(**ids)
+                except KeyError:
+                    continue
+                if "None" in path:
+                    continue
+                # requests reuse the pushed app context; don't let Flask-Login
+                # serve the previous role's user from g
+                g.pop("_login_user", None)
+                yield f"{user.role} {route}", path, client
+
+
+def check_route_plans(app, routes=None):
+    """Return ``(route, statement, plan detail)`` for every full table scan found."""
+    failures = []
+    seen = set()
+    for label, path, client in route_requests(app, routes):
+        with captured_statements(db.engine) as statements:
+            client.get(path)
+        for statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            for detail in full_scans(statement, parameters):
+                failures.append((label, statement, detail))
+    return failures
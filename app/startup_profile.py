@@ -0,0 +1,69 @@
+"""Cold-start profile of the application entry point.
+
+``profile_startup`` builds the app the way ``server.py`` does, in fresh
+interpreters so nothing is already imported: once plainly to time
+``create_app`` and count the modules it loads, and once under
+``python -X importtime`` to attribute the time to individual modules.
+``check_budget`` compares the result with the ``STARTUP_*`` settings.
+"""
+import json
+import subprocess
+import sys
+from collections import namedtuple
+
+ImportTiming = namedtuple("ImportTiming", "name self_us cumulative_us")
+
+ENTRY = "from app import create_app; create_app()"
+
+_MEASURE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    f"{ENTRY}\n"
+    "elapsed = (time.perf_counter() - started) * 1000\n"
+    "print(json.dumps({'startup_ms': elapsed, 'modules': sorted(sys.modules)}))\n"
+)
+
+
+def _run(args, cwd):
+    return subprocess.run(
+        [sys.executable, *args], cwd=cwd, capture_output=True, text=True, check=True
+    )
+
+
+def parse_importtime(output):
+    """``ImportTiming`` rows from ``-X importtime`` stderr, in import order."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def profile_startup(project_root):
+    """Time a cold ``create_app()`` in ``project_root`` and break it down by module."""
+    measured = json.loads(_run(["-c", _MEASURE], project_root).stdout.splitlines()[-1])
+    timings = parse_importtime(_run(["-X", "importtime", "-c", ENTRY], project_root).stderr)
+    return {
+        "startup_ms": measured["startup_ms"],
+        "module_count": len(measured["modules"]),
+        "modules": measured["modules"],
+        "slowest": sorted(timings, key=lambda t: t.self_us, reverse=True),
+    }
+
+
+def check_budget(profile, config):
+    """Human-readable descriptions of every startup budget the profile exceeds."""
+    problems = []
+    budget_ms = config.get("STARTUP_BUDGET_MS")
+    if budget_ms and profile["startup_ms"] > budget_ms:
+        problems.append(f"create_app took {profile['startup_ms']:.0f} ms (budget {budget_ms} ms)")
+    module_budget = config.get("STARTUP_MODULE_BUDGET")
+    if module_budget and profile["module_count"] > module_budget:
+        problems.append(f"{profile['module_count']} modules loaded (budget {module_budget})")
+    loaded = set(profile["modules"])
+    for name in config.get("STARTUP_LAZY_MODULES", ()):
+        if name in loaded:
+            problems.append(f"{name} is imported at startup")
+    return problems
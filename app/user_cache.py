@@ -0,0 +1,107 @@
+"""Cache of signed-in user identities for Flask-Login's ``user_loader``.
+
+Every authenticated request resolves the session's user id to a user.
+``user_cache.load`` answers that from a bounded in-process LRU of
+``CachedUser`` records (id, username, email, role) that expire after
+``USER_CACHE_TTL`` seconds, so a busy worker stops paying a ``user`` query
+per request. The records are detached from the session and never
+written through; code that needs to change a user loads the ``User`` row.
+
+Each app gets its own cache (``init_app``), since user ids only mean
+something within one database; ``user_cache`` is the current app's.
+
+ORM events on ``User`` drop a user's record whenever it is updated or
+deleted in this process (role or password changes, for example), both at
+flush and after commit; other workers pick the change up when their
+record expires. Bulk ``update()`` statements bypass these events.
+"""
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from werkzeug.local import LocalProxy
+
+from app import db
+from app.cache import LRUCache
+
+
+class CachedUser(UserMixin):
+    """Read-only identity of a signed-in user, safe to share between requests."""
+
+    __slots__ = ("id", "username", "email", "role")
+
+    def __init__(self, id, username, email, role):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+
+    def __repr__(self):
+        return f'<user {self.id}: {self.username}>'
+
+
+class UserCache:
+    def __init__(self, maxsize=1024, ttl=60):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def load(self, user_id):
+        """``CachedUser`` for ``user_id``, or ``None`` if there is no such user."""
+        from app.models import User
+
+        if not current_app.config.get("USER_CACHE_ENABLED", True):
+            return User.query.get(user_id)
+        user = self._cache.get(user_id)
+        if user is None:
+            row = db.session.query(User.id, User.username, User.email, User.role).filter(
+                User.id == user_id
+            ).first()
+            if row is None:
+                return None
+            user = CachedUser(*row)
+            self._cache.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        self._cache.delete(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def init_app(app):
+    """Give ``app`` its own user cache and drop records of changed users."""
+    from app.models import User
+
+    app.extensions["user_cache"] = UserCache(
+        maxsize=app.config.get("USER_CACHE_SIZE", 1024),
+        ttl=app.config.get("USER_CACHE_TTL", 60),
+    )
+    for name in ("after_update", "after_delete"):
+        if not event.contains(User, name, _mark_changed):
+            event.listen(User, name, _mark_changed)
+    if not event.contains(Session, "after_commit", _drop_changed):
+        event.listen(Session, "after_commit", _drop_changed)
+
+
+user_cache = LocalProxy(lambda: current_app.extensions["user_cache"])
+
+
+def _invalidate(user_id):
+    if has_app_context() and "user_cache" in current_app.extensions:
+        user_cache.invalidate(user_id)
+
+
+def _mark_changed(mapper, connection, target):
+    # drop now, and again after commit in case a concurrent request re-read the old row
+    _invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+def _drop_changed(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        _invalidate(user_id)
@@ -0,0 +1,93 @@
+"""Persisted change counters for cache and ETag validation.
+
+Writers call ``bump`` with the keys their change touches before they
+commit, so the new version lands in the same transaction. Readers fetch
+the versions of the keys a response depends on with one small query and
+use them as a validator. Because the counters live in the database they
+agree across worker processes and serverless instances.
+"""
+import hashlib
+from datetime import datetime
+
+from app import db
+from app.models import ContentVersion
+
+ASSIGNMENTS = "assignments"
+ANNOUNCEMENTS = "announcements"
+COURSES = "courses"
+SUBMISSIONS = "submissions"
+
+# every scope that bulk writers (seeding) must invalidate
+CONTENT_SCOPES = (ASSIGNMENTS, ANNOUNCEMENTS, COURSES, SUBMISSIONS)
+
+
+def course_key(scope, course_id):
+    """Version key for one course's ``scope`` content (``None`` means general content)."""
+    return f"{scope}:course:{course_id or 'general'}"
+
+
+def student_key(scope, student_id):
+    """Version key for one student's ``scope`` content, e.g. their submissions."""
+    return f"{scope}:student:{student_id}"
+
+
+def bump_course(scope, course_id):
+    """Record a change to ``scope`` content of one course and to the scope as a whole."""
+    bump(scope, course_key(scope, course_id))
+
+
+def bump_scope(scope, course_ids=()):
+    """Invalidate a whole scope, e.g. after bulk writes that bypassed the routes."""
+    existing = [
+        key for (key,) in db.session.query(ContentVersion.key).filter(
+            ContentVersion.key.like(f"{scope}:course:%")
+        ).all()
+    ]
+    bump(scope, course_key(scope, None), *existing, *(course_key(scope, c) for c in course_ids))
+
+
+def bump(*keys):
+    """Increment every key in the current transaction (the caller commits)."""
+    now = datetime.utcnow()
+    for key in dict.fromkeys(keys):
+        updated = ContentVersion.query.filter_by(key=key).update(
+            {ContentVersion.version: ContentVersion.version + 1, ContentVersion.updated_at: now},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.session.add(ContentVersion(key=key, version=1, updated_at=now))
+
+
+def current(keys):
+    """``{key: (version, updated_at)}`` for ``keys``; unknown keys are ``(0, None)``."""
+    keys = list(dict.fromkeys(keys))
+    found = {
+        row.key: (row.version, row.updated_at)
+        for row in ContentVersion.query.filter(ContentVersion.key.in_(keys)).all()
+    } if keys else {}
+    return {key: found.get(key, (0, None)) for key in keys}
+
+
+def fingerprint(versions, *extra):
+    """Stable hex digest of a ``current()`` result plus any extra parts.
+
+    Bump times are included with the numbers: a recreated database restarts
+    its counters, but not at the same moments.
+    """
+    digest = hashlib.sha256()
+    for key in sorted(versions):
+        version, updated_at = versions[key]
+        digest.update(f"{key}={version}@{updated_at.isoformat() if updated_at else ''};".encode())
+    for part in extra:
+        digest.update(f"{part};".encode())
+    return digest.hexdigest()[:32]
+
+
+def content_version(*keys):
+    """Fingerprint of the current versions of ``keys`` (e.g. a fragment-cache key part)."""
+    return fingerprint(current(keys))
+
+
+def last_modified(versions):
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    return max(stamps) if stamps else None
@@ -1,8 +1,14 @@
-from app import create_app, db
+from app import create_app, db, ensure_columns, ensure_indexes
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
+    added = ensure_columns(app)
+    created = ensure_indexes(app)
     print("Database tables created successfully!")
+    if added:
+        print(f"Added {len(added)} missing columns: {', '.join(added)}")
+    if created:
+        print(f"Added {len(created)} missing indexes: {', '.join(created)}")
     print(f"Database location: {app.config['SQLALCHEMY_DATABASE_URI']}")
@@ -0,0 +1,206 @@
+"""Benchmark hot routes against a generated SQLite dataset.
+
+Usage:
+  python scripts/benchmark_routes.py --students 2000 --courses 50 --output bench.json
+  python scripts/benchmark_routes.py --baseline bench.json
+
+Builds (or reuses, with ``--db``) a file-backed SQLite database filled by
+``seed_demo.seed_synthetic``, then requests each route as a student, a TA
+and an instructor through Flask's test client. For every route and role it
+records latency percentiles, the number of SQL statements and the peak
+Python memory allocated while serving one request. Results are printed and
+written as JSON; with ``--baseline`` the run is compared against an earlier
+result file and the script exits 1 when a route got slower than
+``--tolerance`` allows (median latency) or runs more queries than before.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import g
+
+# Ensure project root is on path when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app, db
+from app.config import Config
+from app.query_counter import query_budget
+
+ROUTES = {
+    "home": "/home",
+    "dashboard": "/dashboard",
+    "assignment_list": "/assignments",
+    "calendar_view": "/calendar",
+    "messages_inbox": "/messages",
+    "course_detail": "/courses/{course_id}",
+}
+
+ROLES = ("student", "ta", "instructor")
+
+# latency differences below this are noise on a shared machine
+NOISE_FLOOR_MS = 2.0
+
+
+def build_app(db_path):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + db_path
+        WTF_CSRF_ENABLED = False
+        JOBS_RUN_INLINE = True
+        LLM_PROVIDER = "fake"
+
+    return create_app(BenchmarkConfig)
+
+
+def ensure_dataset(app, params):
+    from seed_demo import SYNTHETIC_PREFIX, seed_synthetic
+    from app.models import User
+
+    with app.app_context():
+        db.create_all()
+        if User.query.filter(User.username.like(f"{SYNTHETIC_PREFIX}%")).first():
+            return None
+        started = time.perf_counter()
+        counts = seed_synthetic(**params)
+        print(f"seeded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
+        return counts
+
+
+def _signed_in_client(app, username):
+    from app.models import Enrollment, User
+
+    user = User.query.filter_by(username=username).first()
+    enrollment = Enrollment.query.filter_by(user_id=user.id).first()
+    course_id = enrollment.course_id if enrollment else 1
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client, {"course_id": course_id}
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+def _get(client, path):
+    # requests reuse the pushed app context; don't let Flask-Login serve the
+    # previous role's user from g
+    g.pop("_login_user", None)
+    return client.get(path)
+
+
+def measure(client, path, requests):
+    """Latency, statement count and peak memory of ``requests`` GETs of ``path``."""
+    response = _get(client, path)  # warm caches and compiled templates
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        _get(client, path)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    with query_budget() as stats:
+        _get(client, path)
+
+    tracemalloc.start()
+    _get(client, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "status": response.status_code,
+        "p50_ms": round(_percentile(timings, 0.50), 2),
+        "p95_ms": round(_percentile(timings, 0.95), 2),
+        "p99_ms": round(_percentile(timings, 0.99), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "queries": stats.count,
+        "db_ms": round(stats.duration * 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run(app, requests):
+    results = {}
+    with app.app_context():
+        for role in ROLES:
+            client, ids = _signed_in_client(app, f"synth-{role}1")
+            for name, route in ROUTES.items():
+                results[f"{role} {name}"] = measure(client, route.format(**ids), requests)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Descriptions of every route that regressed against ``baseline``."""
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        current = results.get(key)
+        if current is None:
+            continue
+        # gate on the median: tail latencies of a few dozen samples are mostly GC noise
+        limit = base["p50_ms"] * (1 + tolerance)
+        if current["p50_ms"] > limit and current["p50_ms"] - base["p50_ms"] > NOISE_FLOOR_MS:
+            regressions.append(f"{key}: p50 {base['p50_ms']} -> {current['p50_ms']} ms")
+        if current["queries"] > base["queries"]:
+            regressions.append(f"{key}: queries {base['queries']} -> {current['queries']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark SpartanSync routes on a synthetic dataset')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--assignments-per-course', type=int, default=10)
+    parser.add_argument('--submission-density', type=float, default=0.6)
+    parser.add_argument('--messages-per-student', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=30, help='Timed requests per route and role')
+    parser.add_argument('--db', help='SQLite file to use (seeded only if it has no synthetic data)')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against a previous JSON result')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed median slowdown (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    params = {
+        "students": args.students,
+        "courses": args.courses,
+        "assignments_per_course": args.assignments_per_course,
+        "submission_density": args.submission_density,
+        "messages_per_student": args.messages_per_student,
+        "seed": args.seed,
+    }
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+    app = build_app(db_path)
+    ensure_dataset(app, params)
+
+    results = run(app, args.requests)
+    print(f"{'route':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'peak KiB':>9}")
+    for key, row in results.items():
+        print(f"{key:<28} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+              f"{row['queries']:>8} {row['peak_kib']:>9}")
+
+    report = {"dataset": params, "requests": args.requests, "results": results}
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get("dataset") != params:
+            print("warning: baseline was recorded on a different dataset")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"regression: {line}")
+        if regressions:
+            return 1
+        print("no regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
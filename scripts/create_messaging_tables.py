@@ -3,20 +3,26 @@
 Usage:
   source venv/bin/activate && python scripts/create_messaging_tables.py
 
-This will call SQLAlchemy `create_all()` to ensure new models' tables exist.
+This will call SQLAlchemy `create_all()` to ensure new models' tables exist,
+then add any model-declared column or index missing from tables that
+already existed.
 """
 import os
 import sys
 
 # Ensure project root is on path when running this script directly
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app import create_app, db
+from app import create_app, db, ensure_columns, ensure_indexes
 
 if __name__ == "__main__":
     app = create_app()
     with app.app_context():
         print("Creating/updating database tables with db.create_all()...")
         db.create_all()
+        for name in ensure_columns(app):
+            print("Added column", name)
+        for name in ensure_indexes(app):
+            print("Added index", name)
         # print list of tables
         from sqlalchemy import text
         res = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table';")).fetchall()
@@ -12,11 +12,14 @@ This script creates demo data including:
 
     python seed_demo.py
     python seed_demo.py --reset
+    python seed_demo.py --scale 20000 [--seed 1] [--reset]
     flask seed-demo
     flask seed-demo --reset
+    flask seed-demo --scale 20000
 '''
 
 import sys
+import time
 import argparse
 import random
 from datetime import datetime, timedelta
@@ -24,7 +27,7 @@ from datetime import datetime, timedelta
 from app import create_app, db
 from app.models import (
     User, Course, Assignment, Submission, Announcement,
-    RubricCriterion, Classes, Conversation, ConversationParticipant, Message
+    RubricCriterion, Classes, Enrollment, Conversation, ConversationParticipant, Message
 )
 
 
@@ -58,6 +61,7 @@ def clear_demo_data():
 
     # Enrollments for demo users
     Classes.query.filter(Classes.user.in_(demo_user_ids)).delete(synchronize_session=False)
+    Enrollment.query.filter(Enrollment.user_id.in_(demo_user_ids)).delete(synchronize_session=False)
 
     # Messages and conversations involving demo users
     demo_conversations = Conversation.query.join(ConversationParticipant).filter(
@@ -501,13 +505,12 @@ def seed_enrollments(students, tas, courses):
         student = students[student_key]
         course_ids = [courses[ck].id for ck in course_keys]
 
-        existing = Classes.query.filter_by(user=student.id).first()
+        existing = Enrollment.query.filter_by(user_id=student.id).first()
         if not existing:
-            enrollment = Classes(
-                user=student.id,
-                classes=course_ids
+            db.session.add_all(
+                Enrollment(user_id=student.id, course_id=course_id, role=student.role)
+                for course_id in course_ids
             )
-            db.session.add(enrollment)
             enrollment_count += 1
             print(f"   ✓ Enrolled {student.username} in {len(course_ids)} courses")
         else:
@@ -518,13 +521,12 @@ def seed_enrollments(students, tas, courses):
         ta = tas[ta_key]
         course_ids = [courses[ck].id for ck in course_keys]
 
-        existing = Classes.query.filter_by(user=ta.id).first()
+        existing = Enrollment.query.filter_by(user_id=ta.id).first()
         if not existing:
-            enrollment = Classes(
-                user=ta.id,
-                classes=course_ids
+            db.session.add_all(
+                Enrollment(user_id=ta.id, course_id=course_id, role=ta.role)
+                for course_id in course_ids
             )
-            db.session.add(enrollment)
             enrollment_count += 1
             print(f"   ✓ Enrolled {ta.username} in {len(course_ids)} course(s)")
         else:
@@ -879,8 +881,280 @@ def seed_messages(students, instructors, tas):
     print(f"Created {conversation_count} conversations with {message_count} messages")
 
 
-def seed_all(reset=False):
-    """Main function to seed all demo data."""
+SYNTHETIC_PREFIX = "synth-"
+# course codes seed_synthetic generates: "SYN" and the course id zero-padded
+# to at least SYNTHETIC_CODE_DIGITS digits (SYN00001, ..., SYN123456). Only
+# all-digit suffixes at least that long match, so real codes like SYN101 never do
+SYNTHETIC_CODE_DIGITS = 5
+SYNTHETIC_COURSE_GLOB = "SYN" + "[0-9]" * SYNTHETIC_CODE_DIGITS + "*"
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def _bulk_insert(model, rows, chunk_size=20000, progress=None):
+    """Insert ``rows`` (dicts with identical keys) with executemany, ``chunk_size`` at a time."""
+    table = model.__table__
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(table.insert(), rows[start:start + chunk_size])
+        if progress:
+            progress(table.name, min(start + chunk_size, len(rows)), len(rows))
+    return len(rows)
+
+
+def seed_synthetic(students=200, courses=20, assignments_per_course=10,
+                   submission_density=0.6, messages_per_student=5,
+                   courses_per_student=4, seed=0, progress=None):
+    """Generate a parameterized synthetic campus for benchmarks and load tests.
+
+    Each course gets one ``synth-instructor<n>`` and one ``synth-ta<n>``;
+    every ``synth-student<n>`` is enrolled in ``courses_per_student`` random
+    courses. ``submission_density`` is the share of (student, assignment)
+    pairs with a submission, and each student has a conversation with an
+    instructor holding ``messages_per_student`` messages. Rows are written
+    with bulk inserts and explicit IDs, every user shares one password hash
+    ('demo'), and the same ``seed`` always produces the same data.
+    ``progress(table, done, total)`` is called after every inserted chunk.
+    Returns ``{table: rows inserted}``.
+    """
+    from werkzeug.security import generate_password_hash
+
+    def insert(model, rows):
+        return _bulk_insert(model, rows, progress=progress)
+
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    password = generate_password_hash("demo", method='pbkdf2:sha256')
+    categories = ["homework", "homework", "homework", "exam", "project"]
+    counts = {}
+
+    user_id = _next_id(User)
+    user_rows = []
+    student_ids, instructor_ids, ta_ids = [], [], []
+    for role, count, ids in (
+        ("student", students, student_ids),
+        ("instructor", courses, instructor_ids),
+        ("ta", courses, ta_ids),
+    ):
+        for n in range(1, count + 1):
+            username = f"{SYNTHETIC_PREFIX}{role}{n}"
+            user_rows.append({
+                "id": user_id,
+                "username": username,
+                "email": f"{username}@spartansync.demo",
+                "password": password,
+                "role": role,
+            })
+            ids.append(user_id)
+            user_id += 1
+    counts["user"] = insert(User, user_rows)
+
+    course_id = _next_id(Course)
+    course_ids = list(range(course_id, course_id + courses))
+    counts["course"] = insert(Course, [
+        {
+            "id": cid,
+            "course_name": f"Synthetic Course {n}",
+            "course_code": f"SYN{cid:0{SYNTHETIC_CODE_DIGITS}d}",
+            "description": "Generated for benchmarks.",
+        }
+        for n, cid in enumerate(course_ids, start=1)
+    ])
+
+    enrollment_rows = []
+    course_students = {cid: [] for cid in course_ids}
+    for sid in student_ids:
+        for cid in rng.sample(course_ids, min(courses_per_student, courses)):
+            enrollment_rows.append({"user_id": sid, "course_id": cid, "role": "student"})
+            course_students[cid].append(sid)
+    for cid, ta_id in zip(course_ids, ta_ids):
+        enrollment_rows.append({"user_id": ta_id, "course_id": cid, "role": "ta"})
+    counts["enrollment"] = insert(Enrollment, enrollment_rows)
+
+    assignment_id = _next_id(Assignment)
+    assignment_rows = []
+    submission_rows = []
+    for cid, instructor_id in zip(course_ids, instructor_ids):
+        for n in range(1, assignments_per_course + 1):
+            due = now + timedelta(days=rng.randint(-45, 60), hours=rng.randint(0, 23))
+            points = rng.choice([50, 100, 100, 150, 200])
+            assignment_rows.append({
+                "id": assignment_id,
+                "title": f"Assignment {n}",
+                "description": "Generated for benchmarks.",
+                "due_date": due,
+                "points": points,
+                "category": rng.choice(categories),
+                "status": "Published",
+                "allow_submissions": True,
+                "course_id": cid,
+                "created_by": instructor_id,
+                "updated_at": now,
+            })
+            for sid in course_students[cid]:
+                if rng.random() >= submission_density:
+                    continue
+                graded = due < now and rng.random() < 0.7
+                submission_rows.append({
+                    "assignment_id": assignment_id,
+                    "student_id": sid,
+                    "submitted_at": min(due, now) - timedelta(hours=rng.randint(1, 72)),
+                    "content": "Generated submission.",
+                    "status": "Graded" if graded else "Submitted",
+                    "score": rng.randint(points // 2, points) if graded else None,
+                })
+            assignment_id += 1
+    counts["assignment"] = insert(Assignment, assignment_rows)
+    counts["submission"] = insert(Submission, submission_rows)
+
+    counts["announcement"] = insert(Announcement, [
+        {
+            "title": f"Week {week} update",
+            "body": "Generated announcement.",
+            "created_at": now - timedelta(days=7 * week, hours=rng.randint(0, 23)),
+            "course_id": cid,
+            "created_by": instructor_id,
+        }
+        for cid, instructor_id in zip(course_ids, instructor_ids)
+        for week in range(1, 4)
+    ])
+
+    conversation_rows, participant_rows, message_rows = [], [], []
+    if messages_per_student:
+        conversation_id = _next_id(Conversation)
+        for sid in student_ids:
+            instructor_id = rng.choice(instructor_ids)
+            started = now - timedelta(days=rng.randint(1, 30))
+            conversation_rows.append({
+                "id": conversation_id,
+                "title": "Question about the course",
+                "is_group": False,
+                "created_at": started,
+            })
+            for uid in (sid, instructor_id):
+                participant_rows.append({
+                    "conversation_id": conversation_id,
+                    "user_id": uid,
+                    "last_read_at": started,
+                })
+            for n in range(messages_per_student):
+                message_rows.append({
+                    "conversation_id": conversation_id,
+                    "sender_id": sid if n % 2 == 0 else instructor_id,
+                    "body": f"Generated message {n + 1}.",
+                    "created_at": started + timedelta(minutes=10 * n),
+                })
+            conversation_id += 1
+    counts["conversation"] = insert(Conversation, conversation_rows)
+    counts["conversation_participant"] = insert(ConversationParticipant, participant_rows)
+    counts["message"] = insert(Message, message_rows)
+    db.session.commit()
+
+    from app import versions
+    from app.main.gradebook import rebuild_gradebook
+    from app.main.inbox import repair_counters
+    rebuild_gradebook()
+    repair_counters()
+    for scope in versions.CONTENT_SCOPES:
+        versions.bump_scope(scope, course_ids)
+    db.session.commit()
+    return counts
+
+
+def _synthetic_users():
+    return db.session.query(User.id).filter(User.username.like(f"{SYNTHETIC_PREFIX}%"))
+
+
+def _synthetic_courses():
+    return db.session.query(Course.id).filter(
+        Course.course_code.op("GLOB")(SYNTHETIC_COURSE_GLOB),
+        ~db.func.substr(Course.course_code, 4).op("GLOB")("*[^0-9]*"),
+    )
+
+
+def clear_synthetic_data():
+    """Delete every synthetic user and the rows hanging off them with set-based deletes."""
+    print("Clearing existing synthetic data...")
+    from app.models import GradebookEntry
+
+    users = _synthetic_users()
+    courses = _synthetic_courses()
+    assignments = db.session.query(Assignment.id).filter(Assignment.created_by.in_(users))
+    conversations = db.session.query(ConversationParticipant.conversation_id).filter(
+        ConversationParticipant.user_id.in_(users)
+    )
+
+    deleted = {}
+    for name, query in (
+        ("message", Message.query.filter(Message.conversation_id.in_(conversations))),
+        ("conversation", Conversation.query.filter(Conversation.id.in_(conversations))),
+        ("conversation_participant", ConversationParticipant.query.filter(
+            ConversationParticipant.user_id.in_(users)
+        )),
+        ("submission", Submission.query.filter(
+            Submission.student_id.in_(users) | Submission.assignment_id.in_(assignments)
+        )),
+        ("rubric_criterion", RubricCriterion.query.filter(RubricCriterion.assignment_id.in_(assignments))),
+        ("gradebook_entry", GradebookEntry.query.filter(
+            GradebookEntry.student_id.in_(users) | GradebookEntry.course_id.in_(courses)
+        )),
+        ("assignment", Assignment.query.filter(Assignment.id.in_(assignments))),
+        ("announcement", Announcement.query.filter(Announcement.created_by.in_(users))),
+        ("enrollment", Enrollment.query.filter(
+            Enrollment.user_id.in_(users) | Enrollment.course_id.in_(courses)
+        )),
+        ("course", Course.query.filter(Course.id.in_(courses))),
+        ("user", User.query.filter(User.id.in_(users))),
+    ):
+        deleted[name] = query.delete(synchronize_session=False)
+
+    from app import versions
+    for scope in versions.CONTENT_SCOPES:
+        versions.bump_scope(scope)
+    db.session.commit()
+    print(f"   ✓ Cleared {sum(deleted.values()):,} synthetic rows")
+    return deleted
+
+
+def _print_progress(table, done, total):
+    print(f"\r   {table}: {done:,}/{total:,} rows", end="\n" if done == total else "", flush=True)
+
+
+def seed_scale(students, seed=0, reset=False):
+    """Seed a synthetic campus of ``students`` students (one course per 100 of them)."""
+    print("\n" + "="*60)
+    print(f"SpartanSync Synthetic Data Seeding ({students:,} students)")
+    print("="*60)
+
+    if reset:
+        clear_synthetic_data()
+    elif _synthetic_users().first() or _synthetic_courses().first():
+        # generated usernames, emails and course codes would collide with the existing ones
+        print("   ⚠ Synthetic data already exists; re-run with --reset to replace it")
+        return {}
+
+    started = time.perf_counter()
+    counts = seed_synthetic(
+        students=students,
+        courses=max(students // 100, 5),
+        assignments_per_course=12,
+        submission_density=0.5,
+        messages_per_student=4,
+        seed=seed,
+        progress=_print_progress,
+    )
+    elapsed = time.perf_counter() - started
+    print(f"\nInserted {sum(counts.values()):,} rows in {elapsed:.1f}s")
+    print("Log in as synth-student1, synth-ta1 or synth-instructor1 (password: 'demo')")
+    return counts
+
+
+def seed_all(reset=False, scale=None, seed=0):
+    """Main function to seed all demo data (or, with ``scale``, a synthetic campus)."""
+    if scale:
+        return seed_scale(scale, seed=seed, reset=reset)
+
     print("\n" + "="*60)
     print("SpartanSync Demo Data Seeding")
     print("="*60)
@@ -914,6 +1188,17 @@ def seed_all(reset=False):
     # Seed messages
     seed_messages(students, instructors, tas)
 
+    # Submissions and messages above were written directly, so derive the
+    # materialized gradebook and conversation counters from them
+    from app import versions
+    from app.main.gradebook import rebuild_gradebook
+    from app.main.inbox import repair_counters
+    rebuild_gradebook()
+    repair_counters()
+    for scope in versions.CONTENT_SCOPES:
+        versions.bump_scope(scope, [c.id for c in courses.values()])
+    db.session.commit()
+
     print("\n" + "="*60)
     print("Demo data seeding complete!")
     print("="*60)
@@ -938,8 +1223,11 @@ def seed_all(reset=False):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Seed demo data for SpartanSync')
     parser.add_argument('--reset', action='store_true', help='Clear existing demo data before seeding')
+    parser.add_argument('--scale', type=int, help='Generate a synthetic campus with this many students')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for --scale data')
     args = parser.parse_args()
 
     app = create_app()
     with app.app_context():
-        seed_all(reset=args.reset)
+        db.create_all()
+        seed_all(reset=args.reset, scale=args.scale, seed=args.seed)
@@ -0,0 +1,98 @@
+"""Shared fixtures: apps backed by private copies of the golden snapshot databases.
+
+``empty_app``, ``demo_app`` and ``large_app`` each get a fresh file copy of
+the matching ``app.db_snapshots`` variant, so a test may write freely and
+setup costs a file copy instead of a seeding run. ``app`` is the demo
+variant, which is what pytest-flask's ``client`` fixture uses.
+``query_budget`` caps the statements a block of requests may run.
+"""
+from contextlib import contextmanager
+
+import pytest
+from flask import g
+
+from app import create_app, db, db_snapshots
+from app.config import Config
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: route benchmarks on the large snapshot")
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    JOBS_RUN_INLINE = True
+    JOB_RETRY_BACKOFF = 0
+    LLM_PROVIDER = "fake"
+
+
+def _snapshot_app(variant, tmp_path):
+    class SnapshotConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = db_snapshots.clone_to_file(variant, tmp_path / f"{variant}.db")
+
+    app = create_app(SnapshotConfig)
+
+    @app.before_request
+    def _forget_login_user():
+        # pytest-flask keeps one app context pushed for the whole test and
+        # client requests reuse it, so drop the user Flask-Login cached in g
+        g.pop("_login_user", None)
+
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def empty_app(tmp_path):
+    yield from _snapshot_app("empty", tmp_path)
+
+
+@pytest.fixture
+def demo_app(tmp_path):
+    yield from _snapshot_app("demo", tmp_path)
+
+
+@pytest.fixture
+def large_app(tmp_path):
+    yield from _snapshot_app("large", tmp_path)
+
+
+@pytest.fixture
+def app(demo_app):
+    return demo_app
+
+
+def signed_in_client(app, username):
+    """Test client with ``username`` already logged in (no password round trip)."""
+    from app.models import User
+
+    with app.app_context():
+        user_id = db.session.query(User.id).filter_by(username=username).scalar()
+    assert user_id is not None, f"no user {username!r} in this snapshot"
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+
+@pytest.fixture
+def login(app):
+    """``login(username)`` returns a test client signed in as that user."""
+    return lambda username: signed_in_client(app, username)
+
+
+@pytest.fixture
+def query_budget(app):
+    """``with query_budget(n) as stats:`` fails the test if the block runs more than ``n`` statements."""
+    from app.query_counter import query_budget as budget
+
+    @contextmanager
+    def _budget(max_queries=None):
+        with app.app_context(), budget(max_queries) as stats:
+            yield stats
+
+    return _budget
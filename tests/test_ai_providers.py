@@ -0,0 +1,185 @@
+import pytest
+
+from app.main import ai_providers
+from app.main.ai_providers import CircuitBreaker, Provider, ProviderUnavailable, get_provider
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Scripted(Provider):
+    """Provider whose attempts fail with the queued exceptions, then answer."""
+
+    name = "scripted"
+
+    def __init__(self, *failures):
+        super().__init__()
+        self.failures = list(failures)
+        self.calls = 0
+
+    def _complete(self, model, messages, timeout):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return "ok"
+
+    def _stream(self, model, messages, timeout):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        yield "o"
+        yield "k"
+
+
+@pytest.fixture
+def no_sleep(app, monkeypatch):
+    slept = []
+    monkeypatch.setattr(ai_providers.time, "sleep", slept.append)
+    app.config.update(LLM_MAX_RETRIES=2, LLM_BREAKER_THRESHOLD=5)
+    return slept
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(threshold=3, reset_after=10, clock=Clock())
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"  # the success reset the count
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_trial_through_after_the_reset_time():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, reset_after=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"  # a failed trial reopens at once
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_released_trial_can_be_retried():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, reset_after=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+def test_transient_failures_are_retried_with_backoff(no_sleep):
+    provider = Scripted(ConnectionError(), TimeoutError())
+    assert provider.complete("m", []) == "ok"
+    assert provider.calls == 3
+    assert len(no_sleep) == 2
+    assert provider.metrics.counters["retries"] == 2
+    assert provider.breaker.state == "closed"
+
+
+def test_backoff_grows_with_full_jitter(app):
+    app.config["LLM_RETRY_BACKOFF"] = 0.5
+    provider = Scripted()
+    for attempt in range(4):
+        delays = [provider._backoff(attempt) for _ in range(50)]
+        assert all(0 <= delay <= 0.5 * 2 ** attempt for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_other_errors_and_exhausted_retries_raise(no_sleep):
+    provider = Scripted(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        provider.complete("m", [])
+    assert provider.calls == 1
+
+    provider = Scripted(*[ConnectionError("down")] * 3)
+    with pytest.raises(ConnectionError):
+        provider.complete("m", [])
+    assert provider.calls == 3
+    assert provider.metrics.counters["failed"] == 1
+
+
+def test_retries_can_be_turned_off_per_call(no_sleep):
+    provider = Scripted(ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        provider.complete("m", [], retries=0)
+    assert provider.calls == 1
+    assert no_sleep == []
+
+
+def test_open_breaker_fails_fast(no_sleep, app):
+    app.config.update(LLM_BREAKER_THRESHOLD=2, LLM_MAX_RETRIES=0)
+    provider = Scripted(*[ConnectionError("down")] * 2)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            provider.complete("m", [])
+
+    with pytest.raises(ProviderUnavailable):
+        provider.complete("m", [])
+    assert provider.calls == 2
+    assert provider.metrics.counters["rejected"] == 1
+
+
+def test_stream_retries_only_before_the_first_delta(no_sleep):
+    provider = Scripted(ConnectionError())
+    assert list(provider.stream("m", [])) == ["o", "k"]
+    assert provider.calls == 2
+
+    class BreaksMidway(Scripted):
+        def _stream(self, model, messages, timeout):
+            self.calls += 1
+            yield "o"
+            raise ConnectionError("reset")
+
+    provider = BreaksMidway()
+    with pytest.raises(ConnectionError):
+        list(provider.stream("m", []))
+    assert provider.calls == 1
+
+
+def test_disconnect_does_not_close_an_open_breaker(no_sleep, app):
+    app.config.update(LLM_BREAKER_THRESHOLD=1, LLM_BREAKER_RESET=0)
+    provider = Scripted()
+    provider.breaker.record_failure()
+
+    stream = provider.stream("m", [])
+    assert next(stream) == "o"
+    stream.close()  # the client went away mid-stream
+
+    assert provider.breaker.state != "closed"
+    assert provider.metrics.counters["cancelled"] == 1
+    assert provider.metrics.counters["succeeded"] == 0
+    assert provider.breaker.allow()  # the abandoned trial does not block the next one
+
+
+def test_each_app_gets_its_own_providers(demo_app, large_app):
+    demo_app.config["LLM_BREAKER_THRESHOLD"] = 1
+    with demo_app.app_context():
+        demo = get_provider("fake")
+        assert get_provider("fake") is demo
+    with large_app.app_context():
+        large = get_provider("fake")
+
+    assert large is not demo
+    assert demo.breaker.threshold == 1
+    assert large.breaker.threshold == large_app.config["LLM_BREAKER_THRESHOLD"]
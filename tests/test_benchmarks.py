@@ -0,0 +1,89 @@
+"""Route benchmarks on the large snapshot (``pytest -m benchmark`` runs only these).
+
+They reuse ``scripts/benchmark_routes.py``. The latency ceiling is loose on
+purpose, to catch order-of-magnitude regressions such as a lost index or an
+N+1 without flaking on a busy machine. ``BENCHMARK_BASELINE`` may name a
+JSON result of the script, which the run is then compared against.
+"""
+import importlib.util
+import json
+import os
+
+import pytest
+from flask_login import current_user
+
+from app import db_snapshots
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "benchmark_routes.py")
+
+# median milliseconds any route may take on the large snapshot
+P50_CEILING_MS = 250
+ROUTE_QUERY_BUDGET = 8
+
+
+def _load_script():
+    spec = importlib.util.spec_from_file_location("benchmark_routes", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+benchmark_routes = _load_script()
+
+
+@pytest.mark.benchmark
+def test_routes_on_large_snapshot(large_app):
+    results = benchmark_routes.run(large_app, requests=10)
+
+    assert set(results) == {
+        f"{role} {name}" for role in benchmark_routes.ROLES for name in benchmark_routes.ROUTES
+    }
+    for key, row in results.items():
+        assert row["status"] == 200, key
+        assert row["queries"] <= ROUTE_QUERY_BUDGET, f"{key}: {row['queries']} queries"
+        assert row["p50_ms"] <= P50_CEILING_MS, f"{key}: p50 {row['p50_ms']} ms"
+
+    baseline = os.getenv("BENCHMARK_BASELINE")
+    if baseline:
+        with open(baseline) as fh:
+            assert benchmark_routes.compare(results, json.load(fh), tolerance=0.25) == []
+
+
+def test_each_role_is_served_as_itself(tmp_path, monkeypatch):
+    # built like the script does, without the fixtures' before_request hook
+    db_snapshots.clone_to_file("large", tmp_path / "large.db")
+    app = benchmark_routes.build_app(str(tmp_path / "large.db"))
+    served = []
+
+    @app.after_request
+    def _record_user(response):
+        served.append(current_user.username)
+        return response
+
+    monkeypatch.setattr(benchmark_routes, "ROUTES", {"home": "/home", "course_detail": "/courses/{course_id}"})
+    benchmark_routes.run(app, requests=1)
+
+    per_request = len(served) // len(benchmark_routes.ROLES)
+    for index, role in enumerate(benchmark_routes.ROLES):
+        assert set(served[index * per_request:(index + 1) * per_request]) == {f"synth-{role}1"}
+
+
+def test_compare_flags_slower_routes_and_extra_queries():
+    baseline = {"results": {
+        "student home": {"p50_ms": 10.0, "queries": 4},
+        "student dashboard": {"p50_ms": 10.0, "queries": 3},
+    }}
+    results = {
+        "student home": {"p50_ms": 20.0, "queries": 4},
+        "student dashboard": {"p50_ms": 11.0, "queries": 5},
+    }
+    assert benchmark_routes.compare(results, baseline, tolerance=0.25) == [
+        "student home: p50 10.0 -> 20.0 ms",
+        "student dashboard: queries 3 -> 5",
+    ]
+
+
+def test_compare_ignores_noise():
+    baseline = {"results": {"student home": {"p50_ms": 1.0, "queries": 4}}}
+    results = {"student home": {"p50_ms": 2.5, "queries": 4}}
+    assert benchmark_routes.compare(results, baseline, tolerance=0.25) == []
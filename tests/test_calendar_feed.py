@@ -0,0 +1,31 @@
+from app import db
+from app.main import calendar_feed
+from app.models import User
+
+
+def _token(username):
+    user = User.query.filter_by(username=username).one()
+    return calendar_feed.feed_token(user)
+
+
+def test_feed_token_serves_the_calendar(app, client):
+    response = client.get(f"/calendar/feed/{_token('demo-student1')}.ics")
+    assert response.status_code == 200
+    assert response.data.startswith(b"BEGIN:VCALENDAR")
+
+
+def test_forged_and_old_style_tokens_are_rejected(app, client):
+    user = User.query.filter_by(username="demo-student1").one()
+    assert client.get("/calendar/feed/not-a-token.ics").status_code == 404
+    assert client.get(f"/calendar/feed/{calendar_feed._serializer().dumps(user.id)}.ics").status_code == 404
+
+
+def test_reset_revokes_the_old_feed_url(app, client, login):
+    old = _token("demo-student1")
+
+    response = login("demo-student1").post("/calendar/feed/reset")
+    assert response.status_code == 302
+    db.session.expire_all()
+
+    assert client.get(f"/calendar/feed/{old}.ics").status_code == 404
+    assert client.get(f"/calendar/feed/{_token('demo-student1')}.ics").status_code == 200
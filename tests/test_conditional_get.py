@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Submission, User
+
+
+def _new_assignment(client):
+    due = (datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%dT%H:%M")
+    response = client.post("/assignments/new", data={
+        "title": "Fresh", "description": "d", "course": 1, "category": "homework",
+        "due_date": due, "points": 10, "allow_submissions": "y",
+    })
+    assert response.status_code == 302
+
+
+@pytest.mark.parametrize("path", ["/assignments", "/courses/1", "/announcements", "/announcements/1"])
+def test_unchanged_page_is_answered_with_304(login, query_budget, path):
+    client = login("demo-student1")
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    with query_budget(4):
+        second = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_if_modified_since(login):
+    client = login("demo-student1")
+    first = client.get("/assignments")
+    response = client.get("/assignments", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+
+
+def test_new_assignment_changes_the_etag(login):
+    student = login("demo-student1")
+    etag = student.get("/assignments").headers["ETag"]
+
+    _new_assignment(login("demo-physics-instructor"))
+
+    response = student.get("/assignments", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert b"Fresh" in response.data
+
+
+def test_grading_changes_only_that_students_etag(app, login):
+    submission = Submission.query.filter(Submission.status != "Graded").first()
+    owner = db.session.get(User, submission.student_id)
+    other = User.query.filter(User.role == "student", User.id != owner.id).first()
+    owner_client, other_client = login(owner.username), login(other.username)
+    owner_etag = owner_client.get("/assignments").headers["ETag"]
+    other_etag = other_client.get("/assignments").headers["ETag"]
+
+    form = {"submission_id": submission.id}
+    form.update({f"criterion_{c.id}": 0 for c in submission.assignment.rubric_criteria})
+    response = login("demo-physics-instructor").post(f"/assignments/{submission.assignment_id}/grade", data=form)
+    assert response.status_code == 302
+
+    assert owner_client.get("/assignments", headers={"If-None-Match": owner_etag}).status_code == 200
+    assert other_client.get("/assignments", headers={"If-None-Match": other_etag}).status_code == 304
+
+
+def test_etags_are_per_user(login):
+    first = login("demo-student1").get("/assignments").headers["ETag"]
+    second = login("demo-student2").get("/assignments").headers["ETag"]
+    assert first != second
+
+
+def test_page_cursor_is_part_of_the_etag(login):
+    client = login("demo-student1")
+    etag = client.get("/assignments").headers["ETag"]
+    assert client.get("/assignments?per_page=2", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_can_be_switched_off(app, login):
+    app.config["CONDITIONAL_GET_ENABLED"] = False
+    client = login("demo-student1")
+    response = client.get("/assignments", headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
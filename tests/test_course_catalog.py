@@ -0,0 +1,68 @@
+from app import db, versions
+from app.main.course_catalog import course_catalog
+from app.models import Course
+
+
+def _names():
+    return [record.course_name for record in course_catalog.all()]
+
+
+def _create_elsewhere(name):
+    """Add a course the way another worker would: no local invalidation."""
+    course = Course(course_name=name, course_code=name.upper(), description="")
+    db.session.add(course)
+    db.session.flush()
+    versions.bump_course(versions.COURSES, course.id)
+    db.session.commit()
+    return course.id
+
+
+def test_reads_between_checks_run_no_sql(app, query_budget):
+    expected = [name for (name,) in db.session.query(Course.course_name).order_by(Course.course_name)]
+    assert _names() == expected
+    with query_budget(0):
+        assert _names() == expected
+        assert course_catalog.get(course_catalog.all()[0].id).course_name == expected[0]
+
+
+def test_course_create_shows_up_at_once(app, login):
+    client = login("demo-physics-instructor")
+    assert "Acoustics" not in _names()
+    loads = course_catalog.stats()["loads"]
+
+    response = client.post(
+        "/courses/new", data={"course_name": "Acoustics", "course_code": "PHYS 330", "description": ""}
+    )
+    assert response.status_code == 302
+    assert "Acoustics" in _names()
+    assert course_catalog.stats()["loads"] == loads + 1
+
+
+def test_other_workers_courses_appear_after_the_version_check(app):
+    app.config["COURSE_CATALOG_CHECK_SECONDS"] = 3600
+    before = _names()
+    course_id = _create_elsewhere("Zoology")
+
+    assert _names() == before
+    app.config["COURSE_CATALOG_CHECK_SECONDS"] = 0
+    assert "Zoology" in _names()
+    assert course_catalog.get(course_id).course_name == "Zoology"
+
+
+def test_unknown_ids_recheck_the_version(app):
+    app.config["COURSE_CATALOG_CHECK_SECONDS"] = 3600
+    _names()
+    course_id = _create_elsewhere("Botany")
+
+    assert course_catalog.get(course_id).course_name == "Botany"
+    assert course_catalog.get(-1) is None
+
+
+def test_apps_keep_their_own_catalog(demo_app, large_app):
+    with demo_app.app_context():
+        demo = _names()
+    with large_app.app_context():
+        large = _names()
+    with demo_app.app_context():
+        assert _names() == demo
+    assert demo != large
@@ -0,0 +1,143 @@
+import pytest
+
+from app import db
+from app.main import gradebook
+from app.models import Assignment, Course, GradebookEntry, RubricCriterion, Submission, User
+
+
+def _entry(student_id, course_id, category):
+    entry = GradebookEntry.query.filter_by(
+        student_id=student_id, course_id=course_id, category=category
+    ).first()
+    return (entry.earned, entry.possible) if entry else (0, 0)
+
+
+def _grade(client, submission, points_each):
+    criteria = RubricCriterion.query.filter_by(assignment_id=submission.assignment_id).all()
+    form = {"submission_id": submission.id}
+    form.update({f"criterion_{c.id}": min(points_each, c.max_points) for c in criteria})
+    response = client.post(f"/assignments/{submission.assignment_id}/grade", data=form)
+    assert response.status_code == 302
+    db.session.expire_all()
+    return sum(min(points_each, c.max_points) for c in criteria)
+
+
+@pytest.fixture
+def ungraded(app):
+    """A submitted, ungraded submission to an assignment with rubric criteria, in a course."""
+    submission = (
+        Submission.query.join(Assignment)
+        .filter(
+            Submission.status != "Graded",
+            Assignment.course_id.isnot(None),
+            Assignment.rubric_criteria.any(),
+        )
+        .first()
+    )
+    assert submission is not None
+    return submission
+
+
+def test_snapshot_gradebook_matches_submissions(app):
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_grading_adds_to_the_gradebook(app, login, ungraded):
+    assignment = ungraded.assignment
+    key = (ungraded.student_id, assignment.course_id, assignment.category)
+    earned, possible = _entry(*key)
+
+    total = _grade(login("demo-physics-instructor"), ungraded, 5)
+
+    assert _entry(*key) == (earned + total, possible + assignment.points)
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_regrading_replaces_the_previous_score(app, login, ungraded):
+    client = login("demo-physics-instructor")
+    key = (ungraded.student_id, ungraded.assignment.course_id, ungraded.assignment.category)
+    first = _grade(client, ungraded, 5)
+    after_first = _entry(*key)
+
+    second = _grade(client, db.session.get(Submission, ungraded.id), 1)
+
+    assert _entry(*key) == (after_first[0] - first + second, after_first[1])
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_resubmitting_withdraws_the_grade(app, login, ungraded):
+    assignment = ungraded.assignment
+    assignment.allow_submissions = True
+    db.session.commit()
+    key = (ungraded.student_id, assignment.course_id, assignment.category)
+    before = _entry(*key)
+    _grade(login("demo-physics-instructor"), ungraded, 5)
+
+    student = db.session.get(User, ungraded.student_id)
+    response = login(student.username).post(
+        f"/assignments/{assignment.id}", data={"content": "second try", "submit": "Submit"}
+    )
+    assert response.status_code == 302
+    db.session.expire_all()
+
+    assert db.session.get(Submission, ungraded.id).status == "Submitted"
+    assert _entry(*key) == before
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_deleting_an_assignment_drops_its_grades(app, login):
+    graded = Submission.query.join(Assignment).filter(
+        Submission.status == "Graded", Assignment.course_id.isnot(None)
+    ).first()
+    response = login("demo-physics-instructor").post(f"/assignments/{graded.assignment_id}/delete")
+    assert response.status_code == 302
+    db.session.expire_all()
+
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_assignment_changes_rehome_graded_submissions(app):
+    graded = Submission.query.join(Assignment).filter(
+        Submission.status == "Graded", Assignment.course_id.isnot(None)
+    ).first()
+    assignment = graded.assignment
+    old_points, old_category = assignment.points, assignment.category
+    assignment.points += 10
+    assignment.category = "exam" if old_category != "exam" else "project"
+    gradebook.record_assignment_change(assignment, old_points=old_points, old_category=old_category)
+    db.session.commit()
+
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_rebuild_reports_and_repairs_drift(app):
+    entry = GradebookEntry.query.first()
+    entry.earned += 7
+    db.session.commit()
+    key = (entry.student_id, entry.course_id, entry.category)
+
+    assert gradebook.rebuild_gradebook(check_only=True) == [key]
+    assert gradebook.rebuild_gradebook() == [key]
+    assert gradebook.rebuild_gradebook(check_only=True) == []
+
+
+def test_batched_grades_match_the_gradebook(app):
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id)]
+    for student in User.query.filter_by(role="student"):
+        assert gradebook.compute_weighted_grades(student.id, course_ids) == gradebook.weighted_grades(
+            student.id, course_ids
+        )
+
+
+def test_grades_for_many_courses_take_one_statement(app, query_budget):
+    student_id = GradebookEntry.query.first().student_id
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id)]
+
+    with query_budget(1):
+        live = gradebook.compute_weighted_grades(student_id, course_ids)
+    with query_budget(1):
+        stored = gradebook.weighted_grades(student_id, course_ids)
+
+    assert set(live) == set(course_ids)
+    assert any(payload["has_grades"] for payload in live.values())
+    assert live == stored
@@ -0,0 +1,182 @@
+import pytest
+
+from app import db
+from app.main import inbox
+from app.models import Conversation, ConversationParticipant, Message, User
+
+
+def _user(username):
+    return User.query.filter_by(username=username).one()
+
+
+def _start(client, recipient, body, title="Lab partners"):
+    response = client.post("/messages/new", data={
+        "recipient_id": _user(recipient).id, "body": body, "title": title,
+    })
+    assert response.status_code == 302
+    return int(response.headers["Location"].rstrip("/").rsplit("/", 1)[-1])
+
+
+def _reply(client, conv_id, body):
+    assert client.post(f"/messages/{conv_id}", data={"body": body}).status_code == 302
+
+
+def _part(conv_id, username):
+    db.session.expire_all()
+    return ConversationParticipant.query.filter_by(
+        conversation_id=conv_id, user_id=_user(username).id
+    ).one()
+
+
+@pytest.fixture
+def pair(login):
+    return login("demo-student1"), login("demo-student2")
+
+
+def test_sending_and_reading_keep_the_counters_exact(app, pair):
+    alice, bob = pair
+    conv_id = _start(alice, "demo-student2", "hi")
+    _reply(alice, conv_id, "are you there?")
+    _reply(bob, conv_id, "yes")
+    _reply(alice, conv_id, "great")
+
+    conv = db.session.get(Conversation, conv_id)
+    last = Message.query.filter_by(conversation_id=conv_id).order_by(Message.id.desc()).first()
+    assert (conv.message_count, conv.last_message_id, conv.last_message_at) == (4, last.id, last.created_at)
+    assert _part(conv_id, "demo-student1").unread_count == 0
+    assert _part(conv_id, "demo-student2").unread_count == 1
+
+    assert bob.get(f"/messages/{conv_id}").status_code == 200
+    assert _part(conv_id, "demo-student2").unread_count == 0
+    assert inbox.repair_counters() == (0, 0)
+
+
+def test_viewing_older_history_does_not_mark_read(app, pair):
+    alice, bob = pair
+    conv_id = _start(alice, "demo-student2", "hi")
+    first = db.session.get(Conversation, conv_id).last_message_id
+    _reply(alice, conv_id, "again")
+
+    bob.get(f"/messages/{conv_id}?before={first + 1}")
+    assert _part(conv_id, "demo-student2").unread_count == 2
+
+
+def test_repair_reports_and_fixes_drift(app, pair):
+    alice, _ = pair
+    conv_id = _start(alice, "demo-student2", "hi")
+    _part(conv_id, "demo-student2").unread_count = 5
+    conv = db.session.get(Conversation, conv_id)
+    conv.message_count = 9
+    conv.last_message_id = None
+    db.session.commit()
+
+    assert inbox.repair_counters() == (1, 1)
+    assert inbox.repair_counters() == (0, 0)
+    assert db.session.get(Conversation, conv_id).message_count == 1
+    assert _part(conv_id, "demo-student2").unread_count == 1
+
+
+def test_snapshot_counters_match_messages(app):
+    assert inbox.repair_counters() == (0, 0)
+
+
+def _conversation_ids(user_id, **kwargs):
+    items, has_next = inbox.inbox_page(user_id, **kwargs)
+    return [item["conversation"].id for item in items], has_next
+
+
+def test_inbox_lists_newest_activity_first(app, pair):
+    alice, bob = pair
+    alice_id = _user("demo-student1").id
+    before, _ = _conversation_ids(alice_id)
+
+    conv_id = _start(bob, "demo-student1", "new thread")
+    assert _conversation_ids(alice_id)[0] == [conv_id] + before
+
+    _reply(alice, before[-1], "bump the oldest")
+    ids, _ = _conversation_ids(alice_id)
+    assert ids[0] == before[-1]
+
+    items, _ = inbox.inbox_page(alice_id)
+    by_id = {item["conversation"].id: item for item in items}
+    assert by_id[conv_id]["unread"] == 1
+    assert by_id[conv_id]["last_message"].body == "new thread"
+    assert by_id[conv_id]["last_message"].sender.username == "demo-student2"
+
+
+def test_inbox_pages(app, pair):
+    alice, _ = pair
+    _start(alice, "demo-student3", "one more")
+    alice_id = _user("demo-student1").id
+    everything, has_next = _conversation_ids(alice_id)
+    assert len(everything) == 3 and not has_next
+
+    pages = [_conversation_ids(alice_id, page=page, per_page=2) for page in (1, 2)]
+    assert pages == [(everything[:2], True), (everything[2:], False)]
+    assert _conversation_ids(alice_id, page=0, per_page=2) == pages[0]
+
+
+def test_inbox_route_is_one_query_whatever_the_threads(app, login, query_budget):
+    client = login("demo-student1")
+    for n in range(5):
+        _reply(client, 1, f"message {n}")
+    for sender in ("demo-student2", "demo-student3", "demo-student4"):
+        _start(login(sender), "demo-student1", f"hello from {sender}")
+    client.get("/messages")
+    db.session.expunge_all()  # senders must come from the inbox query, not the identity map
+
+    with query_budget(3):
+        body = client.get("/messages").get_data(as_text=True)
+    assert "message 4" in body
+    for sender in ("demo-student2", "demo-student3", "demo-student4"):
+        assert f"{sender}: hello from {sender}" in body
+
+
+@pytest.fixture
+def long_thread(app, login):
+    app.config["MESSAGE_PAGE_SIZE"] = 3
+    client = login("demo-student1")
+    for n in range(7):
+        _reply(client, 1, f"line {n}")
+    expected = [m.id for m in Message.query.filter_by(conversation_id=1).order_by(Message.created_at, Message.id)]
+    return client, expected
+
+
+def test_history_windows_walk_back_without_gaps(long_thread):
+    _, expected = long_thread
+    window, has_older = inbox.message_history(1, limit=3)
+    seen = [m.id for m in window]
+    while has_older:
+        window, has_older = inbox.message_history(1, before_id=window[0].id, limit=3)
+        assert len(window) <= 3
+        seen = [m.id for m in window] + seen
+    assert seen == expected
+
+
+def test_history_cursor_must_belong_to_the_conversation(long_thread):
+    other = Message.query.filter(Message.conversation_id != 1).first()
+    assert inbox.message_history(1, before_id=other.id) == ([], False)
+
+
+def test_history_json_pages_with_next_before(long_thread):
+    client, expected = long_thread
+    url, seen = "/messages/1/history.json", []
+    while url:
+        payload = client.get(url).get_json()
+        seen = [m["id"] for m in payload["messages"]] + seen
+        assert payload["has_older"] == (payload["next_before"] is not None)
+        url = payload["next_before"] and f"/messages/1/history.json?before={payload['next_before']}"
+    assert seen == expected
+
+
+def test_older_fragment_links_to_the_next_window(long_thread):
+    client, expected = long_thread
+    body = client.get(f"/messages/1/older?before={expected[-3]}").get_data(as_text=True)
+    assert f"before={expected[-6]}" in body
+    assert "line 3" in body and "line 4" not in body
+
+
+def test_history_is_for_participants_only(long_thread, login):
+    client = login("demo-student2")
+    assert client.get("/messages/1/history.json").status_code == 404
+    assert client.get("/messages/1/older").status_code == 404
@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.jobs import job_queue
+from app.main.ai_providers import FakeProvider
+from app.models import Job
+
+calls = []
+
+
+@job_queue.task("test_flaky")
+def flaky(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError(f"attempt {len(calls)} failed")
+    return "done"
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+def _reload(job_id):
+    # jobs run in their own app context and session; drop this session's stale copy
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+
+def _job(status, started_at=None):
+    job = Job(
+        id=uuid.uuid4().hex, kind="test_flaky", payload={"fail_times": 0},
+        status=status, started_at=started_at, max_attempts=3,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_failed_attempts_are_retried(app):
+    job = _reload(job_queue.enqueue("test_flaky", {"fail_times": 2}))
+    assert job.status == "succeeded"
+    assert job.attempts == 3
+    assert job.result == "done"
+    assert job.error is None
+
+
+def test_job_fails_after_max_attempts(app):
+    job = _reload(job_queue.enqueue("test_flaky", {"fail_times": 5}, max_attempts=2))
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.error == "attempt 2 failed"
+    assert job.finished_at is not None
+    assert len(calls) == 2
+
+
+def test_unknown_kind_is_rejected(app):
+    with pytest.raises(KeyError):
+        job_queue.enqueue("no_such_kind", {})
+
+
+def test_recover_requeues_only_expired_leases(app):
+    lease = timedelta(seconds=app.config["JOB_LEASE_SECONDS"])
+    expired = _job("running", datetime.utcnow() - lease - timedelta(minutes=1))
+    unclaimed = _job("running")
+    live = _job("running", datetime.utcnow())
+    queued = _job("queued")
+
+    job_queue.recover()
+
+    for job_id in (expired, unclaimed, queued):
+        assert _reload(job_id).status == "succeeded"
+    assert _reload(live).status == "running"
+
+
+def test_study_plan_job_fails_when_the_provider_keeps_failing(app, login, monkeypatch):
+    app.config.update(LLM_RETRY_BACKOFF=0, LLM_BREAKER_THRESHOLD=100)
+
+    def down(self, model, messages, timeout):
+        calls.append("upstream")
+        raise ConnectionError("provider down")
+
+    monkeypatch.setattr(FakeProvider, "_complete", down)
+    client = login("demo-student1")
+    response = client.post("/study-plan", data={"topics": "job retry test"}, headers={"Accept": "application/json"})
+    job = _reload(response.get_json()["job_id"])
+
+    assert job.status == "failed"
+    assert job.attempts == app.config["JOB_MAX_ATTEMPTS"]
+    assert "provider down" in job.error
+    # the queue retries; the provider does not retry inside each attempt
+    assert len(calls) == app.config["JOB_MAX_ATTEMPTS"]
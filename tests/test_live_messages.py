@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.main import inbox
+from app.main.broker import MessageBroker, broker
+from app.models import ConversationParticipant, Message, User
+
+
+def _user_id(username):
+    return db.session.query(User.id).filter_by(username=username).scalar()
+
+
+def _send(conv_id, username, body):
+    """Commit a message the way another worker would: no broker publish."""
+    message = Message(conversation_id=conv_id, sender_id=_user_id(username), body=body)
+    db.session.add(message)
+    inbox.record_message(message)
+    db.session.commit()
+    return message.id
+
+
+def _unread(conv_id, username):
+    db.session.expire_all()
+    return ConversationParticipant.query.filter_by(
+        conversation_id=conv_id, user_id=_user_id(username)
+    ).one().unread_count
+
+
+@pytest.fixture
+def fast(app):
+    app.config.update(MESSAGE_STREAM_KEEPALIVE=0.05, MESSAGE_POLL_TIMEOUT=0.05)
+    return app
+
+
+def test_broker_delivers_to_each_subscriber_until_full():
+    channels = MessageBroker(max_pending=1)
+    first, second = channels.subscribe(7), channels.subscribe(7)
+    assert channels.subscriber_count(7) == 2
+
+    assert channels.publish(7, {"id": 1}) == 2
+    assert channels.publish(8, {"id": 2}) == 0
+    assert channels.publish(7, {"id": 3}) == 0  # both queues are full
+    assert first.get_nowait() == {"id": 1}
+
+    channels.unsubscribe(7, first)
+    channels.unsubscribe(7, second)
+    channels.unsubscribe(7, second)
+    assert channels.subscriber_count(7) == 0
+
+
+def test_stream_replays_after_last_event_id(fast, login):
+    first_id = Message.query.filter_by(conversation_id=1).order_by(Message.id).first().id
+    response = login("demo-student1").get("/messages/1/stream", headers={"Last-Event-ID": str(first_id)})
+    chunks = response.response
+    assert next(chunks).startswith(b"retry:")
+
+    replayed = next(chunks).decode()
+    assert replayed.startswith(f"id: {first_id + 1}\nevent: message\ndata: ")
+    response.close()
+
+
+def test_stream_picks_up_messages_from_other_workers_and_marks_them_read(fast, login):
+    response = login("demo-student1").get("/messages/1/stream")
+    chunks = response.response
+    assert next(chunks).startswith(b"retry:")
+    assert next(chunks) == b": keepalive\n\n"
+
+    message_id = _send(1, "demo-physics-instructor", "from another worker")
+    assert _unread(1, "demo-student1") == 1
+
+    event = next(chunks).decode()
+    assert event.startswith(f"id: {message_id}\n") and "from another worker" in event
+    next(chunks)  # the stream marks the delivery read before waiting again
+    assert _unread(1, "demo-student1") == 0
+    response.close()
+
+
+def test_poll_returns_new_messages_and_marks_them_read(fast, login):
+    client = login("demo-student1")
+    last_id = client.get("/messages/1/poll?after=0").get_json()["last_id"]
+
+    empty = client.get(f"/messages/1/poll?after={last_id}").get_json()
+    assert empty == {"messages": [], "last_id": last_id}
+
+    message_id = _send(1, "demo-physics-instructor", "polled")
+    assert _unread(1, "demo-student1") == 1
+    payload = client.get(f"/messages/1/poll?after={last_id}").get_json()
+    assert [m["id"] for m in payload["messages"]] == [message_id]
+    assert payload["last_id"] == message_id
+    assert _unread(1, "demo-student1") == 0
+
+
+def test_poll_wakes_on_publish(fast, login):
+    fast.config["MESSAGE_POLL_TIMEOUT"] = 5
+    client = login("demo-student1")
+    last_id = client.get("/messages/1/poll?after=0").get_json()["last_id"]
+    payload = {"id": last_id + 1, "body": "published"}
+
+    publisher = threading.Timer(0.1, broker.publish, (1, payload))
+    publisher.start()
+    started = time.perf_counter()
+    result = client.get(f"/messages/1/poll?after={last_id}").get_json()
+    publisher.join()
+
+    assert result["messages"] == [payload]
+    assert time.perf_counter() - started < 5
+
+
+def test_streams_and_polls_are_for_participants_only(fast, login):
+    client = login("demo-student2")
+    assert client.get("/messages/1/stream").status_code == 404
+    assert client.get("/messages/1/poll").status_code == 404
+
+
+@pytest.mark.parametrize("transport", ["sse", "poll"])
+def test_page_announces_the_configured_transport(app, login, transport):
+    app.config["MESSAGE_LIVE_TRANSPORT"] = transport
+    body = login("demo-student1").get("/messages/1").get_data(as_text=True)
+    assert f'data-transport="{transport}"' in body
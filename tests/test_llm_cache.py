@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.main.llm_cache import ResponseCache, cache_key, response_cache
+from app.models import Announcement, LLMCacheEntry
+
+
+def _compute(text):
+    calls = []
+
+    def compute():
+        calls.append(text)
+        return text
+
+    return compute, calls
+
+
+def test_cache_key_covers_every_part():
+    key = cache_key("m", "system", "user")
+    assert key == cache_key("m", "system", "user")
+    assert len({key, cache_key("m2", "system", "user"), cache_key("m", "other", "user"),
+                cache_key("m", "system", "user2"), cache_key("m", "systemuser", "")}) == 5
+
+
+def test_misses_compute_once_then_hit_memory_then_the_table(app):
+    compute, calls = _compute("plan")
+    assert response_cache.get_or_compute("k", "m", compute) == "plan"
+    assert response_cache.get_or_compute("k", "m", compute) == "plan"
+    assert calls == ["plan"]
+
+    restarted = ResponseCache()
+    assert restarted.get_or_compute("k", "m", compute) == "plan"
+    assert restarted.lookup("k") == "plan"
+    assert calls == ["plan"]
+
+    assert {name: response_cache.stats()[name] for name in ("misses", "memory_hits", "stores")} == {
+        "misses": 1, "memory_hits": 1, "stores": 1,
+    }
+    assert {name: restarted.stats()[name] for name in ("db_hits", "memory_hits", "hit_rate")} == {
+        "db_hits": 1, "memory_hits": 1, "hit_rate": 1.0,
+    }
+
+
+def test_table_hits_leave_the_callers_session_alone(app):
+    response_cache.store("k", "m", "plan")
+    announcement = Announcement.query.first()
+    title = announcement.title
+    announcement.title = "not committed"
+    db.session.flush()
+
+    assert ResponseCache().lookup("k") == "plan"
+    db.session.rollback()
+
+    assert db.session.get(Announcement, announcement.id).title == title
+
+
+def test_concurrent_misses_share_one_computation(app):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "plan"
+
+    results = []
+
+    def ask():
+        with app.app_context():
+            results.append(response_cache.get_or_compute("k", "m", slow))
+
+    leader = threading.Thread(target=ask)
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while response_cache.stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == ["plan"] * 5
+    assert calls == [1]
+
+
+def test_failures_are_not_cached(app):
+    def broken():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        response_cache.get_or_compute("k", "m", broken)
+    assert response_cache.lookup("k") is None
+    assert LLMCacheEntry.query.count() == 0
+
+    compute, calls = _compute("plan")
+    assert response_cache.get_or_compute("k", "m", compute) == "plan"
+    assert calls == ["plan"]
+
+
+def test_memory_tier_evicts_least_recently_used(app):
+    cache = ResponseCache(memory_size=2)
+    for key in ("a", "b", "c"):
+        cache.store(key, "m", key.upper())
+
+    assert cache.stats()["memory"]["evictions"] == 1
+    assert cache.lookup("a") == "A"  # evicted from memory, still in the table
+    assert cache.stats()["db_hits"] == 1
+
+
+def test_table_is_capped_to_the_most_recently_used(app):
+    cache = ResponseCache(db_size=2)
+    for key in ("a", "b", "c"):
+        cache.store(key, "m", key.upper())
+    assert sorted(key for (key,) in db.session.query(LLMCacheEntry.key)) == ["b", "c"]
+
+    other_worker = ResponseCache(db_size=2)
+    assert other_worker.lookup("b") == "B"  # a table hit counts as a use
+    other_worker.store("d", "m", "D")
+    assert sorted(key for (key,) in db.session.query(LLMCacheEntry.key)) == ["b", "d"]
+
+
+def test_entries_expire_in_both_tiers(app):
+    cache = ResponseCache(ttl=0.05)
+    cache.store("k", "m", "plan")
+    assert cache.lookup("k") == "plan"
+
+    time.sleep(0.06)
+    assert cache.lookup("k") is None
+    assert ResponseCache().lookup("k") is None
+
+    cache.store("other", "m", "plan")  # stores sweep expired rows
+    assert [key for (key,) in db.session.query(LLMCacheEntry.key)] == ["other"]
+
+
+def test_clear_empties_both_tiers(app):
+    response_cache.store("k", "m", "plan")
+    response_cache.clear()
+    assert response_cache.lookup("k") is None
+    assert LLMCacheEntry.query.count() == 0
+
+
+def test_apps_keep_their_own_memory_tier(demo_app, large_app):
+    with demo_app.app_context():
+        response_cache.store("k", "m", "demo plan")
+    with large_app.app_context():
+        assert response_cache.lookup("k") is None
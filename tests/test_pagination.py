@@ -0,0 +1,132 @@
+import html
+import re
+from datetime import datetime, timedelta
+
+from app.main.pagination import decode_cursor, encode_cursor, keyset_page
+from app.models import Assignment, Submission, User
+
+ROW = re.compile(r'/assignments/(\d+)" class="text-xl')
+LINK = re.compile(r'href="([^"]+)"[^>]*>\s*(?:&larr;)?\s*(Earlier|Later)')
+
+
+def _by_due_date():
+    return [a.id for a in Assignment.query.order_by(Assignment.due_date, Assignment.id)]
+
+
+def _page(query, **kwargs):
+    return keyset_page(
+        query, Assignment.due_date, Assignment.id, key=lambda a: (a.due_date, a.id), **kwargs
+    )
+
+
+def _get(client, url):
+    body = client.get(url).get_data(as_text=True)
+    links = {label: html.unescape(href) for href, label in LINK.findall(body)}
+    return [int(i) for i in ROW.findall(body)], links
+
+
+def test_cursor_round_trip():
+    due = datetime(2026, 3, 1, 9, 30, 15, 250)
+    assert decode_cursor(encode_cursor(due, 42)) == (due, 42)
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor(None) is None
+
+
+def test_walks_forward_and_back_without_gaps(app):
+    expected = _by_due_date()
+
+    seen, page = [], _page(Assignment.query, limit=4)
+    seen += [a.id for a in page.items]
+    while page.next_cursor:
+        page = _page(Assignment.query, after=page.next_cursor, limit=4)
+        seen += [a.id for a in page.items]
+    assert seen == expected
+
+    back = [a.id for a in page.items]
+    while page.prev_cursor:
+        page = _page(Assignment.query, before=page.prev_cursor, limit=4)
+        back = [a.id for a in page.items] + back
+    assert back == expected
+
+
+def test_start_opens_at_the_first_upcoming_row(app):
+    now = datetime.utcnow()
+    expected = _by_due_date()
+    upcoming = [a.id for a in Assignment.query.filter(Assignment.due_date >= now).order_by(
+        Assignment.due_date, Assignment.id
+    )]
+    assert 0 < len(upcoming) < len(expected)
+
+    page = _page(Assignment.query, limit=3, start=now)
+    assert [a.id for a in page.items] == upcoming[:3]
+    assert page.prev_cursor is not None
+
+    earlier = _page(Assignment.query, before=page.prev_cursor, limit=100)
+    assert [a.id for a in earlier.items] + upcoming == expected
+
+
+def test_start_past_every_row_shows_the_last_page(app):
+    page = _page(Assignment.query, limit=3, start=datetime.utcnow() + timedelta(days=3650))
+    assert [a.id for a in page.items] == _by_due_date()[-3:]
+    assert page.next_cursor is None and page.prev_cursor is not None
+
+
+def test_start_before_every_row_has_no_earlier_link(app):
+    page = _page(Assignment.query, limit=3, start=datetime(2000, 1, 1))
+    assert [a.id for a in page.items] == _by_due_date()[:3]
+    assert page.prev_cursor is None
+
+
+def test_assignment_list_pages_cover_every_assignment(app, login):
+    client = login("demo-physics-instructor")
+    expected = _by_due_date()
+    first_upcoming = Assignment.query.filter(Assignment.due_date >= datetime.utcnow()).order_by(
+        Assignment.due_date, Assignment.id
+    ).first()
+
+    ids, links = _get(client, "/assignments?per_page=4")
+    assert ids[0] == first_upcoming.id
+    start_links = links
+
+    seen = list(ids)
+    while "Later" in links:
+        ids, links = _get(client, links["Later"])
+        seen += ids
+    links = start_links
+    while "Earlier" in links:
+        ids, links = _get(client, links["Earlier"])
+        seen = ids + seen
+    assert seen == expected
+
+
+def test_bad_cursor_and_oversized_page(app, login):
+    client = login("demo-physics-instructor")
+    app.config["MAX_PAGE_SIZE"] = 5
+    assert client.get("/assignments?after=garbage").status_code == 200
+    ids, _ = _get(client, "/assignments?per_page=1000")
+    assert len(ids) == 5
+
+
+def test_pending_queue_pages_in_submission_order(large_app):
+    with large_app.app_context():
+        instructor = User.query.filter_by(username="synth-instructor1").one()
+        query = Submission.query.join(Assignment).filter(
+            Assignment.created_by == instructor.id,
+            Submission.status != "Graded",
+            Submission.submitted_at.isnot(None),
+        )
+        expected = [s.id for s in query.order_by(Submission.submitted_at, Submission.id)]
+        assert len(expected) > 50
+
+        def page(after=None):
+            return keyset_page(
+                query, Submission.submitted_at, Submission.id,
+                key=lambda s: (s.submitted_at, s.id), after=after, limit=25,
+            )
+
+        result = page()
+        seen = [s.id for s in result.items]
+        while result.next_cursor:
+            result = page(result.next_cursor)
+            seen += [s.id for s in result.items]
+        assert seen == expected
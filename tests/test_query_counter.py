@@ -0,0 +1,37 @@
+import pytest
+
+from app import query_counter
+from app.query_counter import QueryBudgetExceeded, statement_shape
+from app.query_plans import route_requests
+
+# statements any hot route may run, and how often one shape may repeat in it
+ROUTE_QUERY_BUDGET = 8
+MAX_SHAPE_REPEATS = 2
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?,\n ?)") == statement_shape(
+        "SELECT * FROM t WHERE id IN (?, ?)"
+    )
+
+
+def test_budget_fails_when_exceeded(query_budget, login):
+    client = login("demo-student1")
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget(0):
+            client.get("/dashboard")
+
+
+@pytest.mark.parametrize("variant", ["demo_app", "large_app"])
+def test_hot_routes_stay_within_query_budget(variant, request):
+    app = request.getfixturevalue(variant)
+    app.config["FRAGMENT_CACHE_ENABLED"] = False  # cached fragments would hide lazy loads
+
+    for label, path, client in route_requests(app):
+        client.get(path)  # the first request also loads the course catalog and user cache
+        # route_requests keeps the app context pushed, so this counts on its engine
+        with query_counter.query_budget(ROUTE_QUERY_BUDGET) as stats:
+            response = client.get(path)
+        assert response.status_code < 500, label
+        shape, runs = stats.shapes.most_common(1)[0]
+        assert runs <= MAX_SHAPE_REPEATS, f"{label}: {runs} runs of {shape}"
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.query_plans import _FULL_SCAN, check_route_plans, full_scans
+
+
+@pytest.mark.parametrize("variant", ["demo_app", "large_app"])
+def test_hot_routes_use_indexes(variant, request):
+    app = request.getfixturevalue(variant)
+    failures = check_route_plans(app)
+    assert not failures, "\n".join(f"{label}: {detail}\n  {statement}" for label, statement, detail in failures)
+
+
+def test_full_scan_detection(app):
+    with app.app_context():
+        assert full_scans("SELECT * FROM submission WHERE content = 'x'") == ["SCAN submission"]
+        assert full_scans("SELECT * FROM submission WHERE assignment_id = 1") == []
+
+
+@pytest.mark.parametrize("detail, table", [
+    ("SCAN submission", "submission"),
+    ("SCAN submission AS s", "submission"),
+    ("SCAN TABLE submission", "submission"),
+    ("SCAN TABLE submission AS s", "submission"),
+    ("SCAN submission USING INDEX ix_submission_assignment", None),
+    ("SCAN TABLE submission USING COVERING INDEX ix_submission_assignment", None),
+    ("SEARCH submission USING INDEX ix_submission_assignment (assignment_id=?)", None),
+    ("SEARCH TABLE submission USING INTEGER PRIMARY KEY (rowid=?)", None),
+])
+def test_full_scan_pattern_reads_old_and_new_sqlite_plans(detail, table):
+    match = _FULL_SCAN.match(detail)
+    assert (match.group(1) if match else None) == table
+
+
+def test_dropped_index_is_reported(app):
+    with app.app_context():
+        db.session.execute(text("DROP INDEX ix_enrollment_user_course"))
+        db.session.commit()
+    failures = check_route_plans(app, routes=["/courses"])
+    assert any("SCAN enrollment" in detail for _, _, detail in failures)
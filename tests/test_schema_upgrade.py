@@ -0,0 +1,52 @@
+import sqlite3
+
+from sqlalchemy import inspect
+
+from app import create_app, db, db_snapshots
+from app.config import Config
+from app.main import inbox
+
+
+def _old_database(path):
+    """A demo database from before the feed salt and conversation counters existed."""
+    db_snapshots.clone_to_file("demo", path)
+    conn = sqlite3.connect(path)
+    indexed = {
+        column
+        for (index,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+        for *_, column in conn.execute(f'PRAGMA index_info("{index}")')
+    }
+    for table, column in [
+        ("user", "feed_salt"),
+        ("conversation", "message_count"),
+        ("conversation", "last_message_at"),
+        ("conversation_participant", "unread_count"),
+    ]:
+        assert column not in indexed
+        conn.execute(f'ALTER TABLE "{table}" DROP COLUMN "{column}"')
+    conn.commit()
+    conn.close()
+
+
+def test_first_request_upgrades_an_existing_database(tmp_path):
+    path = tmp_path / "old.db"
+    _old_database(path)
+
+    class UpgradeConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+
+    app = create_app(UpgradeConfig)
+    client = app.test_client()
+    assert client.get("/login").status_code == 200
+    with app.app_context():
+        user_id = db.session.execute(db.text("SELECT id FROM user WHERE username = 'demo-student1'")).scalar()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+
+    assert client.get("/messages").status_code == 200
+    assert client.get("/calendar").status_code == 200
+    with app.app_context():
+        assert "feed_salt" in {c["name"] for c in inspect(db.engine).get_columns("user")}
+        assert inbox.repair_counters() == (0, 0)
+        db.engine.dispose()
@@ -0,0 +1,33 @@
+import pytest
+
+from app import db
+from app.models import Course, User
+
+from seed_demo import _synthetic_courses, clear_synthetic_data, seed_synthetic
+
+
+@pytest.fixture
+def empty_db(empty_app):
+    with empty_app.app_context():
+        yield
+
+
+def test_only_generated_course_codes_count_as_synthetic(empty_db):
+    codes = ["SYN00001", "SYN123456", "SYN101", "SYN1234X", "SYN12345X", "SYN-00001", "CS 101"]
+    db.session.add_all(Course(course_name=code, course_code=code) for code in codes)
+    db.session.commit()
+
+    matched = {course_id for (course_id,) in _synthetic_courses()}
+    assert {db.session.get(Course, course_id).course_code for course_id in matched} == {"SYN00001", "SYN123456"}
+
+
+def test_courses_with_six_digit_ids_are_cleared(empty_db):
+    db.session.add(Course(id=99_999, course_name="Real course", course_code="CS 999"))
+    db.session.commit()
+
+    seed_synthetic(students=4, courses=2, assignments_per_course=1, messages_per_student=1, courses_per_student=1)
+    assert {c.course_code for c in Course.query if c.id > 99_999} == {"SYN100000", "SYN100001"}
+
+    clear_synthetic_data()
+    assert [c.course_code for c in Course.query] == ["CS 999"]
+    assert User.query.count() == 0
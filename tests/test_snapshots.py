@@ -0,0 +1,36 @@
+import sqlite3
+
+from app import db, db_snapshots
+from app.models import Assignment, Course, User
+
+
+def _counts(app):
+    with app.app_context():
+        return {model.__name__: db.session.query(model).count() for model in (User, Course, Assignment)}
+
+
+def test_empty_snapshot_has_schema_but_no_rows(empty_app):
+    assert _counts(empty_app) == {"User": 0, "Course": 0, "Assignment": 0}
+
+
+def test_demo_snapshot_is_seeded(demo_app):
+    counts = _counts(demo_app)
+    assert counts["User"] == 15
+    assert counts["Course"] == 5
+    assert counts["Assignment"] > 0
+
+
+def test_large_snapshot_is_seeded(large_app):
+    assert _counts(large_app)["User"] > db_snapshots.LARGE_STUDENTS
+
+
+def test_writes_stay_in_the_tests_own_copy(demo_app, tmp_path):
+    with demo_app.app_context():
+        Assignment.query.delete()
+        db.session.commit()
+    assert _counts(demo_app)["Assignment"] == 0
+
+    other = tmp_path / "other.db"
+    db_snapshots.clone_to_file("demo", other)
+    with sqlite3.connect(other) as connection:
+        assert connection.execute("SELECT count(*) FROM assignment").fetchone()[0] > 0
@@ -0,0 +1,41 @@
+import os
+
+from app.config import Config
+from app.startup_profile import check_budget, parse_importtime, profile_startup
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _budgets():
+    return {name: getattr(Config, name) for name in dir(Config) if name.startswith("STARTUP_")}
+
+
+def test_cold_start_within_budget():
+    profile = profile_startup(PROJECT_ROOT)
+    assert check_budget(profile, _budgets()) == []
+
+
+def test_check_budget_reports_each_overrun():
+    profile = {"startup_ms": 2000.0, "module_count": 700, "modules": ["app", "openai"]}
+    problems = check_budget(profile, {
+        "STARTUP_BUDGET_MS": 1500,
+        "STARTUP_MODULE_BUDGET": 650,
+        "STARTUP_LAZY_MODULES": ("openai", "httpx"),
+    })
+    assert problems == [
+        "create_app took 2000 ms (budget 1500 ms)",
+        "700 modules loaded (budget 650)",
+        "openai is imported at startup",
+    ]
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:      3400 |       5100 | flask\n"
+    )
+    assert [(t.name, t.self_us, t.cumulative_us) for t in parse_importtime(output)] == [
+        ("_io", 120, 120),
+        ("flask", 3400, 5100),
+    ]
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from app.main import gpt_client
+from app.main.ai_providers import FakeProvider
+from app.main.llm_cache import response_cache
+
+MESSAGES = [{"role": "system", "content": "plan"}, {"role": "user", "content": "three essays due friday"}]
+
+
+@pytest.fixture
+def empty_cache(app):
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture
+def streaming(app, empty_cache):
+    app.config["STUDY_PLAN_STREAMING"] = True
+    return app
+
+
+def _events(body):
+    """``(event, data)`` pairs of an SSE body, skipping comments and ``retry``."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+        if "data" in fields:
+            events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_fake_provider_streams_its_completion_word_by_word():
+    provider = FakeProvider()
+    deltas = list(provider.stream("model", MESSAGES))
+    assert len(deltas) > 1
+    assert "".join(deltas).strip() == provider.complete("model", MESSAGES)
+
+
+def test_streamed_plan_is_cached_for_the_next_request(app, empty_cache, monkeypatch):
+    first = list(gpt_client.stream_chatgpt("help", "essay"))
+    assert len(first) > 1
+
+    def offline(self, model, messages, timeout):
+        raise AssertionError("should have been answered from the cache")
+
+    monkeypatch.setattr(FakeProvider, "_stream", offline)
+    monkeypatch.setattr(FakeProvider, "_complete", offline)
+    assert list(gpt_client.stream_chatgpt("help", "essay")) == ["".join(first)]
+    assert gpt_client.ask_chatgpt("help", "essay") == "".join(first)
+
+
+def test_stream_failure_is_reported_in_band_and_not_cached(app, empty_cache, monkeypatch):
+    app.config.update(LLM_MAX_RETRIES=0, LLM_BREAKER_THRESHOLD=100)
+
+    def broken(self, model, messages, timeout):
+        yield "partial "
+        raise ConnectionError("reset by peer")
+
+    monkeypatch.setattr(FakeProvider, "_stream", broken)
+    parts = list(gpt_client.stream_chatgpt("help", "broken"))
+    assert parts[0] == "partial "
+    assert "reset by peer" in parts[-1]
+    assert response_cache.lookup(gpt_client.cache_key(
+        gpt_client.MODEL, gpt_client.SYSTEM_PROMPT, "help\n\nAssignments:\nbroken"
+    )) is None
+
+
+def test_stream_route_frames_tokens_as_sse(streaming, login):
+    response = login("demo-student1").post("/study-plan/stream", data={"topics": "calculus first"})
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    events = _events(response.get_data(as_text=True))
+    assert events[-1] == ("done", {})
+    text = "".join(data for event, data in events[:-1])
+    assert len(events) > 2
+    assert "calculus first" in text and "SpartanSync" in text
+
+
+def test_streaming_page_offers_the_stream(streaming, login):
+    body = login("demo-student1").get("/study-plan").get_data(as_text=True)
+    assert 'data-stream-url="/study-plan/stream"' in body
+
+
+def test_without_streaming_plans_go_through_the_job_queue(app, empty_cache, login):
+    client = login("demo-student1")
+    assert "data-stream-url" not in client.get("/study-plan").get_data(as_text=True)
+    assert client.post("/study-plan/stream", data={"topics": "x"}).status_code == 404
+
+    response = client.post("/study-plan", data={"topics": "x"}, headers={"Accept": "application/json"})
+    assert response.status_code == 202
+    assert client.get(response.get_json()["status_url"]).get_json()["status"] == "succeeded"
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from app import db
+from app.models import User
+from app.user_cache import UserCache, user_cache
+
+
+@pytest.fixture
+def student(app):
+    return User.query.filter_by(username="demo-student1").one()
+
+
+def _home_as_user_1(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+    return client.get("/home").get_data(as_text=True)
+
+
+def test_apps_do_not_share_users(demo_app, large_app):
+    with large_app.app_context():
+        same_id = db.session.get(User, 1).username
+
+    assert "demo-student1" in _home_as_user_1(demo_app)
+    body = _home_as_user_1(large_app)
+    assert same_id in body
+    assert "demo-student1" not in body
+
+
+def test_repeat_loads_come_from_the_cache(app, student, query_budget):
+    first = user_cache.load(student.id)
+    with query_budget(0):
+        assert user_cache.load(student.id) is first
+    assert user_cache.load(-1) is None
+
+
+def test_role_change_drops_the_record(app, student):
+    assert user_cache.load(student.id).role == "student"
+
+    student.role = "ta"
+    db.session.commit()
+
+    assert user_cache.load(student.id).role == "ta"
+
+
+def test_password_change_drops_the_record(app, student):
+    cached = user_cache.load(student.id)
+
+    student.set_password("a new password")
+    db.session.commit()
+
+    assert user_cache.load(student.id) is not cached
+
+
+def test_records_expire_after_the_ttl(app, student):
+    app.extensions["user_cache"] = UserCache(ttl=0.05)
+    cached = user_cache.load(student.id)
+    assert user_cache.load(student.id) is cached
+
+    time.sleep(0.06)
+    assert user_cache.load(student.id) is not cached
+
+
+def test_can_be_switched_off(app, student):
+    app.config["USER_CACHE_ENABLED"] = False
+    assert isinstance(user_cache.load(student.id), User)